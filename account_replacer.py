@@ -1,4 +1,5 @@
 import ast
+import heapq
 
 __plugins__ = ["account_replacer"]
 
@@ -6,47 +7,128 @@ import re
 
 from beancount.core import data
 
+CONFIG_KEYS = frozenset({"replace-rules"})
+REPLACE_RULE_CONFIG_KEYS = frozenset({"replace-from", "replace-to"})
+
+
+class AccountReplaceRules:
+
+    def __init__(self, replace_rules):
+        rules = []
+        for replace_rule in replace_rules:
+            replace_from = re.compile(replace_rule["replace-from"])
+            replace_to = replace_rule["replace-to"].replace("$", "\\")
+            rules.append((replace_from, replace_to))
+        self.__rules = tuple(rules)
+
+        self.__replaced_accounts = {}
+
+    def replace(self, account):
+        new_account = self.__replaced_accounts.get(account)
+        if new_account is not None:
+            return new_account
+
+        new_account = account
+        for replace_from, replace_to in self.__rules:
+            new_account = replace_from.sub(replace_to, new_account)
+
+        self.__replaced_accounts[account] = new_account
+        return new_account
+
 
 class AccountReplacer:
 
-    def replace(self, entries, options_map, config_str=""):
-        config = {}
-        expr = ast.literal_eval(config_str)
-        config.update(expr)
+    def __init__(self):
+        self.__replace_rules_by_config = {}
 
-        replace_rules = config.get("replace-rules")
-        if replace_rules is None or len(replace_rules) == 0:
+    def replace(self, entries, options_map, config_str=""):
+        replace_rules = self.get_replace_rules(config_str)
+        if replace_rules is None:
             return entries, []
 
         new_entries = []
         for entry in entries:
-            new_entry = entry
+            new_entries.append(self.replace_entry(entry, replace_rules))
 
-            for replace_rule in replace_rules:
-                new_entry = self.__replace_entry(new_entry, replace_rule)
+        return new_entries, []
+
+    def replace_incremental(self, previous_entries, previous_new_entries, removed_entries, added_entries,
+                            options_map, config_str=""):
+        replace_rules = self.get_replace_rules(config_str)
+        entries = self.__merge_entries(previous_entries, removed_entries, added_entries)
+        if replace_rules is None:
+            return entries, []
+        if len(previous_entries) != len(previous_new_entries):
+            return self.replace(entries, options_map, config_str)
 
+        previous_new_entries_by_id = {id(entry): new_entry
+                                      for entry, new_entry in zip(previous_entries, previous_new_entries)}
+        new_entries = []
+        for entry in entries:
+            new_entry = previous_new_entries_by_id.get(id(entry))
+            if new_entry is None:
+                new_entry = self.replace_entry(entry, replace_rules)
             new_entries.append(new_entry)
 
         return new_entries, []
 
     @staticmethod
-    def __replace_entry(entry, replace_rule):
-        replace_from = replace_rule["replace-from"]
-        replace_to = replace_rule["replace-to"].replace("$", "\\")
+    def __merge_entries(previous_entries, removed_entries, added_entries):
+        removed_ids = {id(entry) for entry in removed_entries}
+        kept_entries = [entry for entry in previous_entries if id(entry) not in removed_ids]
+        return list(heapq.merge(kept_entries, sorted(added_entries, key=data.entry_sortkey), key=data.entry_sortkey))
+
+    def get_replace_rules(self, config_str):
+        if config_str in self.__replace_rules_by_config:
+            return self.__replace_rules_by_config[config_str]
+
+        config = {}
+        expr = ast.literal_eval(config_str)
+        config.update(expr)
+
+        self.__check_config_keys(config, CONFIG_KEYS)
+        replace_rules = config.get("replace-rules")
+        if replace_rules is None or len(replace_rules) == 0:
+            replace_rules = None
+        else:
+            for replace_rule in replace_rules:
+                self.__check_config_keys(replace_rule, REPLACE_RULE_CONFIG_KEYS)
+                for name in ("replace-from", "replace-to"):
+                    if name not in replace_rule:
+                        raise Exception("Config key missing: " + name)
+            replace_rules = AccountReplaceRules(replace_rules)
+
+        self.__replace_rules_by_config[config_str] = replace_rules
+        return replace_rules
+
+    @staticmethod
+    def __check_config_keys(config, config_keys):
+        unknown_keys = sorted(key for key in config if key not in config_keys)
+        if len(unknown_keys) > 0:
+            raise Exception("Config key not implemented: " + ", ".join(map(str, unknown_keys)))
+
+    @staticmethod
+    def replace_entry(entry, replace_rules):
         if isinstance(entry, data.Transaction):
+            is_replaced = False
             new_postings = []
             for posting in entry.postings:
-                account = posting.account
-                new_account = re.sub(replace_from, replace_to, account)
+                new_account = replace_rules.replace(posting.account)
+                if new_account == posting.account:
+                    new_postings.append(posting)
+                    continue
                 new_postings.append(posting._replace(account=new_account))
+                is_replaced = True
 
-            return entry._replace(postings=new_postings)
+            return entry._replace(postings=new_postings) if is_replaced else entry
         elif isinstance(entry, data.Open) or isinstance(entry, data.Close) or isinstance(entry, data.Balance):
-            new_account = re.sub(replace_from, replace_to, entry.account)
-            return entry._replace(account=new_account)
+            new_account = replace_rules.replace(entry.account)
+            return entry._replace(account=new_account) if new_account != entry.account else entry
         elif isinstance(entry, data.Pad):
-            new_account = re.sub(replace_from, replace_to, entry.account)
-            new_source_account = re.sub(replace_from, replace_to, entry.source_account)
+            new_account = replace_rules.replace(entry.account)
+            new_source_account = replace_rules.replace(entry.source_account)
+            if new_account == entry.account and new_source_account == entry.source_account:
+                return entry
             return entry._replace(account=new_account, source_account=new_source_account)
 
         return entry
@@ -57,3 +139,9 @@ account_replacer_obj = AccountReplacer()
 
 def account_replacer(entries, options_map, config_str=""):
     return account_replacer_obj.replace(entries, options_map, config_str)
+
+
+def account_replacer_incremental(previous_entries, previous_new_entries, removed_entries, added_entries,
+                                 options_map, config_str=""):
+    return account_replacer_obj.replace_incremental(previous_entries, previous_new_entries, removed_entries,
+                                                    added_entries, options_map, config_str)
@@ -3,7 +3,9 @@ import unittest
 from beancount import loader
 from beancount.parser import cmptest
 
-from account_replacer import account_replacer
+from beancount.core import data
+
+from account_replacer import account_replacer, account_replacer_incremental, AccountReplaceRules
 
 
 class TestAccountReplacer(cmptest.TestCase):
@@ -238,6 +240,126 @@ class TestAccountReplacer(cmptest.TestCase):
             new_entries,
         )
 
+    @loader.load_doc(expect_errors=True)
+    def test_chained_rules_replace_by_config(self, entries, _, options_map):
+        """
+        2010-08-31 open Expenses:Groceries
+
+        2013-05-31 * "Paid by card"
+            Assets:Bank:Checking        -100 USD
+            Expenses:Groceries           100 USD
+        """
+        config_str = ('{'
+                      '"replace-rules":['
+                      '{'
+                      '"replace-from":"Expenses:Groceries",'
+                      '"replace-to":"Expenses:Recurring:Groceries"'
+                      '},'
+                      '{'
+                      '"replace-from":"Expenses:Recurring:(.*)",'
+                      '"replace-to":"Expenses:Monthly:$1"'
+                      '},'
+                      '],'
+                      '}')
+        new_entries, _ = account_replacer(entries, options_map, config_str)
+
+        self.assertEqualEntries(
+            """
+        2010-08-31 open Expenses:Monthly:Groceries
+
+        2013-05-31 * "Paid by card"
+            Assets:Bank:Checking          -100 USD
+            Expenses:Monthly:Groceries     100 USD
+        """,
+            new_entries,
+        )
+
+    @loader.load_doc(expect_errors=True)
+    def test_incremental_replace_matches_full_replace(self, entries, _, options_map):
+        """
+        2010-08-31 open Expenses:Groceries
+
+        2013-05-31 * "Paid by card"
+            Assets:Bank:Checking        -100 USD
+            Expenses:Groceries           100 USD
+
+        2013-06-30 * "Paid by card"
+            Assets:Bank:Checking        -200 USD
+            Expenses:Groceries           200 USD
+        """
+        config_str = ('{'
+                      '"replace-rules":['
+                      '{'
+                      '"replace-from":"Expenses:Groceries",'
+                      '"replace-to":"Expenses:Recurring:Groceries"'
+                      '},'
+                      '],'
+                      '}')
+        added_entries, _, _ = loader.load_string("""
+        2013-06-15 * "Paid by card"
+            Assets:Bank:Checking        -50 USD
+            Expenses:Groceries           50 USD
+        """)
+        previous_new_entries, _ = account_replacer(entries, options_map, config_str)
+
+        new_entries, _ = account_replacer_incremental(entries, previous_new_entries, entries[2:], added_entries,
+                                                      options_map, config_str)
+
+        expected_entries, _ = account_replacer(sorted(entries[:2] + added_entries, key=data.entry_sortkey),
+                                               options_map, config_str)
+        self.assertEqual(expected_entries, new_entries)
+        self.assertIs(previous_new_entries[1], new_entries[1])
+
+    @loader.load_doc(expect_errors=True)
+    def test_unchanged_entries_preserved(self, entries, _, options_map):
+        """
+        2010-08-31 open Expenses:Groceries
+        2010-08-31 open Expenses:SomethingElse
+
+        2013-05-31 * "Paid by card"
+            Assets:Bank:Checking        -100 USD
+            Expenses:SomethingElse       100 USD
+
+        2013-06-01 * "Paid by card"
+            Assets:Bank:Checking        -100 USD
+            Expenses:Groceries           100 USD
+        """
+        config_str = ('{'
+                      '"replace-rules":['
+                      '{'
+                      '"replace-from":"Expenses:Groceries",'
+                      '"replace-to":"Expenses:Recurring:Groceries"'
+                      '},'
+                      '],'
+                      '}')
+        new_entries, _ = account_replacer(entries, options_map, config_str)
+
+        self.assertIsNot(entries[0], new_entries[0])
+        self.assertIs(entries[1], new_entries[1])
+        self.assertIs(entries[2], new_entries[2])
+        self.assertIsNot(entries[3], new_entries[3])
+        self.assertIs(entries[3].postings[0], new_entries[3].postings[0])
+
+    def test_replace_rules_result_cached_per_account(self):
+        replace_rules = AccountReplaceRules([{
+            "replace-from": "Expenses:(Groceries.*)",
+            "replace-to": "Expenses:Recurring:$1",
+        }])
+
+        first_account = replace_rules.replace("Expenses:Groceries:Fruits")
+        second_account = replace_rules.replace("Expenses:Groceries:Fruits")
+
+        self.assertEqual("Expenses:Recurring:Groceries:Fruits", first_account)
+        self.assertIs(first_account, second_account)
+        self.assertEqual("Assets:Bank:Checking", replace_rules.replace("Assets:Bank:Checking"))
+
+    def test_config_rejected_up_front(self):
+        for config_str in ['{"replace-rule":[]}',
+                           '{"replace-rules":[{"replace-from":"Expenses","replace":"Costs"}]}',
+                           '{"replace-rules":[{"replace-from":"Expenses"}]}']:
+            with self.assertRaises(Exception):
+                account_replacer([], {}, config_str)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,5 +1,7 @@
 import ast
+import collections
 import datetime
+import heapq
 
 __plugins__ = ["balance_pad_creator"]
 
@@ -9,108 +11,269 @@ from beancount.core import data
 from beancount.core.data import Balance, Transaction
 from beancount.ops.pad import pad
 
+CONFIG_KEYS = frozenset({"accounts", "account", "pad-account", "metadata-name-balance-unit",
+                         "metadata-name-balance-time", "pad-scope"})
+ACCOUNT_CONFIG_KEYS = frozenset({"account", "pad-account"})
+
+BalancePadCreatorConfig = collections.namedtuple(
+    "BalancePadCreatorConfig", "pad_accounts metadata_name_balance_unit metadata_name_balance_time pad_scope"
+)
+
+
+class BalancePadAccount:
+    def __init__(self, account, pad_account):
+        self.account = account
+        self.pad_account = pad_account
+        self.balances = {}
+        self.postings = {}
+
+    def update_balances(self, entry):
+        key = (entry.date, entry.amount.currency)
+        relevant_balance = self.balances.get(key)
+        metadata_name_time = "balance-time"
+        if not relevant_balance:
+            self.balances[key] = entry
+        elif relevant_balance and relevant_balance.meta[metadata_name_time] < entry.meta[metadata_name_time]:
+            self.balances[key] = entry
+
+    def add_posting(self, date, units):
+        currency_postings = self.postings.get(units.currency)
+        if currency_postings is None:
+            currency_postings = []
+            self.postings[units.currency] = currency_postings
+        currency_postings.append((date, units.number))
+
+    def create_pads(self):
+        balances_by_currency = {}
+        for balance in self.balances.values():
+            balances_by_currency.setdefault(balance.amount.currency, []).append(balance)
+
+        pads = []
+        for currency, balances in balances_by_currency.items():
+            balances.sort(key=lambda balance: balance.date)
+            pads.extend(self.__create_currency_pads(balances, self.postings.get(currency, [])))
+        return pads
+
+    def __create_currency_pads(self, balances, account_postings):
+        account_postings.sort(key=lambda account_posting: account_posting[0])
+
+        pads = []
+        txn_amount = 0
+        posting_index = 0
+        for balance in balances:
+            while posting_index < len(account_postings) and account_postings[posting_index][0] < balance.date:
+                txn_amount += account_postings[posting_index][1]
+                posting_index += 1
+
+            if txn_amount != balance.amount.number:
+                if self.pad_account is None:
+                    raise Exception("Pad account not configured for account: " + self.account)
+                date = balance.date + datetime.timedelta(days=-1)
+                number = txn_amount - balance.amount.number
+                postings = [
+                    data.Posting(self.account, data.Amount(Decimal(-number), balance.amount.currency), None, None,
+                                 None, dict()),
+                    data.Posting(self.pad_account, data.Amount(Decimal(number), balance.amount.currency), None,
+                                 None, None, dict())
+                ]
+                pads.append(
+                    data.Transaction(data.new_metadata(balance.meta["filename"], balance.meta["lineno"]), date, "*",
+                                     None, "Pad", frozenset(), frozenset(), postings))
+
+                txn_amount = balance.amount.number
+        return pads
+
 
 class BalancePadCreator:
+    def __init__(self):
+        self.__configs_by_str = {}
+        self.__previous_result = None
+
     def create(self, entries, options_map, config_str="", skip_padding=False):
-        config = {}
-        expr = ast.literal_eval(config_str)
-        config.update(expr)
+        new_entries, errors = self.__create(entries, options_map, config_str, skip_padding)
+        self.__previous_result = (config_str, skip_padding, new_entries, errors)
+        return list(new_entries), errors
+
+    def __create(self, entries, options_map, config_str, skip_padding):
+        config = self.get_config(config_str)
 
-        account = config["account"]
-        metadata_name_balance_unit = config["metadata-name-balance-unit"]
-        metadata_name_balance_time = config["metadata-name-balance-time"]
+        pad_accounts = self.__get_pad_accounts(config)
+        metadata_name_balance_unit = config.metadata_name_balance_unit
+        metadata_name_balance_time = config.metadata_name_balance_time
+        pad_scope = config.pad_scope
 
         non_relevant_entries = []
-        relevant_balances = {}
         relevant_txs = []
         for entry in entries:
-            if isinstance(entry, Balance) and entry.account == account:
-                self.__update_relevant_balances(entry, relevant_balances)
+            if isinstance(entry, Balance) and entry.account in pad_accounts:
+                pad_accounts[entry.account].update_balances(entry)
                 continue
 
             if not isinstance(entry, Transaction):
                 non_relevant_entries.append(entry)
                 continue
 
-            relevant_txs.append(entry)
-            relevant_postings = list(
-                filter(lambda
-                           posting: posting.account == account and posting.meta and metadata_name_balance_unit in posting.meta,
-                       entry.postings))
+            is_relevant = pad_scope == "ledger"
+            for posting in entry.postings:
+                pad_account = pad_accounts.get(posting.account)
+                if pad_account is None:
+                    continue
 
-            if len(relevant_postings) == 0:
-                continue
+                is_relevant = True
+                pad_account.add_posting(entry.date, posting.units)
+                if posting.meta and metadata_name_balance_unit in posting.meta:
+                    pad_account.update_balances(self.__create_balance(entry, metadata_name_balance_time,
+                                                                      metadata_name_balance_unit, posting))
 
-            for new_balance in self.__create_balances(entry, metadata_name_balance_time, metadata_name_balance_unit,
-                                                      relevant_postings):
-                self.__update_relevant_balances(new_balance, relevant_balances)
+            if is_relevant:
+                relevant_txs.append(entry)
+            else:
+                non_relevant_entries.append(entry)
 
-        pads = self.__create_pads(account, config, relevant_balances, relevant_txs)
+        relevant_balances = []
+        pads = []
+        for pad_account in pad_accounts.values():
+            relevant_balances.extend(pad_account.balances.values())
+            pads.extend(pad_account.create_pads())
 
         errors = []
-        entries_for_padding = list(relevant_balances.values()) + relevant_txs + pads
+        entries_for_padding = relevant_balances + relevant_txs + pads
         if skip_padding:
             entries_after_pad = entries_for_padding
         else:
             (entries_after_pad, errors) = pad(entries_for_padding, options_map)
+
+        if pad_scope == "accounts":
+            return sorted(non_relevant_entries + entries_after_pad, key=data.entry_sortkey), errors
         return non_relevant_entries + entries_after_pad, errors
 
+    def create_incremental(self, previous_entries, previous_new_entries, removed_entries, added_entries,
+                           options_map, config_str="", skip_padding=False):
+        config = self.get_config(config_str)
+
+        entries = self.__merge_entries(previous_entries, removed_entries, added_entries)
+        pad_accounts = self.__get_pad_accounts(config)
+        if not self.__is_previous_result(previous_new_entries, config_str, skip_padding) \
+                or any(self.__is_pad_account_touched(entry, pad_accounts) for entry in removed_entries + added_entries):
+            return self.create(entries, options_map, config_str, skip_padding)
+
+        errors = self.__previous_result[3]
+        if config.pad_scope == "accounts":
+            new_entries = self.__merge_entries(previous_new_entries, removed_entries, added_entries)
+            self.__previous_result = (config_str, skip_padding, new_entries, errors)
+            return list(new_entries), errors
+
+        txn_ids = {id(entry) for entry in previous_entries if isinstance(entry, Transaction)}
+        balance_index = 0
+        while balance_index < len(previous_new_entries) \
+                and id(previous_new_entries[balance_index]) not in txn_ids \
+                and not (isinstance(previous_new_entries[balance_index], Balance)
+                         and previous_new_entries[balance_index].account in pad_accounts):
+            balance_index += 1
+        txn_index = balance_index
+        while txn_index < len(previous_new_entries) and isinstance(previous_new_entries[txn_index], Balance):
+            txn_index += 1
+        pad_index = txn_index
+        while pad_index < len(previous_new_entries) and id(previous_new_entries[pad_index]) in txn_ids:
+            pad_index += 1
+        if pad_index - txn_index != len(txn_ids):
+            return self.create(entries, options_map, config_str, skip_padding)
+
+        added_non_relevant_entries = [entry for entry in added_entries if not isinstance(entry, Transaction)]
+        added_txns = [entry for entry in added_entries if isinstance(entry, Transaction)]
+        new_entries = self.__merge_entries(previous_new_entries[:balance_index], removed_entries,
+                                           added_non_relevant_entries)
+        new_entries.extend(previous_new_entries[balance_index:txn_index])
+        new_entries.extend(self.__merge_entries(previous_new_entries[txn_index:pad_index], removed_entries,
+                                                added_txns))
+        new_entries.extend(previous_new_entries[pad_index:])
+        self.__previous_result = (config_str, skip_padding, new_entries, errors)
+        return list(new_entries), errors
+
+    def __is_previous_result(self, previous_new_entries, config_str, skip_padding):
+        if self.__previous_result is None:
+            return False
+        previous_config_str, previous_skip_padding, new_entries, _ = self.__previous_result
+        if (previous_config_str, previous_skip_padding) != (config_str, skip_padding) \
+                or len(previous_new_entries) != len(new_entries):
+            return False
+        return all(previous_new_entry is new_entry
+                   for previous_new_entry, new_entry in zip(previous_new_entries, new_entries))
+
     @staticmethod
-    def __update_relevant_balances(entry, relevant_balances):
-        relevant_balance = relevant_balances.get(entry.date)
-        metadata_name_time = "balance-time"
-        if not relevant_balance:
-            relevant_balances[entry.date] = entry
-        elif relevant_balance and relevant_balance.meta[metadata_name_time] < entry.meta[metadata_name_time]:
-            relevant_balances[entry.date] = entry
+    def __merge_entries(previous_entries, removed_entries, added_entries):
+        removed_ids = {id(entry) for entry in removed_entries}
+        kept_entries = [entry for entry in previous_entries if id(entry) not in removed_ids]
+        return list(heapq.merge(kept_entries, sorted(added_entries, key=data.entry_sortkey), key=data.entry_sortkey))
 
     @staticmethod
-    def __create_balances(entry, metadata_name_balance_time, metadata_name_balance_unit, relevant_postings):
-        new_entries = []
-        for posting in relevant_postings:
-            date = entry.date + datetime.timedelta(days=1)
-            units = posting.meta[metadata_name_balance_unit]
-            meta = {metadata_name_balance_time: posting.meta[metadata_name_balance_time]}
-            balance = data.Balance(
-                data.new_metadata(entry.meta["filename"], entry.meta["lineno"], meta), date, posting.account,
-                units, None, None
-            )
-            new_entries.append(balance)
-        return new_entries
+    def __is_pad_account_touched(entry, pad_accounts):
+        if isinstance(entry, Balance):
+            return entry.account in pad_accounts
+        if isinstance(entry, Transaction):
+            return any(posting.account in pad_accounts for posting in entry.postings)
+        return False
+
+    def get_config(self, config_str):
+        if config_str in self.__configs_by_str:
+            return self.__configs_by_str[config_str]
+
+        config = {}
+        expr = ast.literal_eval(config_str)
+        config.update(expr)
+
+        self.__check_config_keys(config, CONFIG_KEYS)
+        for name in ("metadata-name-balance-unit", "metadata-name-balance-time"):
+            if name not in config:
+                raise Exception("Config key missing: " + name)
+        pad_scope = config.get("pad-scope", "ledger")
+        if pad_scope not in ("ledger", "accounts"):
+            raise Exception("Pad scope not implemented: " + pad_scope)
+
+        account_configs = config.get("accounts")
+        if account_configs is None:
+            if "account" not in config:
+                raise Exception("Config key missing: account")
+            account_configs = [{"account": config["account"], "pad-account": config.get("pad-account")}]
+
+        pad_accounts = []
+        for account_config in account_configs:
+            if isinstance(account_config, str):
+                account_config = {"account": account_config}
+            self.__check_config_keys(account_config, ACCOUNT_CONFIG_KEYS)
+            if "account" not in account_config:
+                raise Exception("Config key missing: account")
+            pad_accounts.append((account_config["account"],
+                                 account_config.get("pad-account", config.get("pad-account"))))
+
+        balance_pad_creator_config = BalancePadCreatorConfig(tuple(pad_accounts),
+                                                             config["metadata-name-balance-unit"],
+                                                             config["metadata-name-balance-time"], pad_scope)
+        self.__configs_by_str[config_str] = balance_pad_creator_config
+        return balance_pad_creator_config
 
     @staticmethod
-    def __create_pads(account, config, relevant_balances, relevant_txs):
-        pads = []
-        previous_balance = None
-        sorted_balance_dates = sorted(balance.date for balance in relevant_balances.values())
-        for balance_date in sorted_balance_dates:
-            balance = relevant_balances[balance_date]
-
-            txn_amount = previous_balance.amount.number if previous_balance else 0
-            for txn in relevant_txs:
-                if txn.date >= balance_date:
-                    continue
-                if previous_balance and txn.date < previous_balance.date:
-                    continue
-                for posting in txn.postings:
-                    if posting.account == account:
-                        txn_amount += posting.units.number
+    def __check_config_keys(config, config_keys):
+        unknown_keys = sorted(key for key in config if key not in config_keys)
+        if len(unknown_keys) > 0:
+            raise Exception("Config key not implemented: " + ", ".join(map(str, unknown_keys)))
 
-            if txn_amount != balance.amount.number:
-                date = balance.date + datetime.timedelta(days=-1)
-                number = txn_amount - balance.amount.number
-                postings = [
-                    data.Posting(account, data.Amount(Decimal(-number), balance.amount.currency), None, None,
-                                 None, dict()),
-                    data.Posting(config["pad-account"], data.Amount(Decimal(number), balance.amount.currency), None,
-                                 None, None, dict())
-                ]
-                pads.append(
-                    data.Transaction(data.new_metadata(balance.meta["filename"], balance.meta["lineno"]), date, "*",
-                                     None, "Pad", frozenset(), frozenset(), postings))
+    @staticmethod
+    def __get_pad_accounts(config):
+        pad_accounts = {}
+        for account, pad_account in config.pad_accounts:
+            pad_accounts[account] = BalancePadAccount(account, pad_account)
+        return pad_accounts
 
-                previous_balance = balance
-        return pads
+    @staticmethod
+    def __create_balance(entry, metadata_name_balance_time, metadata_name_balance_unit, posting):
+        date = entry.date + datetime.timedelta(days=1)
+        units = posting.meta[metadata_name_balance_unit]
+        meta = {metadata_name_balance_time: posting.meta[metadata_name_balance_time]}
+        return data.Balance(
+            data.new_metadata(entry.meta["filename"], entry.meta["lineno"], meta), date, posting.account,
+            units, None, None
+        )
 
 
 balance_pad_creator_obj = BalancePadCreator()
@@ -120,5 +283,11 @@ def balance_pad_creator(entries, options_map, config_str=""):
     return balance_pad_creator_obj.create(entries, options_map, config_str)
 
 
+def balance_pad_creator_incremental(previous_entries, previous_new_entries, removed_entries, added_entries,
+                                    options_map, config_str=""):
+    return balance_pad_creator_obj.create_incremental(previous_entries, previous_new_entries, removed_entries,
+                                                      added_entries, options_map, config_str)
+
+
 def balance_pad_creator_testable(entries, options_map, config_str=""):
     return balance_pad_creator_obj.create(entries, options_map, config_str, True)
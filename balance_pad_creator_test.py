@@ -7,6 +7,8 @@ from beancount.core.amount import A
 from beancount.parser import cmptest
 
 from balance_pad_creator import balance_pad_creator_testable as balance_pad_creator
+from balance_pad_creator import balance_pad_creator as balance_pad_creator_with_padding
+from balance_pad_creator import balance_pad_creator_incremental
 
 
 class TestBalancePadCreator(cmptest.TestCase):
@@ -266,6 +268,283 @@ class TestBalancePadCreator(cmptest.TestCase):
             new_entries,
         )
 
+    @loader.load_doc(expect_errors=True)
+    def test_pad_creation_after_matching_balance(self, entries, _, options_map):
+        """
+        2013-06-20 * "Entry"
+            Assets:Bank:Checking      -30 USD
+            Assets:Telephone           30 USD
+
+        2013-05-15 * "Entry"
+            Assets:Bank:Checking      -100 USD
+            Assets:Telephone           100 USD
+
+        2013-06-10 * "Entry"
+            Assets:Bank:Checking      -50 USD
+            Assets:Telephone           50 USD
+
+        2013-05-31 * "Entry"
+            Assets:Bank:Checking      -100 USD
+            Assets:Telephone           100 USD
+        """
+        account = 'Assets:Telephone'
+        for date, units in ((datetime.date(2013, 6, 1), '200 USD'),
+                            (datetime.date(2013, 6, 15), '240 USD'),
+                            (datetime.date(2013, 6, 25), '300 USD')):
+            entries.append(data.Balance(
+                data.new_metadata(".", 1001, {"balance-time": "14:47"}), date, account,
+                A(units), None, None
+            ))
+        config_str = ('{'
+                      '"account":"Assets:Telephone",'
+                      '"pad-account":"Expenses:Telephone:CallsAndMessages",'
+                      '"metadata-name-balance-unit":"balance",'
+                      '"metadata-name-balance-time":"balance-time"'
+                      '}')
+        new_entries, _ = balance_pad_creator(entries, options_map, config_str)
+
+        actual_pads = list(filter(lambda entry: isinstance(entry, data.Transaction) and entry.narration == "Pad",
+                                  new_entries))
+        self.assertEqualEntries(
+            """
+        2013-06-14 * "Pad"
+            Assets:Telephone                        -10 USD
+            Expenses:Telephone:CallsAndMessages      10 USD
+
+        2013-06-24 * "Pad"
+            Assets:Telephone                         30 USD
+            Expenses:Telephone:CallsAndMessages     -30 USD
+        """,
+            actual_pads,
+        )
+
+    @loader.load_doc(expect_errors=True)
+    def test_pad_creation_multi_accounts(self, entries, _, options_map):
+        """
+        2013-05-31 * "Entry"
+            Assets:Bank:Checking      -200 USD
+            Assets:Telephone           100 USD
+            Assets:Internet            100 USD
+                balance:               100 USD
+                balance-time: "14:47"
+        """
+        date = datetime.date(2013, 6, 1)
+        entries.append(data.Balance(
+            data.new_metadata(".", 1001, {"balance-time": "14:47"}), date, 'Assets:Telephone',
+            A('80 USD"'), None, None
+        ))
+        config_str = ('{'
+                      '"accounts":['
+                      '{"account":"Assets:Telephone","pad-account":"Expenses:Telephone:CallsAndMessages"},'
+                      '{"account":"Assets:Internet","pad-account":"Expenses:Internet"}'
+                      '],'
+                      '"metadata-name-balance-unit":"balance",'
+                      '"metadata-name-balance-time":"balance-time"'
+                      '}')
+        new_entries, _ = balance_pad_creator(entries, options_map, config_str)
+
+        self.assertEqualEntries(
+            """
+        2013-05-31 * "Entry"
+            Assets:Bank:Checking      -200 USD
+            Assets:Telephone           100 USD
+            Assets:Internet            100 USD
+
+        2013-05-31 * "Pad"
+            Assets:Telephone                        -20 USD
+            Expenses:Telephone:CallsAndMessages      20 USD
+
+        2013-06-01 balance Assets:Telephone  80 USD
+           balance-time: "14:47"
+
+        2013-06-01 balance Assets:Internet  100 USD
+           balance-time: "14:47"
+        """,
+            new_entries,
+        )
+
+    @loader.load_doc(expect_errors=True)
+    def test_pad_creation_multi_currencies(self, entries, _, options_map):
+        """
+        2013-05-31 * "Entry"
+            Assets:Bank:Checking      -100 USD
+            Assets:Broker              100 USD
+                balance:                90 USD
+                balance-time: "14:47"
+
+        2013-05-31 * "Entry"
+            Assets:Bank:Checking      -100 EUR
+            Assets:Broker              100 EUR
+                balance:               100 EUR
+                balance-time: "14:47"
+        """
+        config_str = ('{'
+                      '"accounts":["Assets:Broker"],'
+                      '"pad-account":"Income:Broker",'
+                      '"metadata-name-balance-unit":"balance",'
+                      '"metadata-name-balance-time":"balance-time"'
+                      '}')
+        new_entries, _ = balance_pad_creator(entries, options_map, config_str)
+
+        self.assertEqualEntries(
+            """
+        2013-05-31 * "Entry"
+            Assets:Bank:Checking      -100 USD
+            Assets:Broker              100 USD
+
+        2013-05-31 * "Entry"
+            Assets:Bank:Checking      -100 EUR
+            Assets:Broker              100 EUR
+
+        2013-05-31 * "Pad"
+            Assets:Broker             -10 USD
+            Income:Broker              10 USD
+
+        2013-06-01 balance Assets:Broker  90 USD
+           balance-time: "14:47"
+
+        2013-06-01 balance Assets:Broker  100 EUR
+           balance-time: "14:47"
+        """,
+            new_entries,
+        )
+
+    @loader.load_doc(expect_errors=True)
+    def test_pad_creation_accounts_pad_scope(self, entries, _, options_map):
+        """
+        2013-05-15 * "Entry"
+            Assets:Bank:Checking      -100 USD
+            Assets:Telephone           100 USD
+
+        2013-05-20 * "Unrelated"
+            Assets:Bank:Checking       -10 USD
+            Expenses:Food               10 USD
+
+        2013-05-31 * "Entry"
+            Assets:Bank:Checking      -100 USD
+            Assets:Telephone           100 USD
+        """
+        entries.append(data.Balance(
+            data.new_metadata(".", 1001, {"balance-time": "14:47"}), datetime.date(2013, 6, 1), 'Assets:Telephone',
+            A('80 USD"'), None, None
+        ))
+        config_str = ('{'
+                      '"account":"Assets:Telephone",'
+                      '"pad-account":"Expenses:Telephone:CallsAndMessages",'
+                      '"metadata-name-balance-unit":"balance",'
+                      '"metadata-name-balance-time":"balance-time"'
+                      '}')
+        ledger_entries, ledger_errors = balance_pad_creator_with_padding(list(entries), options_map, config_str)
+        accounts_config_str = config_str[:-1] + ',"pad-scope":"accounts"}'
+        new_entries, errors = balance_pad_creator_with_padding(list(entries), options_map, accounts_config_str)
+
+        self.assertEqualEntries(ledger_entries, new_entries)
+        self.assertEqual(ledger_errors, errors)
+        self.assertEqual(sorted(new_entries, key=data.entry_sortkey), new_entries)
+
+    @loader.load_doc(expect_errors=True)
+    def test_incremental_create_matches_full_create(self, entries, _, options_map):
+        """
+        2013-05-01 open Assets:Telephone
+
+        2013-05-15 * "Entry"
+            Assets:Bank:Checking      -100 USD
+            Assets:Telephone           100 USD
+                balance:               90 USD
+                balance-time: "14:47"
+
+        2013-05-20 * "Unrelated"
+            Assets:Bank:Checking       -10 USD
+            Expenses:Food               10 USD
+
+        2013-05-31 * "Entry"
+            Assets:Bank:Checking      -100 USD
+            Assets:Telephone           100 USD
+        """
+        added_entries, _, _ = loader.load_string("""
+        2013-05-02 open Expenses:Food
+
+        2013-05-25 * "Unrelated"
+            Assets:Bank:Checking       -20 USD
+            Expenses:Food               20 USD
+        """)
+        touching_entries, _, _ = loader.load_string("""
+        2013-05-25 * "Entry"
+            Assets:Bank:Checking       -20 USD
+            Assets:Telephone            20 USD
+        """)
+        config_str = ('{'
+                      '"account":"Assets:Telephone",'
+                      '"pad-account":"Expenses:Telephone:CallsAndMessages",'
+                      '"metadata-name-balance-unit":"balance",'
+                      '"metadata-name-balance-time":"balance-time"'
+                      '}')
+
+        for scope_config_str in [config_str, config_str[:-1] + ',"pad-scope":"accounts"}']:
+            for diff_entries in [added_entries, touching_entries]:
+                previous_new_entries, _ = balance_pad_creator_with_padding(entries, options_map, scope_config_str)
+
+                new_entries, _ = balance_pad_creator_incremental(entries, previous_new_entries, [entries[2]],
+                                                                 diff_entries, options_map, scope_config_str)
+
+                merged_entries = sorted([entries[0], entries[1], entries[3]] + diff_entries, key=data.entry_sortkey)
+                expected_entries, _ = balance_pad_creator_with_padding(merged_entries, options_map, scope_config_str)
+                self.assertEqual(expected_entries, new_entries)
+
+    @loader.load_doc(expect_errors=True)
+    def test_incremental_create_checks_previous_new_entries(self, entries, _, options_map):
+        """
+        2013-05-01 open Assets:Telephone
+
+        2013-05-15 * "Entry"
+            Assets:Bank:Checking      -100 USD
+            Assets:Telephone           100 USD
+                balance:               90 USD
+                balance-time: "14:47"
+
+        2013-05-20 * "Unrelated"
+            Assets:Bank:Checking       -10 USD
+            Expenses:Food               10 USD
+        """
+        added_entries, _, _ = loader.load_string("""
+        2013-05-25 * "Unrelated"
+            Assets:Bank:Checking       -20 USD
+            Expenses:Food               20 USD
+        """)
+        config_str = ('{'
+                      '"account":"Assets:Telephone",'
+                      '"pad-account":"Expenses:Telephone:CallsAndMessages",'
+                      '"metadata-name-balance-unit":"balance",'
+                      '"metadata-name-balance-time":"balance-time"'
+                      '}')
+        removed_entries = [entries[-1]]
+        merged_entries = sorted(entries[:-1] + added_entries, key=data.entry_sortkey)
+        expected_entries, expected_errors = balance_pad_creator_with_padding(merged_entries, options_map, config_str)
+
+        previous_new_entries, _ = balance_pad_creator_with_padding(entries, options_map, config_str)
+        new_entries, errors = balance_pad_creator_incremental(entries, previous_new_entries, removed_entries,
+                                                              added_entries, options_map, config_str)
+        self.assertEqual(expected_entries, new_entries)
+        self.assertEqual(expected_errors, errors)
+
+        previous_new_entries, _ = balance_pad_creator_with_padding(entries, options_map, config_str)
+        foreign_new_entries = [entry for entry in previous_new_entries if not isinstance(entry, data.Open)]
+        new_entries, errors = balance_pad_creator_incremental(entries, foreign_new_entries, removed_entries,
+                                                              added_entries, options_map, config_str)
+        self.assertEqual(expected_entries, new_entries)
+        self.assertEqual(expected_errors, errors)
+
+    def test_config_rejected_up_front(self):
+        for config_str in ['{"account":"Assets:Telephone","metadata-name-balance-unit":"balance",'
+                           '"metadata-name-balance-time":"balance-time","pad-acount":"Expenses:Telephone"}',
+                           '{"accounts":[{"account":"Assets:Telephone","pad":"Expenses:Telephone"}],'
+                           '"metadata-name-balance-unit":"balance","metadata-name-balance-time":"balance-time"}',
+                           '{"account":"Assets:Telephone","metadata-name-balance-unit":"balance",'
+                           '"metadata-name-balance-time":"balance-time","pad-scope":"account"}',
+                           '{"account":"Assets:Telephone","metadata-name-balance-unit":"balance"}']:
+            with self.assertRaises(Exception):
+                balance_pad_creator([], {}, config_str)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,43 @@
+import gc
+import time
+
+from balance_pad_creator import balance_pad_creator_obj
+from benchmarks.ledger_generator import ACCOUNTS, BROKER_ACCOUNT, LedgerGenerator
+
+ACCOUNT = BROKER_ACCOUNT
+CONFIG_STR = ('{'
+              '"account":"' + ACCOUNT + '",'
+              '"pad-account":"Income:Broker:Interest",'
+              '"metadata-name-balance-unit":"balance-unit",'
+              '"metadata-name-balance-time":"balance-time"'
+              '}')
+DAYS = [1000, 2000, 4000, 8000, 16000]
+
+
+def create_entries(days):
+    return LedgerGenerator(kinds=["balance-unit"], transactions_per_day=1).generate(len(ACCOUNTS) + days)
+
+
+def run_benchmark(days):
+    entries = create_entries(days)
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        balance_pad_creator_obj.create(entries, {}, CONFIG_STR, True)
+        return time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def main():
+    previous_elapsed = None
+    for days in DAYS:
+        elapsed = run_benchmark(days)
+        ratio = "" if previous_elapsed is None else " x{:.2f}".format(elapsed / previous_elapsed)
+        print("{:>8} days: {:8.3f} s, {:6.2f} us/day{}".format(days, elapsed, elapsed / days * 1e6, ratio))
+        previous_elapsed = elapsed
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import datetime
+import gc
+import json
+import platform
+import sys
+import time
+
+import beancount
+from beancount import loader
+
+from account_replacer import account_replacer
+from balance_pad_creator import balance_pad_creator
+from benchmarks.ledger_generator import LedgerGenerator
+from entry_manipulation.entry_manipulators import entry_manipulators
+from plugin_chain import plugin_chain
+from post_splitter import post_splitter
+from txn_splitter import txn_splitter
+
+SIZES = [10000, 100000, 1000000]
+
+MANIPULATOR_CONFIGS = {
+    "transaction-splitter": ('{'
+                             '  "type":"transaction-splitter",'
+                             '  "metadata-name-date":"booking-date",'
+                             '  "transfer-account":"Assets:Bank:DebitCard",'
+                             '  "dated-posting-move-mode":"move"'
+                             '}'),
+    "posting-consolidator-original-price": ('{'
+                                            '  "type":"posting-consolidator-original-price",'
+                                            '  "consolidate-price-account-postfix":"Price",'
+                                            '  "consolidate-discount-account-postfix":"Discount",'
+                                            '  "metadata-name-original-price":"original-price"'
+                                            '}'),
+    "posting-spreader": ('{'
+                         '  "type":"posting-spreader",'
+                         '  "roundings":{"USD":2},'
+                         '  "consolidate-price-account-postfix":"Price",'
+                         '  "spread-base":"unit",'
+                         '  "metadata-name-spread-source-id":"spread-source-id",'
+                         '  "metadata-name-spread-target-id":"spread-target-id"'
+                         '}'),
+    "posting-filler": ('{'
+                       '  "type":"posting-filler",'
+                       '  "roundings":{"USD":2},'
+                       '  "metadata-name-fill-base":"fill-base",'
+                       '  "metadata-name-fill-source-id":"fill-source-id"'
+                       '}'),
+    "posting-splitter": ('{'
+                         '  "type":"posting-splitter",'
+                         '  "roundings":{"USD":2},'
+                         '  "metadata-name-type":"split-mode"'
+                         '}'),
+}
+
+BENCHMARKS = {
+    "account_replacer": (account_replacer, ('{'
+                                            '"replace-rules":[{'
+                                            '  "replace-from":"^Expenses:Groceries",'
+                                            '  "replace-to":"Expenses:Food:Groceries"'
+                                            '}]'
+                                            '}')),
+    "balance_pad_creator": (balance_pad_creator, ('{'
+                                                  '"account":"Assets:Broker:Cash",'
+                                                  '"pad-account":"Income:Broker:Interest",'
+                                                  '"metadata-name-balance-unit":"balance-unit",'
+                                                  '"metadata-name-balance-time":"balance-time"'
+                                                  '}')),
+    "txn_splitter": (txn_splitter, ('{'
+                                    '"metadata-name-date":"booking-date",'
+                                    '"transfer-account":"Assets:Bank:DebitCard"'
+                                    '}')),
+    "post_splitter": (post_splitter, ('{'
+                                      '"roundings":{"USD":2},'
+                                      '"metadata-name-type":"split-mode"'
+                                      '}')),
+}
+for manipulator_type, manipulator_config in MANIPULATOR_CONFIGS.items():
+    BENCHMARKS["entry_manipulators:" + manipulator_type] = (entry_manipulators,
+                                                             '{"manipulators": [' + manipulator_config + ']}')
+PLUGIN_CHAIN_CONFIGS = [
+    ("account_replacer", BENCHMARKS["account_replacer"][1]),
+    ("txn_splitter", BENCHMARKS["txn_splitter"][1]),
+    ("post_splitter", BENCHMARKS["post_splitter"][1]),
+    ("entry_manipulators", '{"manipulators": [' + MANIPULATOR_CONFIGS["posting-consolidator-original-price"] + ']}'),
+    ("balance_pad_creator", BENCHMARKS["balance_pad_creator"][1]),
+]
+BENCHMARKS["plugin_chain"] = (plugin_chain, '{"plugins": [' + ','.join(
+    '{"name":"' + name + '", "config":' + config + '}' for name, config in PLUGIN_CHAIN_CONFIGS) + ']}')
+
+
+def time_plugin(plugin, entries, options_map, config_str):
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        new_entries, errors = plugin(entries, options_map, config_str)
+        return time.perf_counter() - start, len(new_entries), len(errors)
+    finally:
+        gc.enable()
+
+
+def run_benchmarks(names, sizes, repeat=1, seed=0):
+    _, _, options_map = loader.load_string("")
+    generator = LedgerGenerator(seed=seed)
+
+    results = {}
+    for size in sizes:
+        for name in names:
+            plugin, config_str = BENCHMARKS[name]
+            best = None
+            for _ in range(repeat):
+                entries = generator.generate(size)
+                entries_in = len(entries)
+                seconds, entries_out, errors = time_plugin(plugin, entries, options_map, config_str)
+                del entries
+                if best is None or seconds < best["seconds"]:
+                    best = {"entries-in": entries_in, "entries-out": entries_out, "errors": errors,
+                            "seconds": seconds}
+            results.setdefault(name, {})[str(size)] = best
+            print("{:<55} {:>9} entries: {:10.3f} s".format(name, size, best["seconds"]), file=sys.stderr)
+
+    return {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "beancount": beancount.__version__,
+        "seed": seed,
+        "repeat": repeat,
+        "sizes": sizes,
+        "results": results,
+    }
+
+
+def compare_reports(report, baseline, max_slowdown=None):
+    regressions = []
+    for name, size_results in report["results"].items():
+        for size, result in size_results.items():
+            baseline_result = baseline["results"].get(name, {}).get(size)
+            if baseline_result is None:
+                print("{:<55} {:>9} entries: {:10.3f} s (no baseline)".format(name, size, result["seconds"]))
+                continue
+
+            ratio = result["seconds"] / baseline_result["seconds"] if baseline_result["seconds"] else float("inf")
+            is_regression = max_slowdown is not None and ratio > max_slowdown
+            if is_regression:
+                regressions.append((name, size, ratio))
+            print("{:<55} {:>9} entries: {:10.3f} s vs {:10.3f} s x{:.2f}{}".format(
+                name, size, result["seconds"], baseline_result["seconds"], ratio,
+                " REGRESSION" if is_regression else ""))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time the plugins on synthetic ledgers.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--benchmarks", nargs="+", default=list(BENCHMARKS), choices=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="compare against a JSON report written earlier")
+    parser.add_argument("--max-slowdown", type=float, help="fail if a benchmark is this many times slower")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.benchmarks, args.sizes, args.repeat, args.seed)
+
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(report, output_file, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if compare_reports(report, baseline, args.max_slowdown):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import datetime
+import random
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from beancount.core import data
+
+FILENAME = "<synthetic>"
+
+CARD_ACCOUNT = "Assets:Bank:Checking"
+BROKER_ACCOUNT = "Assets:Broker:Cash"
+
+TRANSACTION_KINDS = [
+    "card-payment",
+    "discount-receipt",
+    "original-price",
+    "spread-receipt",
+    "fill",
+    "balance-unit",
+    "equal-split",
+    "plain",
+]
+
+ACCOUNTS = [
+    CARD_ACCOUNT,
+    BROKER_ACCOUNT,
+    "Assets:Bank:DebitCard",
+    "Income:Broker:Interest",
+    "Expenses:Groceries",
+    "Expenses:Groceries:Bread",
+    "Expenses:Groceries:Milk",
+    "Expenses:Groceries:Butter",
+    "Expenses:Groceries:Cheese",
+    "Expenses:Hygiene:Soap",
+    "Expenses:Hygiene:Cream",
+    "Expenses:Hygiene:Coupon",
+    "Expenses:Exam",
+    "Expenses:Exam:Written",
+    "Expenses:Exam:Oral",
+    "Expenses:Dining",
+]
+
+
+class LedgerGenerator:
+    def __init__(self, kinds: Optional[List[str]] = None, seed: int = 0, transactions_per_day: int = 50,
+                 start_date: datetime.date = datetime.date(2000, 1, 1), currency: str = "USD"):
+        self.kinds = kinds if kinds is not None else TRANSACTION_KINDS
+        for kind in self.kinds:
+            if kind not in TRANSACTION_KINDS:
+                raise Exception("Transaction kind not implemented: " + kind)
+        self.seed = seed
+        self.transactions_per_day = transactions_per_day
+        self.start_date = start_date
+        self.currency = currency
+
+        self._random = random.Random(seed)
+        self._lineno = 0
+        self._broker_balance = Decimal(0)
+
+    def generate(self, size: int) -> List[data.Directive]:
+        self._random = random.Random(self.seed)
+        self._lineno = 0
+        self._broker_balance = Decimal(0)
+
+        entries = []
+        open_date = self.start_date - datetime.timedelta(days=1)
+        for account in ACCOUNTS:
+            entries.append(data.Open(self._meta(), open_date, account, None, None))
+
+        for index in range(max(0, size - len(entries))):
+            date = self.start_date + datetime.timedelta(days=index // self.transactions_per_day)
+            kind = self.kinds[index % len(self.kinds)]
+            entries.append(getattr(self, "_create_" + kind.replace("-", "_"))(date))
+
+        return entries
+
+    def _create_card_payment(self, date):
+        number = self._number(5, 200)
+        return self._transaction(date, "Shop", "Card payment", [
+            self._posting(CARD_ACCOUNT, -number, {"booking-date": date + datetime.timedelta(days=2)}),
+            self._posting("Expenses:Groceries", number),
+        ])
+
+    def _create_discount_receipt(self, date):
+        bread = self._number(1, 10)
+        milk = self._number(1, 10)
+        butter = self._number(1, 10)
+        discount_1 = self._round((bread + milk) / 10)
+        discount_2 = self._round((milk + butter) / 20)
+        total = bread + milk + butter - discount_1 - discount_2
+        return self._transaction(date, "Supermarket", "Receipt", [
+            self._posting(CARD_ACCOUNT, -total),
+            self._posting("Expenses:Groceries:Bread", bread, {"discount-ids": "1"}),
+            self._posting("Expenses:Groceries:Milk", milk, {"discount-ids": "1,2"}),
+            self._posting("Expenses:Groceries:Butter", butter, {"discount-ids": "2"}),
+        ], {
+            "split-mode": "discount",
+            "discount-1": data.Amount(discount_1, self.currency),
+            "discount-2": data.Amount(discount_2, self.currency),
+        })
+
+    def _create_original_price(self, date):
+        number = self._number(1, 50)
+        original_price = number + self._number(1, 5)
+        return self._transaction(date, "Supermarket", "Cheese", [
+            self._posting(CARD_ACCOUNT, -number),
+            self._posting("Expenses:Groceries:Cheese", number,
+                          {"original-price": data.Amount(original_price, self.currency)}),
+        ])
+
+    def _create_spread_receipt(self, date):
+        soap = self._number(1, 20)
+        cream = self._number(1, 20)
+        coupon = self._round((soap + cream) / 10)
+        return self._transaction(date, "Drugstore", "Receipt", [
+            self._posting(CARD_ACCOUNT, -(soap + cream - coupon)),
+            self._posting("Expenses:Hygiene:Soap", soap, {"spread-target-id": "1"}),
+            self._posting("Expenses:Hygiene:Cream", cream, {"spread-target-id": "1"}),
+            self._posting("Expenses:Hygiene:Coupon", -coupon, {"spread-source-id": "1"}),
+        ])
+
+    def _create_fill(self, date):
+        number = self._number(10, 100)
+        return self._transaction(date, "School", "Exams", [
+            self._posting(CARD_ACCOUNT, -number),
+            self._posting("Expenses:Exam", number, {"fill-source-id": "all", "fill-base": "equal"}),
+            self._posting("Expenses:Exam:Written", Decimal(0)),
+            self._posting("Expenses:Exam:Oral", Decimal(0)),
+        ])
+
+    def _create_balance_unit(self, date):
+        number = self._number(1, 100)
+        self._broker_balance += number
+        balance = self._broker_balance + (1 if self._random.random() < 0.1 else 0)
+        return self._transaction(date, "Broker", "Deposit", [
+            self._posting(CARD_ACCOUNT, -number),
+            self._posting(BROKER_ACCOUNT, number, {
+                "balance-unit": data.Amount(balance, self.currency),
+                "balance-time": "18:00",
+            }),
+        ])
+
+    def _create_equal_split(self, date):
+        number = self._number(10, 100)
+        return self._transaction(date, "Restaurant", "Dinner", [
+            self._posting(CARD_ACCOUNT, -number, {"split-mode": "equal"}),
+            self._posting("Expenses:Dining", Decimal(0)),
+            self._posting("Expenses:Dining", Decimal(0)),
+            self._posting("Expenses:Dining", Decimal(0)),
+        ])
+
+    def _create_plain(self, date):
+        number = self._number(1, 100)
+        return self._transaction(date, None, "Groceries", [
+            self._posting(CARD_ACCOUNT, -number),
+            self._posting("Expenses:Groceries", number),
+        ])
+
+    def _number(self, minimum, maximum) -> Decimal:
+        return Decimal(self._random.randint(minimum * 100, maximum * 100)).scaleb(-2)
+
+    @staticmethod
+    def _round(number) -> Decimal:
+        return number.quantize(Decimal("0.01"))
+
+    def _meta(self, meta: Optional[Dict] = None):
+        self._lineno += 1
+        return data.new_metadata(FILENAME, self._lineno, meta)
+
+    def _posting(self, account, number, meta: Optional[Dict] = None):
+        return data.Posting(account, data.Amount(number, self.currency), None, None, None, self._meta(meta))
+
+    def _transaction(self, date, payee, narration, postings, meta: Optional[Dict] = None):
+        return data.Transaction(self._meta(meta), date, "*", payee, narration, data.EMPTY_SET, data.EMPTY_SET,
+                                postings)
@@ -0,0 +1,64 @@
+import ast
+import sys
+import time
+import tracemalloc
+
+from beancount.core import data
+
+from benchmarks.benchmark import MANIPULATOR_CONFIGS
+from benchmarks.ledger_generator import ACCOUNTS, LedgerGenerator
+from entry_manipulation.entry_manipulators import entry_manipulators
+from entry_manipulation.manipulators.posting_consolidators.spreading.posting_consolidator_spreader import \
+    PostingConsolidatorSpreader
+
+CONFIG_STR = ('{"manipulators": [' + MANIPULATOR_CONFIGS["posting-spreader"] + ','
+              + MANIPULATOR_CONFIGS["posting-filler"] + ']}')
+TRANSACTIONS = 100000
+
+
+def create_entries(count):
+    return LedgerGenerator(kinds=["spread-receipt", "fill"]).generate(len(ACCOUNTS) + count)
+
+
+def measure_wrappers(entries):
+    spreader = PostingConsolidatorSpreader(ast.literal_eval(MANIPULATOR_CONFIGS["posting-spreader"]))
+    transactions = [entry for entry in entries if isinstance(entry, data.Transaction)]
+
+    tracemalloc.start()
+    wrapped_postings = [spreader._posting_wrapper_factory.wrap_postings(entry.postings) for entry in transactions]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    wrapper_count = sum(len(source_postings) + len(target_index.target_postings)
+                        for source_postings, target_index, _ in wrapped_postings)
+    return wrapper_count, current
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else TRANSACTIONS
+    entries = create_entries(count)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    new_entries, _ = entry_manipulators(entries, {}, CONFIG_STR)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    del new_entries
+    allocations = sum(statistic.count for statistic in snapshot.statistics("filename"))
+    wrapper_count, wrapper_memory = measure_wrappers(create_entries(count))
+
+    print("transactions:         {:>10}".format(count))
+    print("time (traced):        {:>10.3f} s".format(elapsed))
+    print("traced memory:        {:>10} KiB".format(current // 1024))
+    print("traced peak memory:   {:>10} KiB".format(peak // 1024))
+    print("live allocations:     {:>10}".format(allocations))
+    print("posting wrappers:     {:>10}".format(wrapper_count))
+    print("wrapper memory:       {:>10} KiB".format(wrapper_memory // 1024))
+    print("bytes per wrapper:    {:>10.1f}".format(wrapper_memory / wrapper_count))
+
+
+if __name__ == '__main__':
+    main()
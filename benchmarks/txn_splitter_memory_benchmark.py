@@ -0,0 +1,42 @@
+import resource
+import sys
+import time
+
+from benchmarks.ledger_generator import ACCOUNTS, LedgerGenerator
+from txn_splitter import txn_splitter
+
+CONFIG_STR = ('{'
+              '"metadata-name-date":"booking-date",'
+              '"transfer-account":"Assets:Bank:DebitCard"'
+              '}')
+TRANSACTIONS = 200000
+
+
+def create_entries(count):
+    return LedgerGenerator(kinds=["card-payment"]).generate(len(ACCOUNTS) + count)
+
+
+def get_peak_rss_kib():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else TRANSACTIONS
+    entries = create_entries(count)
+    peak_rss_before = get_peak_rss_kib()
+
+    start = time.perf_counter()
+    new_entries, _ = txn_splitter(entries, {}, CONFIG_STR)
+    elapsed = time.perf_counter() - start
+    peak_rss_after = get_peak_rss_kib()
+
+    print("transactions:        {:>10}".format(count))
+    print("entries created:     {:>10}".format(len(new_entries)))
+    print("time:                {:>10.3f} s".format(elapsed))
+    print("peak RSS before run: {:>10} KiB".format(peak_rss_before))
+    print("peak RSS after run:  {:>10} KiB".format(peak_rss_after))
+    print("peak RSS growth:     {:>10} KiB".format(peak_rss_after - peak_rss_before))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,8 @@ from typing import Set
 
 
 class AccountConsolidationData(object):
+    __slots__ = ("original_account", "to_account", "additional_accounts")
+
     def __init__(self, from_account: str, to_account: str, additional_accounts: Set[str] = None):
         self.original_account = from_account
         self.to_account = to_account
@@ -11,3 +13,6 @@ class AccountConsolidationData(object):
 
     def add_additional_accounts(self, additional_accounts: Set[str]):
         self.additional_accounts.update(additional_accounts)
+
+    def copy(self) -> "AccountConsolidationData":
+        return AccountConsolidationData(self.original_account, self.to_account, set(self.additional_accounts))
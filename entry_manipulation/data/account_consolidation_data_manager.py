@@ -12,6 +12,11 @@ class AccountConsolidationDataManager:
     def get_account_consolidators(self) -> List[AccountConsolidationData]:
         return list(self._account_consolidators.values())
 
+    def pop_account_consolidators(self) -> List[AccountConsolidationData]:
+        account_consolidators = self.get_account_consolidators()
+        self._account_consolidators = {}
+        return account_consolidators
+
     def add_new_consolidator(self, from_account: data.Account, to_account: data.Account) -> AccountConsolidationData:
         data = AccountConsolidationData(from_account, to_account)
         self._account_consolidators[to_account] = data
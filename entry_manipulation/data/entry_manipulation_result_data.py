@@ -4,6 +4,8 @@ from beancount.core import data
 
 
 class EntryManipulationResultData(object):
+    __slots__ = ("entries", "other_data")
+
     def __init__(self, entries: List[data.Transaction], other_data: List[object] = None):
         self.entries = entries
         self.other_data = other_data
@@ -0,0 +1,53 @@
+from typing import Dict, List
+
+from beancount.core import data
+
+
+class EntryManipulatorStatisticsData(object):
+    def __init__(self, name: str):
+        self.name = name
+        self.seconds = 0.0
+        self.entries_in = 0
+        self.entries_out = 0
+        self.postings_in = 0
+        self.postings_out = 0
+        self.exceptions = 0
+
+    @property
+    def postings_created(self) -> int:
+        return self.postings_out - self.postings_in
+
+    def add_entries(self, entries_in: List[data.Directive], entries_out: List[data.Directive]):
+        self.entries_in += len(entries_in)
+        self.entries_out += len(entries_out)
+        self.postings_in += self.count_postings(entries_in)
+        self.postings_out += self.count_postings(entries_out)
+
+    def merge(self, other: "EntryManipulatorStatisticsData"):
+        self.seconds += other.seconds
+        self.entries_in += other.entries_in
+        self.entries_out += other.entries_out
+        self.postings_in += other.postings_in
+        self.postings_out += other.postings_out
+        self.exceptions += other.exceptions
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "name": self.name,
+            "seconds": self.seconds,
+            "entries-in": self.entries_in,
+            "entries-out": self.entries_out,
+            "postings-in": self.postings_in,
+            "postings-out": self.postings_out,
+            "postings-created": self.postings_created,
+            "exceptions": self.exceptions,
+        }
+
+    def format(self) -> str:
+        return "{}: {:.3f} s, entries {} -> {}, postings {} -> {} ({:+d}), exceptions {}".format(
+            self.name, self.seconds, self.entries_in, self.entries_out, self.postings_in, self.postings_out,
+            self.postings_created, self.exceptions)
+
+    @staticmethod
+    def count_postings(entries: List[data.Directive]) -> int:
+        return sum(len(entry.postings) for entry in entries if isinstance(entry, data.Transaction))
@@ -0,0 +1,50 @@
+import re
+from typing import Iterable, List, Optional
+
+from beancount.core import data
+
+
+class EntryManipulatorTriggerData(object):
+    __slots__ = ("entry_metadata_names", "posting_metadata_names", "account_patterns")
+
+    def __init__(self, entry_metadata_names: Iterable[str] = (), posting_metadata_names: Iterable[str] = (),
+                 account_patterns: Iterable[str] = ()):
+        self.entry_metadata_names = tuple(name for name in entry_metadata_names if name is not None)
+        self.posting_metadata_names = tuple(name for name in posting_metadata_names if name is not None)
+        self.account_patterns = tuple(re.compile(pattern) if isinstance(pattern, str) else pattern
+                                      for pattern in account_patterns)
+
+    def is_triggered(self, entry: data.Transaction) -> bool:
+        if entry.meta:
+            for name in self.entry_metadata_names:
+                if name in entry.meta:
+                    return True
+
+        posting_metadata_names = self.posting_metadata_names
+        account_patterns = self.account_patterns
+        for posting in entry.postings:
+            if posting.meta:
+                for name in posting_metadata_names:
+                    if name in posting.meta:
+                        return True
+            for account_pattern in account_patterns:
+                if account_pattern.search(posting.account):
+                    return True
+        return False
+
+    @staticmethod
+    def combine(triggers: List[Optional["EntryManipulatorTriggerData"]]) -> Optional["EntryManipulatorTriggerData"]:
+        if any(trigger is None for trigger in triggers):
+            return None
+
+        entry_metadata_names = []
+        posting_metadata_names = []
+        account_patterns = []
+        for trigger in triggers:
+            entry_metadata_names.extend(name for name in trigger.entry_metadata_names
+                                        if name not in entry_metadata_names)
+            posting_metadata_names.extend(name for name in trigger.posting_metadata_names
+                                          if name not in posting_metadata_names)
+            account_patterns.extend(pattern for pattern in trigger.account_patterns
+                                    if pattern not in account_patterns)
+        return EntryManipulatorTriggerData(entry_metadata_names, posting_metadata_names, account_patterns)
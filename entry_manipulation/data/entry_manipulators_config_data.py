@@ -0,0 +1,6 @@
+import collections
+
+EntryManipulatorsConfigData = collections.namedtuple(
+    "EntryManipulatorsConfigData",
+    "manipulator_factories manipulator_configs instrumentation incremental workers chunk_size cache_dir streaming"
+)
@@ -0,0 +1,14 @@
+from typing import List, Optional
+
+from beancount.core import data
+
+from .account_consolidation_data import AccountConsolidationData
+
+
+class IncrementalEntryData(object):
+    def __init__(self, entry: data.Directive, manipulated_entries: List[data.Directive],
+                 account_consolidators: List[AccountConsolidationData]):
+        self.entry = entry
+        self.manipulated_entries = manipulated_entries
+        self.account_consolidators = account_consolidators
+        self.consolidated_entries: Optional[List[data.Directive]] = None
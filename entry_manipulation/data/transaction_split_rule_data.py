@@ -0,0 +1,51 @@
+import re
+from typing import Optional, Set
+
+from beancount.core import data
+
+
+class TransactionSplitRuleData(object):
+    __slots__ = ("metadata_name_date", "metadata_name_transfer_account", "transfer_account", "account_pattern",
+                 "dated_posting_move_mode", "stayed_narration", "moved_narration", "metadata_name_moved_narration",
+                 "metadata_names_to_remove")
+
+    def __init__(self, config):
+        self.metadata_name_date = config["metadata-name-date"]
+        self.metadata_name_transfer_account = config.get("metadata-name-transfer-account")
+        self.transfer_account = config.get("transfer-account")
+        self.account_pattern = re.compile(config["account"]) if "account" in config else None
+        self.dated_posting_move_mode = config.get("dated-posting-move-mode")
+        self.stayed_narration = config.get("stayed-narration")
+        self.moved_narration = config.get("moved-narration")
+        self.metadata_name_moved_narration = config.get("metadata-name-moved-narration")
+
+        self.metadata_names_to_remove: Set[str] = {self.metadata_name_date}
+        if self.metadata_name_transfer_account is not None:
+            self.metadata_names_to_remove.add(self.metadata_name_transfer_account)
+        if self.metadata_name_moved_narration is not None:
+            self.metadata_names_to_remove.add(self.metadata_name_moved_narration)
+
+    def is_enabled(self) -> bool:
+        return self.metadata_name_transfer_account is not None or self.transfer_account is not None
+
+    def get_transfer_account(self, posting: data.Posting) -> Optional[str]:
+        if self.metadata_name_transfer_account is not None:
+            return posting.meta.get(self.metadata_name_transfer_account)
+        return self.transfer_account
+
+    def is_split_needed(self, posting: data.Posting) -> bool:
+        if not posting.meta or self.metadata_name_date not in posting.meta:
+            return False
+        if self.account_pattern is not None and not self.account_pattern.search(posting.account):
+            return False
+        return self.get_transfer_account(posting) is not None
+
+    def get_moved_narration(self, posting: data.Posting, narration: str) -> str:
+        if self.metadata_name_moved_narration is not None and self.metadata_name_moved_narration in posting.meta:
+            return posting.meta[self.metadata_name_moved_narration]
+        if self.moved_narration is not None:
+            return self.moved_narration
+        return narration
+
+    def get_stayed_narration(self, narration: str) -> str:
+        return self.stayed_narration if self.stayed_narration is not None else narration
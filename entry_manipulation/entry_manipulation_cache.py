@@ -0,0 +1,153 @@
+import functools
+import gc
+import glob
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from typing import Dict, List, Optional, Tuple
+
+from beancount.core import data
+
+from .data.account_consolidation_data import AccountConsolidationData
+
+CACHE_VERSION = 1
+CACHE_FILE_PREFIX = "entry_manipulators-"
+CACHE_FILE_SUFFIX = ".pickle"
+CACHE_FILE_LIMIT = 8
+LOCATION_META_NAMES = ("filename", "lineno")
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class EntryManipulationCache:
+    def __init__(self, cache_dir: str, manipulator_configs: List[Dict]):
+        self.cache_dir = cache_dir
+        self.config_hash = self.get_config_hash(manipulator_configs)
+        self.cache_path = os.path.join(cache_dir, CACHE_FILE_PREFIX + self.config_hash + CACHE_FILE_SUFFIX)
+        self.records: Dict[str, Tuple] = {}
+        self.used_records: Dict[str, Tuple] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def get_config_hash(manipulator_configs: List[Dict]) -> str:
+        config_json = json.dumps([CACHE_VERSION, EntryManipulationCache.get_code_hash(CODE_DIR), manipulator_configs],
+                                 sort_keys=True, default=repr)
+        return hashlib.sha256(config_json.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_code_hash(code_dir: str) -> str:
+        code_hash = hashlib.sha256()
+        for path in sorted(glob.glob(os.path.join(code_dir, "**", "*.py"), recursive=True)):
+            if path.endswith("_test.py"):
+                continue
+            code_hash.update(os.path.relpath(path, code_dir).encode("utf-8"))
+            with open(path, "rb") as code_file:
+                code_hash.update(code_file.read())
+        return code_hash.hexdigest()
+
+    def load(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        gc.disable()
+        try:
+            with open(self.cache_path, "rb") as cache_file:
+                self.records = pickle.load(cache_file)
+            os.utime(self.cache_path)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.records = {}
+        finally:
+            gc.enable()
+
+    def is_modified(self) -> bool:
+        return self.misses > 0 or len(self.used_records) != len(self.records)
+
+    def save(self):
+        if not self.is_modified():
+            return
+
+        file_descriptor, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as cache_file:
+                pickle.dump(self.used_records, cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.cache_path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        paths = glob.glob(os.path.join(self.cache_dir, CACHE_FILE_PREFIX + "*" + CACHE_FILE_SUFFIX))
+        paths.sort(key=os.path.getmtime, reverse=True)
+        for path in paths[CACHE_FILE_LIMIT:]:
+            if path != self.cache_path:
+                os.remove(path)
+
+    def get(self, fingerprint: str, entry: data.Transaction) \
+            -> Optional[Tuple[List[data.Directive], List[AccountConsolidationData]]]:
+        if fingerprint in self.used_records:
+            record = pickle.loads(pickle.dumps(self.used_records[fingerprint], protocol=pickle.HIGHEST_PROTOCOL))
+        else:
+            record = self.records.get(fingerprint)
+        if record is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        filename, lineno, entries, account_consolidators = record
+        new_filename, new_lineno = entry.meta.get("filename"), entry.meta.get("lineno")
+        self.relocate_entries(entries, filename, lineno, new_filename, new_lineno)
+        self.used_records[fingerprint] = (new_filename, new_lineno, entries, account_consolidators)
+        return entries, [account_consolidator.copy() for account_consolidator in account_consolidators]
+
+    def put(self, fingerprint: str, entry: data.Transaction, entries: List[data.Directive],
+            account_consolidators: List[AccountConsolidationData]):
+        self.used_records[fingerprint] = (entry.meta.get("filename"), entry.meta.get("lineno"), entries,
+                                          [account_consolidator.copy()
+                                           for account_consolidator in account_consolidators])
+
+    @staticmethod
+    def relocate_entries(entries: List[data.Directive], filename: Optional[str], lineno: Optional[int],
+                         new_filename: Optional[str], new_lineno: Optional[int]):
+        if filename == new_filename and lineno == new_lineno:
+            return
+        lineno_delta = new_lineno - lineno if lineno is not None and new_lineno is not None else 0
+
+        visited_meta_ids = set()
+        for entry in entries:
+            metas = [entry.meta]
+            if isinstance(entry, data.Transaction):
+                metas.extend(posting.meta for posting in entry.postings)
+            for meta in metas:
+                if meta is None or id(meta) in visited_meta_ids or meta.get("filename") != filename:
+                    continue
+                visited_meta_ids.add(id(meta))
+                meta["filename"] = new_filename
+                if isinstance(meta.get("lineno"), int):
+                    meta["lineno"] += lineno_delta
+
+    @staticmethod
+    def get_fingerprint(entry: data.Transaction) -> str:
+        get_canonical_meta = EntryManipulationCache.get_canonical_meta
+        canonical_entry = (
+            entry.date, entry.flag, entry.payee, entry.narration,
+            tuple(sorted(entry.tags or ())), tuple(sorted(entry.links or ())),
+            get_canonical_meta(entry.meta),
+            tuple((posting.account,
+                   tuple(posting.units) if posting.units is not None else None,
+                   tuple(posting.cost) if posting.cost is not None else None,
+                   tuple(posting.price) if posting.price is not None else None,
+                   posting.flag,
+                   get_canonical_meta(posting.meta))
+                  for posting in entry.postings),
+        )
+        return hashlib.sha256(repr(canonical_entry).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def get_canonical_meta(meta: Optional[Dict]) -> Tuple:
+        if meta is None:
+            return ()
+        return tuple((key, tuple(value) if isinstance(value, tuple) else value)
+                     for key, value in meta.items() if key not in LOCATION_META_NAMES)
@@ -1,14 +1,21 @@
 from abc import abstractmethod, ABC
+from typing import Optional
 
 from beancount.core import data
 
 from .data.entry_manipulation_result_data import EntryManipulationResultData
+from .data.entry_manipulator_trigger_data import EntryManipulatorTriggerData
 
 
 class EntryManipulatorBase(ABC):
+    config_keys = frozenset({"type"})
+
     def __init__(self, config):
         self.config = config
 
+    def get_trigger(self) -> Optional[EntryManipulatorTriggerData]:
+        return None
+
     @abstractmethod
     def execute(self, entry: data.Transaction) -> EntryManipulationResultData:
         pass
@@ -1,11 +1,25 @@
 import ast
-from typing import Dict, List, Optional
+import collections
+import functools
+import heapq
+import logging
+import math
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from beancount.core import data
 
 from .data.account_consolidation_data import AccountConsolidationData
 from .data.entry_manipulation_result_data import EntryManipulationResultData
+from .data.entry_manipulator_statistics_data import EntryManipulatorStatisticsData
+from .data.entry_manipulator_trigger_data import EntryManipulatorTriggerData
+from .data.entry_manipulators_config_data import EntryManipulatorsConfigData
+from .data.incremental_entry_data import IncrementalEntryData
+from .entry_manipulation_cache import EntryManipulationCache
 from .entry_manipulator_base import EntryManipulatorBase
+from .instrumented_entry_manipulator import InstrumentedEntryManipulator
 from .manipulators.posting_consolidators.filling.posting_consolidator_filler import PostingConsolidatorFiller
 from .manipulators.posting_consolidators.extracting.posting_consolidator_original_price import \
     PostingConsolidatorOriginalPrice
@@ -13,83 +27,460 @@ from .manipulators.posting_consolidators.spreading.posting_consolidator_spreader
 from .manipulators.posting_splitter import PostingSplitter
 from .manipulators.transaction_splitter import TransactionSplitter
 
+logger = logging.getLogger(__name__)
+
+EntryManipulatorStatisticsError = collections.namedtuple(
+    "EntryManipulatorStatisticsError", "source message entry"
+)
+
+CONFIG_KEYS = frozenset({"manipulators", "instrumentation", "incremental", "workers", "chunk-size", "cache-dir",
+                         "streaming"})
+MANIPULATOR_FACTORIES = {
+    "transaction-splitter": TransactionSplitter,
+    "posting-consolidator-original-price": PostingConsolidatorOriginalPrice,
+    "posting-spreader": PostingConsolidatorSpreader,
+    "posting-filler": PostingConsolidatorFiller,
+    "posting-splitter": PostingSplitter,
+}
+
 
 class EntryManipulatorOrchestrator:
     def __init__(self):
         self.account_consolidators: Dict[str, AccountConsolidationData] = {}
+        self.statistics: List[EntryManipulatorStatisticsData] = []
+        self.cache: Optional[EntryManipulationCache] = None
+        self.incremental_entries: Optional[Dict[int, IncrementalEntryData]] = None
+        self.incremental_new_entries: List[data.Directive] = []
+        self.config_str: Optional[str] = None
 
     def execute(self, entries, options_map, config_str=""):
+        config = self.get_config(config_str)
+        self.config_str = config_str
+        self.account_consolidators = {}
+        self.statistics = []
+        self.cache = None
+        self.incremental_entries = None
+        self.incremental_new_entries = []
+
+        try:
+            consolidated_entries = self.manipulate_and_consolidate_entries(entries, config)
+        finally:
+            self.log_statistics(config)
+        return consolidated_entries, self.get_statistics_errors(config)
+
+    def execute_incremental(self, previous_entries, previous_new_entries, removed_entries, added_entries,
+                            options_map, config_str=""):
+        if self.incremental_entries is None or config_str != self.config_str:
+            raise Exception("Incremental update needs a previous incremental run with the same config")
+
+        config = self.get_config(config_str)
+        self.statistics = []
+        if not self.is_previous_result(previous_new_entries):
+            for incremental_entry in self.incremental_entries.values():
+                incremental_entry.consolidated_entries = None
+
+        removed_ids = {id(entry) for entry in removed_entries}
+        kept_entries = [entry for entry in previous_entries if id(entry) not in removed_ids]
+        entries = list(heapq.merge(kept_entries, sorted(added_entries, key=data.entry_sortkey),
+                                   key=data.entry_sortkey))
+        try:
+            consolidated_entries = self.manipulate_and_consolidate_entries_incremental(entries, config)
+        finally:
+            self.log_statistics(config)
+        return consolidated_entries, self.get_statistics_errors(config)
+
+    def is_previous_result(self, previous_new_entries) -> bool:
+        if len(previous_new_entries) != len(self.incremental_new_entries):
+            return False
+        return all(new_entry is incremental_new_entry
+                   for new_entry, incremental_new_entry in zip(previous_new_entries, self.incremental_new_entries))
+
+    def log_statistics(self, config):
+        if config.instrumentation == "log":
+            for statistics in self.statistics:
+                logger.info(statistics.format())
+
+    def get_statistics_errors(self, config):
+        errors = []
+        if config.instrumentation == "errors":
+            for statistics in self.statistics:
+                errors.append(EntryManipulatorStatisticsError(
+                    data.new_metadata("<entry_manipulators>", 0), statistics.format(), None))
+        return errors
+
+    def manipulate_and_consolidate_entries(self, entries, config):
+        is_instrumented = config.instrumentation is not None
+
+        if config.incremental:
+            self.incremental_entries = {}
+            return self.manipulate_and_consolidate_entries_incremental(entries, config)
+
+        workers = config.workers
+        if config.cache_dir is not None:
+            manipulators = self.get_manipulators(config)
+            if is_instrumented:
+                manipulators, self.statistics = self.instrument_manipulators(manipulators)
+            manipulated_entries = self.manipulate_entries_cached(entries, config, manipulators)
+        elif workers is not None and workers > 1:
+            manipulated_entries = self.manipulate_entries_parallel(entries, config, workers)
+        else:
+            manipulators = self.get_manipulators(config)
+            if is_instrumented:
+                manipulators, self.statistics = self.instrument_manipulators(manipulators)
+            if config.streaming:
+                manipulated_entries = list(self.iter_manipulated_entries(entries, manipulators))
+            else:
+                manipulated_entries = self.manipulate_entries(entries, manipulators)
+
+        if not is_instrumented:
+            return self.consolidate_entries(self.drain_entries(manipulated_entries))
+
+        return self.consolidate_entries_instrumented(
+            partial(self.consolidate_entries, self.drain_entries(manipulated_entries)), len(manipulated_entries))
+
+    def consolidate_entries_instrumented(self, consolidate, entries_in):
+        statistics = EntryManipulatorStatisticsData("consolidation")
+        self.statistics.append(statistics)
+        start = time.perf_counter()
+        consolidated_entries = consolidate()
+        statistics.seconds = time.perf_counter() - start
+        statistics.entries_in = entries_in
+        statistics.entries_out = len(consolidated_entries)
+        statistics.postings_in = statistics.postings_out = statistics.count_postings(consolidated_entries)
+        return consolidated_entries
+
+    def manipulate_and_consolidate_entries_incremental(self, entries, config):
+        manipulators = None
+        if config.instrumentation is not None:
+            manipulators, self.statistics = self.instrument_manipulators(self.get_manipulators(config))
+        previous_account_consolidators = self.account_consolidators
+        self.account_consolidators = {}
+
+        incremental_entries: Dict[int, IncrementalEntryData] = {}
+        ordered_incremental_entries: List[IncrementalEntryData] = []
+        for entry in entries:
+            incremental_entry = self.incremental_entries.get(id(entry))
+            if incremental_entry is None or incremental_entry.entry is not entry:
+                if manipulators is None:
+                    manipulators = self.get_manipulators(config)
+                manipulated_entries, account_consolidators = self.manipulate_chunk([entry], manipulators)
+                incremental_entry = IncrementalEntryData(entry, manipulated_entries, account_consolidators)
+            incremental_entries[id(entry)] = incremental_entry
+            ordered_incremental_entries.append(incremental_entry)
+            self.add_account_consolidators([account_consolidator.copy()
+                                            for account_consolidator in incremental_entry.account_consolidators])
+        self.incremental_entries = incremental_entries
+
+        changed_accounts = self.get_changed_accounts(previous_account_consolidators, self.account_consolidators)
+        if config.instrumentation is None:
+            self.incremental_new_entries = self.consolidate_entries_incremental(ordered_incremental_entries,
+                                                                                changed_accounts)
+        else:
+            self.incremental_new_entries = self.consolidate_entries_instrumented(
+                partial(self.consolidate_entries_incremental, ordered_incremental_entries, changed_accounts),
+                sum(len(incremental_entry.manipulated_entries) for incremental_entry in ordered_incremental_entries))
+        return list(self.incremental_new_entries)
+
+    def consolidate_entries_incremental(self, incremental_entries: List[IncrementalEntryData],
+                                        changed_accounts: Set[str]) -> List[data.Directive]:
+        consolidated_entries = []
+        for incremental_entry in incremental_entries:
+            if incremental_entry.consolidated_entries is None \
+                    or self.is_any_account_used(incremental_entry.manipulated_entries, changed_accounts):
+                incremental_entry.consolidated_entries = self.consolidate_entries(
+                    incremental_entry.manipulated_entries)
+            consolidated_entries.extend(incremental_entry.consolidated_entries)
+        return consolidated_entries
+
+    @staticmethod
+    def get_changed_accounts(account_consolidators: Dict[str, AccountConsolidationData],
+                             other_account_consolidators: Dict[str, AccountConsolidationData]) -> Set[str]:
+        changed_accounts = set()
+        for account in set(account_consolidators).union(other_account_consolidators):
+            account_consolidator = account_consolidators.get(account)
+            other_account_consolidator = other_account_consolidators.get(account)
+            if account_consolidator is None or other_account_consolidator is None \
+                    or account_consolidator.to_account != other_account_consolidator.to_account \
+                    or account_consolidator.additional_accounts != other_account_consolidator.additional_accounts:
+                changed_accounts.add(account)
+        return changed_accounts
+
+    @staticmethod
+    def is_any_account_used(entries: List[data.Directive], accounts: Set[str]) -> bool:
+        if not accounts:
+            return False
+
+        for entry in entries:
+            if isinstance(entry, data.Open) and entry.account in accounts:
+                return True
+            if isinstance(entry, data.Transaction) and any(posting.account in accounts for posting in entry.postings):
+                return True
+        return False
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_config(config_str) -> EntryManipulatorsConfigData:
         config = {}
         expr = ast.literal_eval(config_str)
         config.update(expr)
+        EntryManipulatorOrchestrator.check_config_keys(config, CONFIG_KEYS)
 
-        manipulators = self.get_manipulators(config)
-        manipulated_entries = self.manipulate_entries(entries, manipulators)
-        consolidated_entries = self.consolidate_entries(manipulated_entries)
+        instrumentation = config.get("instrumentation")
+        if instrumentation not in (None, "report", "errors", "log"):
+            raise Exception("Instrumentation not implemented: " + instrumentation)
+        for name in ("workers", "chunk-size"):
+            if config.get(name) is not None and (not isinstance(config[name], int) or config[name] < 1):
+                raise Exception("Config value must be a positive integer: " + name)
+        mode_names = [name for name in ("incremental", "cache-dir", "streaming") if config.get(name)]
+        if config.get("workers") is not None and config["workers"] > 1:
+            mode_names.append("workers")
+        if len(mode_names) > 1:
+            raise Exception("Config keys can not be combined: " + ", ".join(mode_names))
+
+        manipulator_factories = []
+        for manipulator_config in config["manipulators"]:
+            manipulator_factory = MANIPULATOR_FACTORIES.get(manipulator_config.get("type"))
+            if manipulator_factory is None:
+                raise Exception("Manipulator type not implemented: " + str(manipulator_config.get("type")))
+            EntryManipulatorOrchestrator.check_config_keys(manipulator_config, manipulator_factory.config_keys)
+            manipulator_factories.append((manipulator_factory, manipulator_config))
 
-        return consolidated_entries, []
+        return EntryManipulatorsConfigData(tuple(manipulator_factories), tuple(config["manipulators"]),
+                                           instrumentation, bool(config.get("incremental")), config.get("workers"),
+                                           config.get("chunk-size"), config.get("cache-dir"),
+                                           bool(config.get("streaming")))
 
     @staticmethod
-    def get_manipulators(config):
+    def check_config_keys(config, config_keys):
+        unknown_keys = sorted(key for key in config if key not in config_keys)
+        if len(unknown_keys) > 0:
+            raise Exception("Config key not implemented: " + ", ".join(map(str, unknown_keys)))
+
+    @staticmethod
+    def get_manipulators(config: EntryManipulatorsConfigData):
         manipulators: List[EntryManipulatorBase] = []
-        manipulator_factories = {
-            "transaction-splitter": TransactionSplitter,
-            "posting-consolidator-original-price": PostingConsolidatorOriginalPrice,
-            "posting-spreader": PostingConsolidatorSpreader,
-            "posting-filler": PostingConsolidatorFiller,
-            "posting-splitter": PostingSplitter,
-        }
-        for manipulator_config in config["manipulators"]:
-            manipulator_factory = manipulator_factories.get(manipulator_config["type"])
-            if manipulator_factory is not None:
-                manipulators.append(manipulator_factory(manipulator_config))
-            else:
-                raise Exception("Manipulator type not implemented: " + manipulator_config["type"])
+        for manipulator_factory, manipulator_config in config.manipulator_factories:
+            manipulators.append(manipulator_factory(manipulator_config))
         return manipulators
 
+    @staticmethod
+    def instrument_manipulators(manipulators: List[EntryManipulatorBase]) \
+            -> Tuple[List[EntryManipulatorBase], List[EntryManipulatorStatisticsData]]:
+        instrumented_manipulators: List[EntryManipulatorBase] = []
+        statistics_collection: List[EntryManipulatorStatisticsData] = []
+        for manipulator in manipulators:
+            statistics = EntryManipulatorStatisticsData(manipulator.config["type"])
+            instrumented_manipulators.append(InstrumentedEntryManipulator(manipulator, statistics))
+            statistics_collection.append(statistics)
+        return instrumented_manipulators, statistics_collection
+
     def manipulate_entries(self, entries, manipulators):
+        manipulated_entries, account_consolidators = self.manipulate_chunk(entries, manipulators)
+        self.add_account_consolidators(account_consolidators)
+        return manipulated_entries
+
+    def manipulate_entries_cached(self, entries, config, manipulators):
+        self.cache = EntryManipulationCache(config.cache_dir, list(config.manipulator_configs))
+        self.cache.load()
+
+        combined_trigger = EntryManipulatorTriggerData.combine([manipulator.get_trigger()
+                                                                for manipulator in manipulators])
+        manipulated_entries = []
+        for entry in entries:
+            if not isinstance(entry, data.Transaction) \
+                    or (combined_trigger is not None and not combined_trigger.is_triggered(entry)):
+                manipulated_entries.append(entry)
+                continue
+
+            fingerprint = self.cache.get_fingerprint(entry)
+            cached_result = self.cache.get(fingerprint, entry)
+            if cached_result is None:
+                cached_result = self.manipulate_chunk([entry], manipulators)
+                self.cache.put(fingerprint, entry, *cached_result)
+
+            entry_manipulated_entries, account_consolidators = cached_result
+            manipulated_entries.extend(entry_manipulated_entries)
+            self.add_account_consolidators(account_consolidators)
+
+        self.cache.save()
+        return manipulated_entries
+
+    def manipulate_entries_parallel(self, entries, config, workers):
+        manipulators = self.get_manipulators(config)
+        if config.instrumentation is not None:
+            _, self.statistics = self.instrument_manipulators(manipulators)
+        combined_trigger = EntryManipulatorTriggerData.combine([manipulator.get_trigger()
+                                                                for manipulator in manipulators])
+        triggered_entries = [entry for entry in entries
+                             if isinstance(entry, data.Transaction)
+                             and (combined_trigger is None or combined_trigger.is_triggered(entry))]
+
+        chunk_size = config.chunk_size
+        if chunk_size is None:
+            chunk_size = max(1, math.ceil(len(triggered_entries) / (workers * 4)))
+        chunks = [triggered_entries[index:index + chunk_size]
+                  for index in range(0, len(triggered_entries), chunk_size)]
+
+        triggered_results = []
+        if chunks:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for chunk_results, chunk_account_consolidators, chunk_statistics in executor.map(
+                        partial(EntryManipulatorOrchestrator.manipulate_chunk_with_config, config), chunks):
+                    triggered_results.extend(chunk_results)
+                    self.add_account_consolidators(chunk_account_consolidators)
+                    self.add_statistics(chunk_statistics)
+
+        manipulated_entries = []
+        triggered_index = 0
+        for entry in entries:
+            if triggered_index < len(triggered_entries) and entry is triggered_entries[triggered_index]:
+                manipulated_entries.extend(triggered_results[triggered_index])
+                triggered_index += 1
+            else:
+                manipulated_entries.append(entry)
+        return manipulated_entries
+
+    @staticmethod
+    def manipulate_chunk_with_config(config, entries) \
+            -> Tuple[List[List], List[AccountConsolidationData], List[EntryManipulatorStatisticsData]]:
+        manipulators = EntryManipulatorOrchestrator.get_manipulators(config)
+        statistics: List[EntryManipulatorStatisticsData] = []
+        if config.instrumentation is not None:
+            manipulators, statistics = EntryManipulatorOrchestrator.instrument_manipulators(manipulators)
+        triggers = [manipulator.get_trigger() for manipulator in manipulators]
+
+        other_data_collection: List[object] = []
+        manipulated_entries = [EntryManipulatorOrchestrator.manipulate_entry(entry, manipulators, triggers,
+                                                                             other_data_collection)
+                               for entry in entries]
+        account_consolidators: Dict[str, AccountConsolidationData] = {}
+        EntryManipulatorOrchestrator.merge_account_consolidators(account_consolidators, other_data_collection)
+        return manipulated_entries, list(account_consolidators.values()), statistics
+
+    def add_statistics(self, statistics_collection: List[EntryManipulatorStatisticsData]):
+        if not self.statistics:
+            self.statistics = statistics_collection
+            return
+
+        for statistics, other_statistics in zip(self.statistics, statistics_collection):
+            statistics.merge(other_statistics)
+
+    def get_statistics_report(self) -> List[Dict[str, object]]:
+        return [statistics.to_dict() for statistics in self.statistics]
+
+    @staticmethod
+    def manipulate_chunk(entries, manipulators) -> Tuple[List, List[AccountConsolidationData]]:
         manipulated_entries = []
         other_data_collection: List[object] = []
+        triggers = [manipulator.get_trigger() for manipulator in manipulators]
+        combined_trigger = EntryManipulatorTriggerData.combine(triggers)
 
         for entry in entries:
-            if not isinstance(entry, data.Transaction):
+            if not isinstance(entry, data.Transaction) \
+                    or (combined_trigger is not None and not combined_trigger.is_triggered(entry)):
                 manipulated_entries.append(entry)
                 continue
 
-            current_entries_to_process = [entry]
-            for manipulator in manipulators:
-                next_entries_to_process = []
-                for current_entry_to_process in current_entries_to_process:
-                    result: Optional[EntryManipulationResultData]
-                    try:
-                        result = manipulator.execute(current_entry_to_process)
-                    except Exception as e:
-                        raise Exception(current_entry_to_process) from e
-                    next_entries_to_process.extend(result.entries)
-                    if result.other_data:
-                        other_data_collection.extend(result.other_data)
-                current_entries_to_process = next_entries_to_process
-
-            manipulated_entries.extend(current_entries_to_process)
+            manipulated_entries.extend(EntryManipulatorOrchestrator.manipulate_entry(entry, manipulators, triggers,
+                                                                                     other_data_collection))
 
+        account_consolidators: Dict[str, AccountConsolidationData] = {}
+        EntryManipulatorOrchestrator.merge_account_consolidators(account_consolidators, other_data_collection)
+        return manipulated_entries, list(account_consolidators.values())
+
+    @staticmethod
+    def manipulate_entry(entry, manipulators, triggers, other_data_collection: List[object]) -> List:
+        current_entries_to_process = [entry]
+        for manipulator, trigger in zip(manipulators, triggers):
+            next_entries_to_process = []
+            for current_entry_to_process in current_entries_to_process:
+                if trigger is not None and not trigger.is_triggered(current_entry_to_process):
+                    next_entries_to_process.append(current_entry_to_process)
+                    continue
+
+                result: Optional[EntryManipulationResultData]
+                try:
+                    result = manipulator.execute(current_entry_to_process)
+                except Exception as e:
+                    raise Exception(current_entry_to_process) from e
+                next_entries_to_process.extend(result.entries)
+                if result.other_data:
+                    other_data_collection.extend(result.other_data)
+            current_entries_to_process = next_entries_to_process
+        return current_entries_to_process
+
+    def iter_manipulated_entries(self, entries: Iterable, manipulators) -> Iterator:
+        combined_trigger = EntryManipulatorTriggerData.combine([manipulator.get_trigger()
+                                                                for manipulator in manipulators])
+        for entry in entries:
+            if not isinstance(entry, data.Transaction) \
+                    or (combined_trigger is not None and not combined_trigger.is_triggered(entry)):
+                yield entry
+                continue
+
+            other_data_collections: List[List[object]] = [[] for _ in manipulators]
+            entries_to_process = iter([entry])
+            for manipulator, other_data_collection in zip(manipulators, other_data_collections):
+                entries_to_process = self.iter_manipulator_results(entries_to_process, manipulator,
+                                                                   other_data_collection)
+            yield from entries_to_process
+
+            for other_data_collection in other_data_collections:
+                self.add_account_consolidators(other_data_collection)
+
+    @staticmethod
+    def iter_manipulator_results(entries: Iterator, manipulator: EntryManipulatorBase,
+                                 other_data_collection: List[object]) -> Iterator:
+        trigger = manipulator.get_trigger()
+        for entry in entries:
+            if trigger is not None and not trigger.is_triggered(entry):
+                yield entry
+                continue
+
+            result: Optional[EntryManipulationResultData]
+            try:
+                result = manipulator.execute(entry)
+            except Exception as e:
+                raise Exception(entry) from e
+            if result.other_data:
+                other_data_collection.extend(result.other_data)
+            yield from result.entries
+
+    @staticmethod
+    def drain_entries(entries: List) -> Iterator:
+        for index in range(len(entries)):
+            entry = entries[index]
+            entries[index] = None
+            yield entry
+
+    def add_account_consolidators(self, other_data_collection: List[object]):
+        self.merge_account_consolidators(self.account_consolidators, other_data_collection)
+
+    @staticmethod
+    def merge_account_consolidators(account_consolidators: Dict[str, AccountConsolidationData],
+                                    other_data_collection: List[object]):
         for other_data in other_data_collection:
             if not isinstance(other_data, AccountConsolidationData):
                 continue
 
-            account_consolidator = self.account_consolidators.get(other_data.original_account)
+            account_consolidator = account_consolidators.get(other_data.original_account)
             if account_consolidator is None:
-                self.account_consolidators[other_data.original_account] = other_data
+                account_consolidators[other_data.original_account] = other_data
             else:
                 account_consolidator.add_additional_accounts(other_data.additional_accounts)
 
-        return manipulated_entries
-
     def consolidate_entries(self, entries):
-        consolidated_entries = []
+        return list(self.iter_consolidated_entries(entries))
+
+    def iter_consolidated_entries(self, entries: Iterable) -> Iterator:
         for entry in entries:
             if isinstance(entry, data.Open) and entry.account in self.account_consolidators:
-                consolidated_entries.extend(self.consolidate_open(entry))
+                yield from self.consolidate_open(entry)
             elif isinstance(entry, data.Transaction):
+                if not any(posting.account in self.account_consolidators for posting in entry.postings):
+                    yield entry
+                    continue
+
                 new_postings = []
                 for posting in entry.postings:
                     account_consolidator = self.account_consolidators.get(posting.account)
@@ -101,10 +492,9 @@ class EntryManipulatorOrchestrator:
                     new_postings.append(new_posting)
                 consolidated_entry = data.Transaction(entry.meta, entry.date, entry.flag, entry.payee, entry.narration,
                                                       entry.tags, entry.links, new_postings)
-                consolidated_entries.append(consolidated_entry)
+                yield consolidated_entry
             else:
-                consolidated_entries.append(entry)
-        return consolidated_entries
+                yield entry
 
     def consolidate_open(self, entry):
         consolidated_entries = []
@@ -112,7 +502,7 @@ class EntryManipulatorOrchestrator:
         consolidated_entry = data.Open(entry.meta, entry.date, account_consolidator.to_account,
                                        entry.currencies, entry.booking)
         consolidated_entries.append(consolidated_entry)
-        for additional_account in account_consolidator.additional_accounts:
+        for additional_account in sorted(account_consolidator.additional_accounts):
             consolidated_entry = data.Open(entry.meta, entry.date, additional_account,
                                            entry.currencies, entry.booking)
             consolidated_entries.append(consolidated_entry)
@@ -0,0 +1,410 @@
+import datetime
+import os
+import shutil
+import tempfile
+import unittest
+
+from beancount import loader
+from beancount.parser import cmptest, printer
+
+from entry_manipulation.entry_manipulation_cache import CACHE_FILE_LIMIT, CACHE_FILE_PREFIX, CACHE_FILE_SUFFIX, \
+    CODE_DIR, EntryManipulationCache
+from entry_manipulation.entry_manipulator_orchestrator import EntryManipulatorOrchestrator
+from entry_manipulation.entry_manipulators import entry_manipulator_orchestrator_obj, entry_manipulators, \
+    entry_manipulators_incremental
+
+LEDGER = """
+2010-08-31 open Expenses:Bread
+2010-08-31 open Expenses:Hygiene:BarSoap
+2010-08-31 open Expenses:Hygiene:Cream
+
+2013-05-31 * "Paid by card"
+    Assets:Bank:Checking      -100 USD
+        booking-date: 2013-06-03
+    Expenses:Bread             100 USD
+
+2013-06-03 * "Purchase"
+    Assets:Bank:Checking      -10 USD
+    Expenses:Bread             10 USD
+        original-price:        12 USD
+
+2013-06-04 * "Purchase"
+    Assets:Bank:Checking                       -8,154 HUF
+    Expenses:Hygiene:Cream                        100 HUF
+    Expenses:Hygiene:BarSoap                  (2+4)*4 PCS_DOVE_BAR_SOAP {1,699/4 HUF}
+    Expenses:Hygiene:BarSoap             -(680+1,360) HUF
+        discount-account: "Tesco:Clubcard"
+
+2013-06-05 * "Purchase"
+    Assets:Bank:Checking                       -8,154 HUF
+    Expenses:Hygiene:BarSoap                  (2+4)*4 PCS_DOVE_BAR_SOAP {1,699/4 HUF}
+    Expenses:Hygiene:BarSoap             -(680+1,360) HUF
+        discount-account: "Tesco:Coupon"
+
+2013-06-06 * "Purchase"
+    Assets:Bank:Checking      -20 USD
+    Expenses:Bread             20 USD
+        original-price:        25 USD
+"""
+
+MANIPULATORS_CONFIG = ('{'
+                       '  "type":"transaction-splitter",'
+                       '  "metadata-name-date":"booking-date",'
+                       '  "transfer-account":"Liabilities:Bank:DebitCard",'
+                       '  "dated-posting-move-mode":"move"'
+                       '},'
+                       '{'
+                       '  "type":"posting-consolidator-original-price",'
+                       '  "consolidate-price-account-postfix":"Price",'
+                       '  "consolidate-discount-account-postfix":"Discount",'
+                       '  "metadata-name-original-price":"original-price"'
+                       '},'
+                       '{'
+                       '  "type":"posting-spreader",'
+                       '  "consolidate-price-account-postfix":"Price",'
+                       '  "spread-base":"unit",'
+                       '  "match-mode":"same-account",'
+                       '  "metadata-name-spread-account-postfix":"discount-account"'
+                       '}')
+
+
+class EntryManipulatorOrchestratorTest(cmptest.TestCase):
+    @staticmethod
+    def run_manipulators(config_str):
+        entries, _, options_map = loader.load_string(LEDGER)
+        new_entries, _ = entry_manipulators(entries, options_map, config_str)
+        return new_entries
+
+    def test_parallel_matches_serial(self):
+        serial_entries = self.run_manipulators('{"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+        parallel_entries = self.run_manipulators('{"workers": 2, "chunk-size": 1, '
+                                                 '"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+
+        self.assertEqual(serial_entries, parallel_entries)
+        self.assertEqual([printer.format_entry(entry) for entry in serial_entries],
+                         [printer.format_entry(entry) for entry in parallel_entries])
+
+    def test_parallel_sends_only_triggered_transactions(self):
+        entries, _, options_map = loader.load_string(LEDGER + """
+2013-06-07 * "Purchase"
+    Assets:Bank:Checking      -5 USD
+    Expenses:Food              5 USD
+""")
+        untriggered_entry = entries[-1]
+
+        new_entries, _ = entry_manipulators(entries, options_map, '{"workers": 2, "chunk-size": 1, '
+                                                                  '"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+
+        self.assertIs(untriggered_entry, new_entries[-1])
+
+    def test_streaming_matches_batch(self):
+        batch_entries = self.run_manipulators('{"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+        streamed_entries = self.run_manipulators('{"streaming": True, '
+                                                 '"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+
+        self.assertEqual(batch_entries, streamed_entries)
+
+    def test_parallel_consolidates_accounts_across_chunks(self):
+        new_entries = self.run_manipulators('{"workers": 2, "chunk-size": 2, '
+                                            '"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+
+        self.assertEqualEntries(
+            """
+        2010-08-31 open Expenses:Bread:Price
+        2010-08-31 open Expenses:Bread:Discount
+        2010-08-31 open Expenses:Hygiene:BarSoap:Price
+        2010-08-31 open Expenses:Hygiene:BarSoap:Tesco:Clubcard
+        2010-08-31 open Expenses:Hygiene:BarSoap:Tesco:Coupon
+        2010-08-31 open Expenses:Hygiene:Cream
+
+        2013-05-31 * "Paid by card"
+            Liabilities:Bank:DebitCard      -100 USD
+            Expenses:Bread:Price             100 USD
+
+        2013-06-03 * "Paid by card"
+            Assets:Bank:Checking            -100 USD
+            Liabilities:Bank:DebitCard       100 USD
+
+        2013-06-03 * "Purchase"
+            Assets:Bank:Checking      -10 USD
+            Expenses:Bread:Price       12 USD
+            Expenses:Bread:Discount    -2 USD
+
+        2013-06-04 * "Purchase"
+            Assets:Bank:Checking                             -8,154 HUF
+            Expenses:Hygiene:Cream                              100 HUF
+            Expenses:Hygiene:BarSoap:Price                  (2+4)*4 PCS_DOVE_BAR_SOAP {1,699/4-(680+1,360)/((2+4)*4) HUF}
+            Expenses:Hygiene:BarSoap:Price              (680+1,360) HUF
+            Expenses:Hygiene:BarSoap:Tesco:Clubcard    -(680+1,360) HUF
+
+        2013-06-05 * "Purchase"
+            Assets:Bank:Checking                             -8,154 HUF
+            Expenses:Hygiene:BarSoap:Price                  (2+4)*4 PCS_DOVE_BAR_SOAP {1,699/4-(680+1,360)/((2+4)*4) HUF}
+            Expenses:Hygiene:BarSoap:Price              (680+1,360) HUF
+            Expenses:Hygiene:BarSoap:Tesco:Coupon      -(680+1,360) HUF
+
+        2013-06-06 * "Purchase"
+            Assets:Bank:Checking      -20 USD
+            Expenses:Bread:Price       25 USD
+            Expenses:Bread:Discount    -5 USD
+        """,
+            new_entries,
+        )
+
+    def run_cached_manipulators(self, ledger, config_str):
+        entries, _, options_map = loader.load_string(ledger)
+        orchestrator = EntryManipulatorOrchestrator()
+        new_entries, _ = orchestrator.execute(entries, options_map, config_str)
+        return new_entries, orchestrator.cache
+
+    def test_cache_matches_uncached(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            config_str = '{"cache-dir": ' + repr(cache_dir) + ', "manipulators": [' + MANIPULATORS_CONFIG + ']}'
+            cold_entries, cold_cache = self.run_cached_manipulators(LEDGER, config_str)
+            warm_entries, warm_cache = self.run_cached_manipulators(LEDGER, config_str)
+
+        self.assertEqual((0, 5), (cold_cache.hits, cold_cache.misses))
+        self.assertEqual((5, 0), (warm_cache.hits, warm_cache.misses))
+        self.assertEqual(self.run_manipulators('{"manipulators": [' + MANIPULATORS_CONFIG + ']}'), cold_entries)
+        self.assertEqual(cold_entries, warm_entries)
+
+    def test_cache_recomputes_edited_transactions(self):
+        edited_ledger = "2010-08-31 open Assets:Bank:Checking\n" + LEDGER.replace("original-price:        25 USD",
+                                                                                  "original-price:        30 USD")
+        with tempfile.TemporaryDirectory() as cache_dir:
+            config_str = '{"cache-dir": ' + repr(cache_dir) + ', "manipulators": [' + MANIPULATORS_CONFIG + ']}'
+            self.run_cached_manipulators(LEDGER, config_str)
+            new_entries, cache = self.run_cached_manipulators(edited_ledger, config_str)
+
+        self.assertEqual((4, 1), (cache.hits, cache.misses))
+        entries, _, options_map = loader.load_string(edited_ledger)
+        expected_entries, _ = entry_manipulators(entries, options_map,
+                                                 '{"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+        self.assertEqual(expected_entries, new_entries)
+
+    def test_cache_skips_untriggered_transactions(self):
+        manipulators_config = MANIPULATORS_CONFIG[:MANIPULATORS_CONFIG.index(',{  "type":"posting-spreader"')]
+        with tempfile.TemporaryDirectory() as cache_dir:
+            config_str = '{"cache-dir": ' + repr(cache_dir) + ', "manipulators": [' + manipulators_config + ']}'
+            new_entries, cache = self.run_cached_manipulators(LEDGER, config_str)
+
+        self.assertEqual((0, 3), (cache.hits, cache.misses))
+        self.assertEqual(3, len(cache.used_records))
+        self.assertEqual(self.run_manipulators('{"manipulators": [' + manipulators_config + ']}'), new_entries)
+
+    def test_cache_kept_per_config(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            config_str = '{"cache-dir": ' + repr(cache_dir) + ', "manipulators": [' + MANIPULATORS_CONFIG + ']}'
+            other_config_str = config_str.replace('"Price"', '"Full"')
+            self.run_cached_manipulators(LEDGER, config_str)
+            _, other_cache = self.run_cached_manipulators(LEDGER, other_config_str)
+            _, cache = self.run_cached_manipulators(LEDGER, config_str)
+
+            self.assertEqual((0, 5), (other_cache.hits, other_cache.misses))
+            self.assertEqual((5, 0), (cache.hits, cache.misses))
+            self.assertEqual(sorted([os.path.basename(cache.cache_path), os.path.basename(other_cache.cache_path)]),
+                             sorted(os.listdir(cache_dir)))
+
+    def test_cache_evicts_least_recently_used_files(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            stale_paths = [os.path.join(cache_dir, CACHE_FILE_PREFIX + str(index) + CACHE_FILE_SUFFIX)
+                           for index in range(CACHE_FILE_LIMIT)]
+            for index, stale_path in enumerate(stale_paths):
+                open(stale_path, "wb").close()
+                os.utime(stale_path, (index, index))
+            _, cache = self.run_cached_manipulators(LEDGER, '{"cache-dir": ' + repr(cache_dir) + ', '
+                                                            '"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+
+            self.assertEqual(sorted([cache.cache_path] + stale_paths[1:]),
+                             sorted(os.path.join(cache_dir, name) for name in os.listdir(cache_dir)))
+
+    def test_cache_keyed_by_manipulation_code(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            original_dir = shutil.copytree(CODE_DIR, os.path.join(temp_dir, "original"))
+            edited_dir = shutil.copytree(CODE_DIR, os.path.join(temp_dir, "edited"))
+            with open(os.path.join(edited_dir, "utils", "rounder.py"), "a") as code_file:
+                code_file.write("\n")
+            with open(os.path.join(original_dir, "entry_manipulator_orchestrator_test.py"), "a") as code_file:
+                code_file.write("\n")
+
+            self.assertEqual(EntryManipulationCache.get_code_hash(CODE_DIR),
+                             EntryManipulationCache.get_code_hash(original_dir))
+            self.assertNotEqual(EntryManipulationCache.get_code_hash(original_dir),
+                                EntryManipulationCache.get_code_hash(edited_dir))
+
+    def test_incremental_matches_full_run(self):
+        entries, _, options_map = loader.load_string(LEDGER)
+        added_entries, _, _ = loader.load_string("""
+        2013-06-07 * "Purchase"
+            Assets:Bank:Checking      -30 USD
+            Expenses:Bread             30 USD
+                original-price:        33 USD
+        """)
+        removed_entries = [entry for entry in entries if entry.date == datetime.date(2013, 6, 4)]
+        config_str = '{"incremental": True, "manipulators": [' + MANIPULATORS_CONFIG + ']}'
+        orchestrator = EntryManipulatorOrchestrator()
+        previous_new_entries, _ = orchestrator.execute(entries, options_map, config_str)
+
+        new_entries, _ = orchestrator.execute_incremental(entries, previous_new_entries, removed_entries,
+                                                          added_entries, options_map, config_str)
+
+        expected_ledger = LEDGER[:LEDGER.index("2013-06-04")] + LEDGER[LEDGER.index("2013-06-05"):] + """
+2013-06-07 * "Purchase"
+    Assets:Bank:Checking      -30 USD
+    Expenses:Bread             30 USD
+        original-price:        33 USD
+"""
+        expected_entries, _, _ = loader.load_string(expected_ledger)
+        expected_new_entries, _ = entry_manipulators(expected_entries, options_map,
+                                                     '{"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+        self.assertEqualEntries(expected_new_entries, new_entries)
+        self.assertIs(previous_new_entries[-1], new_entries[-2])
+
+    def test_incremental_plugin_functions_report_statistics(self):
+        entries, _, options_map = loader.load_string(LEDGER)
+        removed_entries = [entry for entry in entries if entry.date == datetime.date(2013, 6, 4)]
+        config_str = '{"incremental": True, "instrumentation": "errors", "manipulators": [' + MANIPULATORS_CONFIG + ']}'
+        previous_new_entries, errors = entry_manipulators(entries, options_map, config_str)
+
+        new_entries, incremental_errors = entry_manipulators_incremental(entries, previous_new_entries,
+                                                                         removed_entries, [], options_map, config_str)
+
+        expected_entries, _, _ = loader.load_string(LEDGER[:LEDGER.index("2013-06-04")]
+                                                    + LEDGER[LEDGER.index("2013-06-05"):])
+        expected_new_entries, _ = entry_manipulators(expected_entries, options_map,
+                                                     '{"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+        self.assertEqualEntries(expected_new_entries, new_entries)
+        self.assertEqual(4, len(errors))
+        self.assertEqual([error.message.split(":")[0] for error in errors],
+                         [error.message.split(":")[0] for error in incremental_errors])
+        self.assertTrue(incremental_errors[3].message.startswith("consolidation: "))
+
+    def test_incremental_needs_previous_incremental_run(self):
+        entries, _, options_map = loader.load_string(LEDGER)
+        orchestrator = EntryManipulatorOrchestrator()
+        config_str = '{"manipulators": [' + MANIPULATORS_CONFIG + ']}'
+        orchestrator.execute(entries, options_map, config_str)
+
+        with self.assertRaises(Exception):
+            orchestrator.execute_incremental(entries, [], [], [], options_map, config_str)
+
+    def test_incremental_reconsolidates_when_previous_new_entries_are_not_its_own(self):
+        entries, _, options_map = loader.load_string(LEDGER)
+        removed_entries = [entry for entry in entries if entry.date == datetime.date(2013, 6, 4)]
+        config_str = '{"incremental": True, "manipulators": [' + MANIPULATORS_CONFIG + ']}'
+        orchestrator = EntryManipulatorOrchestrator()
+        previous_new_entries, _ = orchestrator.execute(entries, options_map, config_str)
+        other_entries, _, _ = loader.load_string(LEDGER)
+        other_new_entries, _ = EntryManipulatorOrchestrator().execute(other_entries, options_map, config_str)
+
+        new_entries, _ = orchestrator.execute_incremental(entries, other_new_entries, removed_entries, [],
+                                                          options_map, config_str)
+
+        expected_entries, _, _ = loader.load_string(LEDGER[:LEDGER.index("2013-06-04")]
+                                                    + LEDGER[LEDGER.index("2013-06-05"):])
+        expected_new_entries, _ = entry_manipulators(expected_entries, options_map,
+                                                     '{"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+        self.assertEqualEntries(expected_new_entries, new_entries)
+        self.assertIsNot(previous_new_entries[-1], new_entries[-1])
+
+    def test_untriggered_transactions_skip_manipulators(self):
+        entries, _, _ = loader.load_string(LEDGER + """
+2013-06-07 * "Purchase"
+    Assets:Bank:Checking      -5 USD
+    Expenses:Bread             5 USD
+""")
+        manipulators = EntryManipulatorOrchestrator.get_manipulators(
+            EntryManipulatorOrchestrator.get_config('{"manipulators": [' + MANIPULATORS_CONFIG + ']}'))
+
+        manipulated_entries, _ = EntryManipulatorOrchestrator.manipulate_chunk(entries, manipulators)
+
+        self.assertIs(entries[-1], manipulated_entries[-1])
+        self.assertTrue(manipulators[0].get_trigger().is_triggered(entries[3]))
+        self.assertFalse(manipulators[1].get_trigger().is_triggered(entries[3]))
+        self.assertFalse(manipulators[2].get_trigger().is_triggered(entries[3]))
+
+    def test_unchanged_transactions_preserved(self):
+        entries, _, options_map = loader.load_string(LEDGER + """
+2013-06-07 * "Purchase"
+    Assets:Bank:Checking      -5 USD
+    Expenses:Hygiene:Cream     5 USD
+""")
+        config_str = '{"manipulators": [' + MANIPULATORS_CONFIG + ']}'
+
+        new_entries, _ = entry_manipulators(entries, options_map, config_str)
+
+        self.assertIs(entries[-1], new_entries[-1])
+
+    def test_instrumentation_report(self):
+        for mode_config in ['', '"workers": 2, "chunk-size": 2, ', '"streaming": True, ']:
+            entries, _, options_map = loader.load_string(LEDGER)
+            orchestrator = EntryManipulatorOrchestrator()
+            _, errors = orchestrator.execute(entries, options_map, '{' + mode_config + '"instrumentation": "report", '
+                                                                   '"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+
+            self.assertEqual([], errors)
+            report = [(statistics["name"], statistics["entries-in"], statistics["entries-out"],
+                       statistics["postings-created"], statistics["exceptions"])
+                      for statistics in orchestrator.get_statistics_report()]
+            self.assertEqual([
+                ("transaction-splitter", 1, 2, 2, 0),
+                ("posting-consolidator-original-price", 2, 2, 2, 0),
+                ("posting-spreader", 2, 2, 2, 0),
+                ("consolidation", 9, 12, 0, 0),
+            ], report, mode_config)
+
+    def test_instrumentation_report_from_plugin(self):
+        entries, _, options_map = loader.load_string(LEDGER)
+        _, errors = entry_manipulators(entries, options_map, '{"instrumentation": "report", '
+                                                             '"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+
+        self.assertEqual([], errors)
+        self.assertEqual(["transaction-splitter", "posting-consolidator-original-price", "posting-spreader",
+                          "consolidation"],
+                         [statistics["name"] for statistics in entry_manipulator_orchestrator_obj.get_statistics_report()])
+
+        entry_manipulators(entries, options_map, '{"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+        self.assertEqual([], entry_manipulator_orchestrator_obj.get_statistics_report())
+
+    def test_instrumentation_errors(self):
+        entries, _, options_map = loader.load_string(LEDGER)
+        _, errors = entry_manipulators(entries, options_map, '{"instrumentation": "errors", '
+                                                             '"manipulators": [' + MANIPULATORS_CONFIG + ']}')
+
+        self.assertEqual(4, len(errors))
+        self.assertTrue(errors[0].message.startswith("transaction-splitter: "))
+        self.assertTrue(errors[3].message.startswith("consolidation: "))
+
+    def test_instrumentation_counts_exceptions(self):
+        entries, _, options_map = loader.load_string(LEDGER)
+        orchestrator = EntryManipulatorOrchestrator()
+        config_str = ('{"instrumentation": "report", "manipulators": [{'
+                      '  "type":"transaction-splitter",'
+                      '  "metadata-name-date":"booking-date",'
+                      '  "transfer-account":"Liabilities:Bank:DebitCard"'
+                      '}]}')
+
+        with self.assertRaises(Exception):
+            orchestrator.execute(entries, options_map, config_str)
+        self.assertEqual(1, orchestrator.statistics[0].exceptions)
+
+    def test_config_compiled_once_and_rejected_up_front(self):
+        config_str = '{"manipulators": [' + MANIPULATORS_CONFIG + ']}'
+
+        self.assertIs(EntryManipulatorOrchestrator.get_config(config_str),
+                      EntryManipulatorOrchestrator.get_config(config_str))
+        for config_str in ['{"worker": 2, "manipulators": [' + MANIPULATORS_CONFIG + ']}',
+                           '{"workers": 0, "manipulators": [' + MANIPULATORS_CONFIG + ']}',
+                           '{"manipulators": [{"type":"posting-spreader", "spread-bas":"unit"}]}',
+                           '{"manipulators": [{"type":"posting-shuffler"}]}']:
+            with self.assertRaises(Exception):
+                entry_manipulators([], {}, config_str)
+        for mode_config in ['"cache-dir": "cache", "workers": 2', '"cache-dir": "cache", "streaming": True',
+                            '"incremental": True, "cache-dir": "cache"', '"incremental": True, "workers": 2',
+                            '"incremental": True, "streaming": True', '"streaming": True, "workers": 2']:
+            with self.assertRaisesRegex(Exception, "Config keys can not be combined"):
+                entry_manipulators([], {}, '{' + mode_config + ', "manipulators": [' + MANIPULATORS_CONFIG + ']}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,15 @@ from .entry_manipulator_orchestrator import EntryManipulatorOrchestrator
 
 __plugins__ = ["entry_manipulators"]
 
+entry_manipulator_orchestrator_obj = EntryManipulatorOrchestrator()
+
 
 def entry_manipulators(entries, options_map, config_str=""):
-    return EntryManipulatorOrchestrator().execute(entries, options_map, config_str)
+    return entry_manipulator_orchestrator_obj.execute(entries, options_map, config_str)
+
+
+def entry_manipulators_incremental(previous_entries, previous_new_entries, removed_entries, added_entries,
+                                   options_map, config_str=""):
+    return entry_manipulator_orchestrator_obj.execute_incremental(previous_entries, previous_new_entries,
+                                                                  removed_entries, added_entries, options_map,
+                                                                  config_str)
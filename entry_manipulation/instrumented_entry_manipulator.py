@@ -0,0 +1,32 @@
+import time
+from typing import Optional
+
+from beancount.core import data
+
+from .data.entry_manipulation_result_data import EntryManipulationResultData
+from .data.entry_manipulator_statistics_data import EntryManipulatorStatisticsData
+from .data.entry_manipulator_trigger_data import EntryManipulatorTriggerData
+from .entry_manipulator_base import EntryManipulatorBase
+
+
+class InstrumentedEntryManipulator(EntryManipulatorBase):
+    def __init__(self, manipulator: EntryManipulatorBase, statistics: EntryManipulatorStatisticsData):
+        super().__init__(manipulator.config)
+        self.manipulator = manipulator
+        self.statistics = statistics
+
+    def get_trigger(self) -> Optional[EntryManipulatorTriggerData]:
+        return self.manipulator.get_trigger()
+
+    def execute(self, entry: data.Transaction) -> EntryManipulationResultData:
+        start = time.perf_counter()
+        try:
+            result = self.manipulator.execute(entry)
+        except Exception:
+            self.statistics.exceptions += 1
+            raise
+        finally:
+            self.statistics.seconds += time.perf_counter() - start
+
+        self.statistics.add_entries([entry], result.entries)
+        return result
@@ -9,6 +9,8 @@ from ....entry_manipulator_base import EntryManipulatorBase
 
 
 class PostingConsolidatorExtractingBase(EntryManipulatorBase):
+    config_keys = EntryManipulatorBase.config_keys | {"consolidate-price-account-postfix"}
+
     def __init__(self, config):
         super().__init__(config)
 
@@ -16,6 +18,8 @@ class PostingConsolidatorExtractingBase(EntryManipulatorBase):
 
     def execute(self, entry: data.Transaction) -> EntryManipulationResultData:
         account_consolidators = self.get_account_consolidators(entry)
+        if len(account_consolidators) == 0:
+            return EntryManipulationResultData([entry])
 
         new_postings = self.get_postings(entry, account_consolidators)
 
@@ -1,16 +1,24 @@
-from typing import Set, Dict, List
+from typing import Set, Dict, List, Optional
 
 from beancount.core import data
 
 from .posting_consolidator_extracting_base import PostingConsolidatorExtractingBase
 from ....data.account_consolidation_data import AccountConsolidationData
+from ....data.entry_manipulator_trigger_data import EntryManipulatorTriggerData
 
 
 class PostingConsolidatorOriginalPrice(PostingConsolidatorExtractingBase):
+    config_keys = PostingConsolidatorExtractingBase.config_keys | {
+        "consolidate-discount-account-postfix", "metadata-name-original-price"}
+
     def __init__(self, config):
         super().__init__(config)
         self.consolidate_discount_account_postfix = config.get('consolidate-discount-account-postfix')
         self.metadata_name_original_price = config.get('metadata-name-original-price')
+        self.trigger = EntryManipulatorTriggerData(posting_metadata_names=[self.metadata_name_original_price])
+
+    def get_trigger(self) -> Optional[EntryManipulatorTriggerData]:
+        return self.trigger
 
     def get_relevant_accounts(self, entry: data.Transaction) -> Set[str]:
         relevant_accounts: Set[str] = set()
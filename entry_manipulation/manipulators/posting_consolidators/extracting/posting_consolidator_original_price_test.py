@@ -5,6 +5,8 @@ from beancount.core import data
 from beancount.parser import cmptest
 
 from entry_manipulation.entry_manipulators import entry_manipulators
+from entry_manipulation.manipulators.posting_consolidators.extracting.posting_consolidator_original_price import \
+    PostingConsolidatorOriginalPrice
 
 
 class PostingConsolidatorOriginalPriceTest(cmptest.TestCase):
@@ -145,6 +147,27 @@ class PostingConsolidatorOriginalPriceTest(cmptest.TestCase):
                     if posting.meta:
                         self.assertIsNone(posting.meta.get('original-price'))
 
+    @loader.load_doc(expect_errors=True)
+    def test_unchanged_entry_preserved(self, entries, _, options_map):
+        """
+        2010-08-31 open Expenses:Bread
+
+        2013-06-03 * "Purchase"
+            Assets:Bank:Checking      -10 USD
+            Expenses:Bread             10 USD
+        """
+        manipulator = PostingConsolidatorOriginalPrice({
+            "consolidate-price-account-postfix": "Price",
+            "consolidate-discount-account-postfix": "Discount",
+            "metadata-name-original-price": "original-price",
+        })
+
+        result = manipulator.execute(entries[1])
+
+        self.assertEqual(1, len(result.entries))
+        self.assertIs(entries[1], result.entries[0])
+        self.assertIsNone(result.other_data)
+
 
 if __name__ == '__main__':
     unittest.main()
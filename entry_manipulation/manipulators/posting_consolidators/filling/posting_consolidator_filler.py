@@ -9,6 +9,9 @@ from ....data.account_consolidation_data_manager import AccountConsolidationData
 
 
 class PostingConsolidatorFiller(PostingConsolidatorSomethingBase):
+    config_keys = PostingConsolidatorSomethingBase.config_keys | {
+        "metadata-name-fill-base", "metadata-name-fill-source-id", "metadata-name-fill-target-id"}
+
     def __init__(self, config):
         super().__init__(config)
 
@@ -368,6 +368,42 @@ class PostingConsolidatorSpreaderTest(cmptest.TestCase):
     #         new_entries,
     #     )
 
+    @loader.load_doc(expect_errors=True)
+    def test_equal_split_largest_remainder_rounding(self, entries, _, options_map):
+        """
+        2016-05-31 * "Exams"
+            Assets:Bank                 -100 USD
+            Expenses:Exam                100 USD
+                fill-source-id: "all"
+                fill-base: "equal"
+            Expenses:Exam                  0 USD
+            Expenses:Exam                  0 USD
+            Expenses:Exam                  0 USD
+        """
+        config_str = ('{"manipulators": ['
+                      '{'
+                      '  "type":"posting-filler",'
+                      '  "roundings":{'
+                      '      "USD":2'
+                      '    },'
+                      '  "rounding-mode":"largest-remainder",'
+                      '  "metadata-name-fill-base":"fill-base",'
+                      '  "metadata-name-fill-source-id":"fill-source-id"'
+                      '}'
+                      ']}')
+        new_entries, _ = entry_manipulators(entries, options_map, config_str)
+
+        self.assertEqualEntries(
+            """
+        2016-05-31 * "Exams"
+            Assets:Bank                 -100 USD
+            Expenses:Exam              33.34 USD
+            Expenses:Exam              33.33 USD
+            Expenses:Exam              33.33 USD
+        """,
+            new_entries,
+        )
+
 
 if __name__ == '__main__':
     unittest.main()
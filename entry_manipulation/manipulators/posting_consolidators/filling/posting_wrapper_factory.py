@@ -1,9 +1,10 @@
-from typing import List
+from typing import List, Optional
 
 from beancount.core import data
 
 from .source_posting_wrapper import SourcePostingWrapper
 from .target_posting_wrapper import TargetPostingWrapper
+from ..posting_wrapping.distributing.distributor_base import DistributorBase
 from ..posting_wrapping.matching.matcher_base import MatcherBase
 from ..posting_wrapping.matching.matcher_factory_base import MatcherFactoryBase
 from ..posting_wrapping.posting_wrapper_factory_base import PostingWrapperFactoryBase
@@ -18,9 +19,9 @@ class PostingWrapperFactory(PostingWrapperFactoryBase):
                  matcher_factory: MatcherFactoryBase):
         super().__init__(rounder, value_getter_distribution_type, matcher_factory)
 
-    def _create_source_posting_wrapper(self, posting: data.Posting, distribution_type: str,
+    def _create_source_posting_wrapper(self, posting: data.Posting, distributor: Optional[DistributorBase],
                                        matcher: MatcherBase) -> SourcePostingWrapperBase:
-        return SourcePostingWrapper(self._rounder, posting, distribution_type, matcher, posting.units.number)
+        return SourcePostingWrapper(self._rounder, posting, distributor, matcher, posting.units.number)
 
     def _create_target_posting_wrapper(self, posting, match_data: List[str]) -> TargetPostingWrapperBase:
         return TargetPostingWrapper(posting, match_data)
@@ -1,5 +1,5 @@
 from decimal import Decimal
-from typing import List, Dict, Optional
+from typing import List, Optional
 
 from beancount.core import data
 
@@ -7,9 +7,10 @@ from ..posting_wrapping.target_posting_wrapper_base import TargetPostingWrapperB
 
 
 class TargetPostingWrapper(TargetPostingWrapperBase):
+    __slots__ = ("_number",)
+
     def __init__(self, posting: data.Posting, match_data: Optional[List[str]]):
         super().__init__(posting, match_data)
-        self._numbers: Dict[data.Account, Decimal] = {}
         self._number: Decimal = Decimal(0)
 
     def get_postings(self) -> List[data.Posting]:
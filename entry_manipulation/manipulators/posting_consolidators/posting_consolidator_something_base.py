@@ -5,22 +5,35 @@ from beancount.core import data
 
 from .posting_wrapping.posting_wrapper_factory_base import PostingWrapperFactoryBase
 from ...data.entry_manipulation_result_data import EntryManipulationResultData
+from ...data.entry_manipulator_trigger_data import EntryManipulatorTriggerData
 from ...entry_manipulator_base import EntryManipulatorBase
 from ...utils.rounder import Rounder
 
 
 class PostingConsolidatorSomethingBase(EntryManipulatorBase):
+    config_keys = EntryManipulatorBase.config_keys | {"roundings", "rounding-mode"}
+
     def __init__(self, config) -> None:
         super().__init__(config)
 
-        self._rounder = Rounder(config.get("roundings"))
+        self._rounder = Rounder(config.get("roundings"), config.get("rounding-mode"))
         self._posting_wrapper_factory: Optional[PostingWrapperFactoryBase] = None
+        self._trigger: Optional[EntryManipulatorTriggerData] = None
+
+    def get_trigger(self) -> Optional[EntryManipulatorTriggerData]:
+        if self._trigger is None:
+            if self._posting_wrapper_factory is None:
+                self._trigger = EntryManipulatorTriggerData()
+            else:
+                self._trigger = EntryManipulatorTriggerData(
+                    posting_metadata_names=self._posting_wrapper_factory.get_metadata_names())
+        return self._trigger
 
     def execute(self, entry: data.Transaction) -> EntryManipulationResultData:
         if self._posting_wrapper_factory is None:
             return EntryManipulationResultData([entry])
 
-        source_postings, target_postings, irrelevant_postings = self._posting_wrapper_factory.wrap_postings(
+        source_postings, target_index, irrelevant_postings = self._posting_wrapper_factory.wrap_postings(
             entry.postings)
 
         if len(source_postings) == 0:
@@ -29,8 +42,8 @@ class PostingConsolidatorSomethingBase(EntryManipulatorBase):
         postings: List[data.Posting] = []
         postings.extend(irrelevant_postings)
         for source_posting in source_postings:
-            source_posting.process_postings(target_postings)
-        for posting in target_postings:
+            source_posting.process_postings(target_index)
+        for posting in target_index.target_postings:
             postings.extend(posting.get_postings())
 
         new_entry = data.Transaction(entry.meta, entry.date, entry.flag, entry.payee, entry.narration, entry.tags,
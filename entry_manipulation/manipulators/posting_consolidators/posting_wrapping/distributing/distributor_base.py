@@ -0,0 +1,11 @@
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from typing import List
+
+from ..target_posting_wrapper_base import TargetPostingWrapperBase
+
+
+class DistributorBase(ABC):
+    @abstractmethod
+    def distribute(self, max_number: Decimal, postings: List[TargetPostingWrapperBase]) -> List[Decimal]:
+        pass
@@ -0,0 +1,32 @@
+from typing import Dict, Optional
+
+from .distributor_base import DistributorBase
+from .equal_distributor import EqualDistributor
+from .metadata_distributor import MetadataDistributor
+from .unit_distributor import UnitDistributor
+from .zero_distributor import ZeroDistributor
+
+
+class DistributorFactory:
+    def __init__(self):
+        self._distributors: Dict[str, DistributorBase] = {}
+
+    def get_distributor(self, distribution_type: Optional[str]) -> Optional[DistributorBase]:
+        if distribution_type is None:
+            return None
+
+        distributor = self._distributors.get(distribution_type)
+        if distributor is None:
+            distributor = self._create_distributor(distribution_type)
+            self._distributors[distribution_type] = distributor
+        return distributor
+
+    @staticmethod
+    def _create_distributor(distribution_type: str) -> DistributorBase:
+        if distribution_type == "unit":
+            return UnitDistributor()
+        elif distribution_type == "equal":
+            return EqualDistributor()
+        elif distribution_type.startswith("meta:"):
+            return MetadataDistributor(distribution_type.split("meta:")[-1])
+        return ZeroDistributor()
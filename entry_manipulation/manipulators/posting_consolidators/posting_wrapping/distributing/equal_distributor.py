@@ -0,0 +1,11 @@
+from decimal import Decimal
+from typing import List
+
+from .distributor_base import DistributorBase
+from ..target_posting_wrapper_base import TargetPostingWrapperBase
+
+
+class EqualDistributor(DistributorBase):
+    def distribute(self, max_number: Decimal, postings: List[TargetPostingWrapperBase]) -> List[Decimal]:
+        number_base = max_number / len(postings)
+        return [number_base] * len(postings)
@@ -0,0 +1,25 @@
+from decimal import Decimal
+from typing import List
+
+from beancount.core import data
+
+from .distributor_base import DistributorBase
+from ..target_posting_wrapper_base import TargetPostingWrapperBase
+
+
+class MetadataDistributor(DistributorBase):
+    def __init__(self, metadata_name: str):
+        self.metadata_name = metadata_name
+
+    def distribute(self, max_number: Decimal, postings: List[TargetPostingWrapperBase]) -> List[Decimal]:
+        weights = []
+        number_base = 0
+        for posting in postings:
+            meta = posting.get_meta(self.metadata_name)
+            if isinstance(meta, data.Amount):
+                weights.append(meta.number)
+                number_base += meta.number
+            else:
+                weights.append(None)
+        number_base = max_number / number_base
+        return [number_base * weight if weight is not None else 0 for weight in weights]
@@ -0,0 +1,15 @@
+from decimal import Decimal
+from typing import List
+
+from .distributor_base import DistributorBase
+from ..target_posting_wrapper_base import TargetPostingWrapperBase
+
+
+class UnitDistributor(DistributorBase):
+    def distribute(self, max_number: Decimal, postings: List[TargetPostingWrapperBase]) -> List[Decimal]:
+        weights = [posting.get_number() for posting in postings]
+        number_base = 0
+        for weight in weights:
+            number_base += weight
+        number_base = max_number / number_base
+        return [number_base * weight for weight in weights]
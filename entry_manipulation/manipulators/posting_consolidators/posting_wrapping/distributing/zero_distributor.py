@@ -0,0 +1,10 @@
+from decimal import Decimal
+from typing import List
+
+from .distributor_base import DistributorBase
+from ..target_posting_wrapper_base import TargetPostingWrapperBase
+
+
+class ZeroDistributor(DistributorBase):
+    def distribute(self, max_number: Decimal, postings: List[TargetPostingWrapperBase]) -> List[Decimal]:
+        return [0] * len(postings)
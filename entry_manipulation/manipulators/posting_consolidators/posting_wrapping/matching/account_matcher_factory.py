@@ -19,3 +19,6 @@ class AccountMatcherFactory(MatcherFactoryBase):
 
     def create_match_data(self, posting: data.Posting) -> List[str]:
         return [posting.account]
+
+    def get_metadata_names(self) -> List[str]:
+        return [self._metadata_name_spread_account_postfix]
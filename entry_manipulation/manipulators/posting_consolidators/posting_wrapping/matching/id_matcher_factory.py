@@ -26,6 +26,9 @@ class IdMatcherFactory(MatcherFactoryBase):
 
         return []
 
+    def get_metadata_names(self) -> List[str]:
+        return [self._metadata_name_source_id, self._metadata_name_target_id]
+
     @staticmethod
     def _create_ids(ids_text: str) -> List[str]:
         ids: List[str] = []
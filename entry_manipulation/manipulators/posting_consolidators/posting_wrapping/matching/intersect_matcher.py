@@ -1,9 +1,17 @@
 from typing import List
 
 from .matcher_base import MatcherBase
+from .target_posting_index import TargetPostingIndex
+from ..target_posting_wrapper_base import TargetPostingWrapperBase
 
 
 class IntersectMatcher(MatcherBase):
+    __slots__ = ()
+
     def is_matches(self, other_match_data: List[str]) -> bool:
         if len(self._match_data) == 0: return True
         return len(set(self._match_data) & set(other_match_data)) != 0
+
+    def find_matches(self, target_index: TargetPostingIndex) -> List[TargetPostingWrapperBase]:
+        if len(self._match_data) == 0: return target_index.get_all()
+        return target_index.get_by_match_ids(self._match_data)
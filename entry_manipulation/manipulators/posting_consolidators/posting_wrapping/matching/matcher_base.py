@@ -1,11 +1,19 @@
 from abc import ABC, abstractmethod
 from typing import List
 
+from .target_posting_index import TargetPostingIndex
+from ..target_posting_wrapper_base import TargetPostingWrapperBase
+
 
 class MatcherBase(ABC):
+    __slots__ = ("_match_data",)
+
     def __init__(self, match_data: List[str]):
         self._match_data = match_data
 
     @abstractmethod
     def is_matches(self, other_match_data: List[str]) -> bool:
         pass
+
+    def find_matches(self, target_index: TargetPostingIndex) -> List[TargetPostingWrapperBase]:
+        return [posting for posting in target_index.target_postings if self.is_matches(posting.get_match_data())]
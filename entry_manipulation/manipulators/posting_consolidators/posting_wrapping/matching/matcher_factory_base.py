@@ -14,3 +14,7 @@ class MatcherFactoryBase(ABC):
     @abstractmethod
     def create_match_data(self, posting: data.Posting) -> List[str]:
         pass
+
+    @abstractmethod
+    def get_metadata_names(self) -> List[str]:
+        pass
@@ -0,0 +1,32 @@
+from typing import Dict, List
+
+from ..target_posting_wrapper_base import TargetPostingWrapperBase
+
+
+class TargetPostingIndex:
+    __slots__ = ("target_postings", "_positions_by_match_id")
+
+    def __init__(self):
+        self.target_postings: List[TargetPostingWrapperBase] = []
+        self._positions_by_match_id: Dict[str, List[int]] = {}
+
+    def add(self, target_posting: TargetPostingWrapperBase) -> None:
+        position = len(self.target_postings)
+        self.target_postings.append(target_posting)
+        for match_id in target_posting.get_match_data() or []:
+            positions = self._positions_by_match_id.setdefault(match_id, [])
+            if len(positions) == 0 or positions[-1] != position:
+                positions.append(position)
+
+    def get_all(self) -> List[TargetPostingWrapperBase]:
+        return list(self.target_postings)
+
+    def get_by_match_ids(self, match_ids: List[str]) -> List[TargetPostingWrapperBase]:
+        if len(match_ids) == 1:
+            positions = self._positions_by_match_id.get(match_ids[0], [])
+        else:
+            unique_positions = set()
+            for match_id in match_ids:
+                unique_positions.update(self._positions_by_match_id.get(match_id, []))
+            positions = sorted(unique_positions)
+        return [self.target_postings[position] for position in positions]
@@ -1,10 +1,13 @@
 from abc import abstractmethod, ABC
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
 from beancount.core import data
 
+from .distributing.distributor_base import DistributorBase
+from .distributing.distributor_factory import DistributorFactory
 from .matching.matcher_base import MatcherBase
 from .matching.matcher_factory_base import MatcherFactoryBase
+from .matching.target_posting_index import TargetPostingIndex
 from .source_posting_wrapper_base import SourcePostingWrapperBase
 from .target_posting_wrapper_base import TargetPostingWrapperBase
 from .values.value_getter import ValueGetter
@@ -17,30 +20,35 @@ class PostingWrapperFactoryBase(ABC):
         self._rounder = rounder
         self.value_getter_distribution_type = value_getter_distribution_type
         self._matcher_factory = matcher_factory
+        self._distributor_factory = DistributorFactory()
 
     def wrap_postings(self, postings: List[data.Posting]) -> Tuple[List[SourcePostingWrapperBase],
-    List[TargetPostingWrapperBase], List[data.Posting]]:
+    TargetPostingIndex, List[data.Posting]]:
         source_postings: List[SourcePostingWrapperBase] = []
-        target_postings: List[TargetPostingWrapperBase] = []
+        target_index = TargetPostingIndex()
         irrelevant_postings: List[data.Posting] = []
 
         for posting in postings:
             source_matcher = self._matcher_factory.create_matcher(posting)
             if source_matcher is not None:
                 distribution_type = self.value_getter_distribution_type.get_value(posting)
+                distributor = self._distributor_factory.get_distributor(distribution_type)
 
                 source_postings.append(
-                    self._create_source_posting_wrapper(posting, distribution_type, source_matcher))
+                    self._create_source_posting_wrapper(posting, distributor, source_matcher))
             elif posting.account.startswith("Expenses:"):
                 match_data = self._matcher_factory.create_match_data(posting)
-                target_postings.append(self._create_target_posting_wrapper(posting, match_data))
+                target_index.add(self._create_target_posting_wrapper(posting, match_data))
             else:
                 irrelevant_postings.append(posting)
 
-        return source_postings, target_postings, irrelevant_postings
+        return source_postings, target_index, irrelevant_postings
+
+    def get_metadata_names(self) -> List[str]:
+        return self._matcher_factory.get_metadata_names()
 
     @abstractmethod
-    def _create_source_posting_wrapper(self, posting: data.Posting, distribution_type: str,
+    def _create_source_posting_wrapper(self, posting: data.Posting, distributor: Optional[DistributorBase],
                                        matcher: MatcherBase) -> SourcePostingWrapperBase:
         pass
 
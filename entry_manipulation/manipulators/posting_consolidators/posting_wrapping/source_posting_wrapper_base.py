@@ -1,59 +1,39 @@
 from abc import abstractmethod, ABC
 from decimal import Decimal
-from typing import List
+from typing import List, Optional
 
 from beancount.core import data
 
+from .distributing.distributor_base import DistributorBase
 from .matching.matcher_base import MatcherBase
+from .matching.target_posting_index import TargetPostingIndex
 from .target_posting_wrapper_base import TargetPostingWrapperBase
 from ....utils.rounder import Rounder
 
 
-# todo outsource distribution_type as distributor class
 class SourcePostingWrapperBase(ABC):
-    def __init__(self, rounder: Rounder, posting: data.Posting, distribution_type: str, matcher: MatcherBase,
-                 max_number: Decimal) -> None:
+    __slots__ = ("_matcher", "_rounder", "_posting", "_distributor", "_max_number")
+
+    def __init__(self, rounder: Rounder, posting: data.Posting, distributor: Optional[DistributorBase],
+                 matcher: MatcherBase, max_number: Decimal) -> None:
         self._matcher = matcher
         self._rounder = rounder
         self._posting = posting
-        self._distribution_type = distribution_type
+        self._distributor = distributor
         self._max_number = max_number
 
-    def process_postings(self, target_postings: List[TargetPostingWrapperBase]) -> None:
-        postings: List[TargetPostingWrapperBase] = []
-        for posting in target_postings:
-            if self._matcher.is_matches(posting.get_match_data()):
-                postings.append(posting)
+    def process_postings(self, target_index: TargetPostingIndex) -> None:
+        postings: List[TargetPostingWrapperBase] = self._matcher.find_matches(target_index)
 
         if len(postings) == 0:
             return
 
-        number_base = 0
-        if self._distribution_type == "unit":
-            for posting in postings:
-                number_base += posting.get_number()
-            number_base = self._max_number / number_base
-        elif self._distribution_type == "equal":
-            number_base = self._max_number / len(postings)
-        elif self._distribution_type.startswith("meta:"):
-            for posting in postings:
-                meta = posting.get_meta(self._distribution_type.split("meta:")[-1])
-                if isinstance(meta, data.Amount):
-                    number_base += meta.number
-            number_base = self._max_number / number_base
-
-        for posting in postings:
-            number = 0
-            if self._distribution_type == "unit":
-                number = number_base * posting.get_number()
-            elif self._distribution_type == "equal":
-                number = number_base
-            elif self._distribution_type.startswith("meta:"):
-                meta = posting.get_meta(self._distribution_type.split("meta:")[-1])
-                if isinstance(meta, data.Amount):
-                    number = number_base * meta.number
-
-            number = self._rounder.round(number, self._posting.units.currency)
+        if self._distributor is None:
+            raise Exception("Distribution type not set for posting: " + self._posting.account)
+
+        numbers = self._distributor.distribute(self._max_number, postings)
+        numbers = self._rounder.round_all(numbers, self._posting.units.currency)
+        for posting, number in zip(postings, numbers):
             self.process_posting(posting, number)
 
     @abstractmethod
@@ -1,14 +1,15 @@
 from abc import abstractmethod, ABC
 from decimal import Decimal
-from typing import List, Optional, Dict
+from typing import List, Optional
 
 from beancount.core import data
 
 
 class TargetPostingWrapperBase(ABC):
+    __slots__ = ("posting", "_match_data")
+
     def __init__(self, posting: data.Posting, match_data: Optional[List[str]]):
         self.posting = posting
-        self._numbers: Dict[data.Account, Decimal] = {}
         self._match_data = match_data
 
     def get_match_data(self) -> Optional[List[str]]:
@@ -15,6 +15,10 @@ from ....data.account_consolidation_data_manager import AccountConsolidationData
 
 
 class PostingConsolidatorSpreader(PostingConsolidatorSomethingBase):
+    config_keys = PostingConsolidatorSomethingBase.config_keys | {
+        "spread-base", "metadata-name-spread-base", "metadata-name-spread-source-id", "metadata-name-spread-target-id",
+        "metadata-name-spread-account-postfix", "match-mode", "consolidate-price-account-postfix"}
+
     def __init__(self, config):
         super().__init__(config)
         self._account_consolidation_manager = AccountConsolidationDataManager()
@@ -52,4 +56,4 @@ class PostingConsolidatorSpreader(PostingConsolidatorSomethingBase):
             account_namers)
 
     def get_other_data(self) -> Optional[List[object]]:
-        return self._account_consolidation_manager.get_account_consolidators()
+        return self._account_consolidation_manager.pop_account_consolidators()
@@ -479,6 +479,113 @@ class PostingConsolidatorSpreaderTest(cmptest.TestCase):
             new_entries,
         )
 
+    @loader.load_doc(expect_errors=True)
+    def test_multiple_source_ids_match_each_target_once(self, entries, _, options_map):
+        """
+        2016-05-31 * ""
+            Assets:Bank                 -540 HUF
+            Expenses:Discount            -60 HUF
+                spread-source-id: "1,3"
+                spread-base: "unit"
+            Expenses:Onion               100 HUF
+                spread-target-id: "1"
+            Expenses:Bread               200 HUF
+                spread-target-id: "2"
+            Expenses:Butter              200 HUF
+                spread-target-id: "3,1"
+            Expenses:Milk                100 HUF
+        """
+        config_str = ('{"manipulators": ['
+                      '{'
+                      f'  "type":"{manipulator_type}",'
+                      '  "roundings":{'
+                      '      "HUF":2'
+                      '    },'
+                      '  "consolidate-price-account-postfix":"Price",'
+                      '  "metadata-name-spread-base":"spread-base",'
+                      '  "metadata-name-spread-source-id":"spread-source-id",'
+                      '  "metadata-name-spread-target-id":"spread-target-id"'
+                      '}'
+                      ']}')
+        new_entries, _ = entry_manipulators(entries, options_map, config_str)
+
+        self.assertEqualEntries(
+            """
+        2016-05-31 * ""
+            Assets:Bank                 -540 HUF
+            Expenses:Onion:Price         100 HUF
+            Expenses:Onion:Discount   -20.00 HUF
+            Expenses:Bread               200 HUF
+            Expenses:Butter:Price        200 HUF
+            Expenses:Butter:Discount  -40.00 HUF
+            Expenses:Milk                100 HUF
+        """,
+            new_entries,
+        )
+
+    @loader.load_doc(expect_errors=True)
+    def test_missing_spread_base(self, entries, _, options_map):
+        """
+        2016-05-31 * ""
+            Assets:Bank                 -540 HUF
+            Expenses:Discount            -60 HUF
+                spread-source-id: "1"
+            Expenses:Onion               600 HUF
+                spread-target-id: "1"
+        """
+        config_str = ('{"manipulators": ['
+                      '{'
+                      f'  "type":"{manipulator_type}",'
+                      '  "consolidate-price-account-postfix":"Price",'
+                      '  "metadata-name-spread-base":"spread-base",'
+                      '  "metadata-name-spread-source-id":"spread-source-id",'
+                      '  "metadata-name-spread-target-id":"spread-target-id"'
+                      '}'
+                      ']}')
+
+        with self.assertRaises(Exception):
+            entry_manipulators(entries, options_map, config_str)
+
+    @loader.load_doc(expect_errors=True)
+    def test_spread_largest_remainder_rounding(self, entries, _, options_map):
+        """
+        2013-06-03 * "Purchase"
+            Assets:Bank:Checking      -20 USD
+            Expenses:Discount         -10 USD
+                spread-source-id: "all"
+                spread-base: "unit"
+            Expenses:Bread             10 USD
+            Expenses:Fruit             10 USD
+            Expenses:Milk              10 USD
+        """
+        config_str = ('{"manipulators": ['
+                      '{'
+                      f'  "type":"{manipulator_type}",'
+                      '  "roundings":{'
+                      '      "USD":2'
+                      '    },'
+                      '  "rounding-mode":"largest-remainder",'
+                      '  "consolidate-price-account-postfix":"Price",'
+                      '  "metadata-name-spread-base":"spread-base",'
+                      '  "metadata-name-spread-source-id":"spread-source-id"'
+                      '}'
+                      ']}')
+        new_entries, _ = entry_manipulators(entries, options_map, config_str)
+
+        self.assertEqualEntries(
+            """
+        2013-06-03 * "Purchase"
+            Assets:Bank:Checking          -20 USD
+            Expenses:Bread:Price           10 USD
+            Expenses:Bread:Discount     -3.33 USD
+            Expenses:Fruit:Price           10 USD
+            Expenses:Fruit:Discount     -3.33 USD
+            Expenses:Milk:Price            10 USD
+            Expenses:Milk:Discount      -3.34 USD
+        """,
+            new_entries,
+        )
+
 
 if __name__ == '__main__':
     unittest.main()
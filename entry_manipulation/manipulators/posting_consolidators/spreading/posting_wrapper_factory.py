@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from beancount.core import data
 
@@ -6,6 +6,7 @@ from .source_posting_wrapper import SourcePostingWrapper
 from .target_posting_basic_wrapper import TargetPostingBasicWrapper
 from .target_posting_with_cost_wrapper import TargetPostingWithCostWrapper
 from ..posting_wrapping.account_naming.account_namers import AccountNamers
+from ..posting_wrapping.distributing.distributor_base import DistributorBase
 from ..posting_wrapping.matching.matcher_base import MatcherBase
 from ..posting_wrapping.matching.matcher_factory_base import MatcherFactoryBase
 from ..posting_wrapping.posting_wrapper_factory_base import PostingWrapperFactoryBase
@@ -24,9 +25,9 @@ class PostingWrapperFactory(PostingWrapperFactoryBase):
         self._account_consolidation_manager = account_consolidation_manager
         self._account_namers = account_namers
 
-    def _create_source_posting_wrapper(self, posting: data.Posting, distribution_type: str,
+    def _create_source_posting_wrapper(self, posting: data.Posting, distributor: Optional[DistributorBase],
                                        matcher: MatcherBase) -> SourcePostingWrapperBase:
-        return SourcePostingWrapper(self._rounder, posting, distribution_type, matcher, self._account_namers,
+        return SourcePostingWrapper(self._rounder, posting, distributor, matcher, self._account_namers,
                                     posting.units.number)
 
     def _create_target_posting_wrapper(self, posting, match_data: List[str]) -> TargetPostingWrapperBase:
@@ -1,20 +1,24 @@
 from decimal import Decimal
+from typing import Optional
 
 from beancount.core import data
 
 from .target_posting_with_cost_wrapper import TargetPostingWithCostWrapper
 from ..posting_wrapping.account_naming.account_namers import AccountNamers
 from ..posting_wrapping.source_posting_wrapper_base import SourcePostingWrapperBase
+from ..posting_wrapping.distributing.distributor_base import DistributorBase
 from ..posting_wrapping.matching.matcher_base import MatcherBase
 from ....utils.rounder import Rounder
 
 
 class SourcePostingWrapper(SourcePostingWrapperBase):
+    __slots__ = ("_account_namers",)
 
-    def __init__(self, rounder: Rounder, posting: data.Posting, distribution_type: str, matcher: MatcherBase,
+    def __init__(self, rounder: Rounder, posting: data.Posting, distributor: Optional[DistributorBase],
+                 matcher: MatcherBase,
                  account_namers: AccountNamers,
                  max_number: Decimal):
-        super().__init__(rounder, posting, distribution_type, matcher, max_number)
+        super().__init__(rounder, posting, distributor, matcher, max_number)
         self._account_namers = account_namers
 
     def process_posting(self, posting: TargetPostingWithCostWrapper, number: Decimal) -> None:
@@ -1,5 +1,4 @@
-from decimal import Decimal
-from typing import List, Dict, Optional
+from typing import List, Optional
 
 from beancount.core import data
 
@@ -8,14 +7,16 @@ from ....data.account_consolidation_data_manager import AccountConsolidationData
 
 
 class TargetPostingBasicWrapper(TargetPostingWrapper):
+    __slots__ = ()
+
     def __init__(self, account_consolidation_manager: AccountConsolidationDataManager, posting: data.Posting,
                  match_data: Optional[List[str]]):
         super().__init__(account_consolidation_manager, posting, match_data)
 
-        self._numbers: Dict[data.Account, Decimal] = {}
-
     def get_postings(self) -> List[data.Posting]:
         postings: List[data.Posting] = [self.posting]
+        if self._numbers is None:
+            return postings
         for account_post_fix in self._numbers:
             number = self._numbers.get(account_post_fix)
             account = self.posting.account + ":" + account_post_fix
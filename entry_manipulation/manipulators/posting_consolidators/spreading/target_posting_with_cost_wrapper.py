@@ -7,6 +7,8 @@ from ....data.account_consolidation_data_manager import AccountConsolidationData
 
 
 class TargetPostingWithCostWrapper(TargetPostingWrapper):
+    __slots__ = ()
+
     def __init__(self, account_consolidation_manager: AccountConsolidationDataManager, posting: data.Posting,
                  match_data: Optional[List[str]]):
         super().__init__(account_consolidation_manager, posting, match_data)
@@ -15,7 +17,7 @@ class TargetPostingWithCostWrapper(TargetPostingWrapper):
         postings: List[data.Posting] = []
         unit_number = self.posting.units.number * self.posting.cost.number
 
-        for account_post_fix in self._numbers:
+        for account_post_fix in self._numbers or ():
             number = self._numbers.get(account_post_fix)
 
             postings.append(self.create_cost_posting_supplementary_posting(account_post_fix, number))
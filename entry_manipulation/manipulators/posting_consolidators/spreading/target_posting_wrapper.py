@@ -1,6 +1,6 @@
 from abc import ABC
 from decimal import Decimal
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 from beancount.core import data
 
@@ -10,14 +10,19 @@ from ..posting_wrapping.target_posting_wrapper_base import TargetPostingWrapperB
 
 
 class TargetPostingWrapper(TargetPostingWrapperBase, ABC):
+    __slots__ = ("_account_consolidation_manager", "_account_consolidation", "_numbers")
+
     def __init__(self, account_consolidation_manager: AccountConsolidationDataManager, posting: data.Posting,
                  match_data: Optional[List[str]]):
         super().__init__(posting, match_data)
 
         self._account_consolidation_manager = account_consolidation_manager
         self._account_consolidation: Optional[AccountConsolidationData] = None
+        self._numbers: Optional[Dict[str, Decimal]] = None
 
     def add_posting(self, source_account_postfix: str, target_account_postfix: str, number: Decimal) -> None:
+        if self._numbers is None:
+            self._numbers = {}
         number_in_dict = self._numbers.get(source_account_postfix)
         if number_in_dict is None:
             self._numbers[source_account_postfix] = number
@@ -1,12 +1,15 @@
 from abc import abstractmethod
-from copy import deepcopy
-from typing import Dict
+from collections import Counter
+from typing import Dict, Optional
 
 from beancount.core import data
 
 from ..data.account_consolidation_data import AccountConsolidationData
 from ..data.entry_manipulation_result_data import EntryManipulationResultData
+from ..data.entry_manipulator_trigger_data import EntryManipulatorTriggerData
 from ..entry_manipulator_base import EntryManipulatorBase
+from ..utils.metadata_overlay import MetadataOverlay
+from ..utils.rounder import Rounder
 
 
 class SplitDataBase:
@@ -53,8 +56,10 @@ class NoSplitter:
 
 class SplitterBase:
 
-    def __init__(self, metadata_name_skip_split, roundings, entry, split_data):
+    def __init__(self, metadata_name_skip_split, roundings, entry, split_data, rounding_mode=None):
         self.roundings = roundings
+        self.rounding_mode = rounding_mode
+        self.rounder = Rounder(roundings, rounding_mode)
         self.entry = entry
         self.split_data = split_data
         self.new_cost = None
@@ -62,24 +67,40 @@ class SplitterBase:
     def split(self):
         self.split_data.before_split()
 
-        new_postings = []
-        for posting in self.entry.postings:
-            if not self.split_data.is_modify_needed(posting) or not self.is_modify_needed(posting):
-                new_postings.append(posting)
-                continue
-
-            new_unit = self.get_new_unit(posting)
-            new_cost = self.new_cost
+        new_postings = list(self.entry.postings)
+        positions = [position for position, posting in enumerate(new_postings)
+                     if self.split_data.is_modify_needed(posting) and self.is_modify_needed(posting)]
+        if len(positions) == 0:
+            return self.entry
+        new_units = self.get_new_units([new_postings[position] for position in positions])
 
-            new_posting = data.Posting(posting.account, new_unit, new_cost, posting.price, posting.flag, posting.meta)
-            new_postings.append(new_posting)
+        for position, new_unit in zip(positions, new_units):
+            posting = new_postings[position]
+            new_postings[position] = data.Posting(posting.account, new_unit, self.new_cost, posting.price,
+                                                  posting.flag, posting.meta)
 
         return data.Transaction(self.entry.meta, self.entry.date, self.entry.flag, self.entry.payee,
                                 self.entry.narration, self.entry.tags,
                                 self.entry.links, new_postings)
 
+    def get_new_units(self, postings):
+        positions_by_currency = {}
+        for position, posting in enumerate(postings):
+            positions_by_currency.setdefault(self.get_currency(posting), []).append(position)
+
+        new_units = [None] * len(postings)
+        for currency, positions in positions_by_currency.items():
+            numbers = self.get_numbers([postings[position] for position in positions], currency)
+            for position, number in zip(positions, numbers):
+                new_units[position] = data.Amount(number, currency)
+        return new_units
+
+    @abstractmethod
+    def get_numbers(self, postings, currency):
+        pass
+
     @abstractmethod
-    def get_new_unit(self, posting):
+    def get_currency(self, posting):
         pass
 
     def round(self, number, currency):
@@ -97,9 +118,10 @@ class SplitterBase:
 
 
 class EqualSplitter(SplitterBase):
-    def __init__(self, metadata_name_type, metadata_name_skip_split, roundings, entry, post_with_split_data):
+    def __init__(self, metadata_name_type, metadata_name_skip_split, roundings, entry, post_with_split_data,
+                 rounding_mode=None):
         split_data = PostWithSplitData(metadata_name_type, post_with_split_data)
-        super().__init__(metadata_name_skip_split, roundings, entry, split_data)
+        super().__init__(metadata_name_skip_split, roundings, entry, split_data, rounding_mode)
 
         divider = 0
         number = post_with_split_data.units.number
@@ -112,14 +134,18 @@ class EqualSplitter(SplitterBase):
             else:
                 divider += 1
 
-        number = number / divider
-        number = self.round(number, post_with_split_data.units.currency)
-        self.new_unit = data.Amount(
-            -number,
-            post_with_split_data.units.currency)
+        self.number_to_split = -number
+        self.divider = divider
+        self.currency = post_with_split_data.units.currency
+        self.new_number = -self.round(number / divider, self.currency)
 
-    def get_new_unit(self, posting):
-        return self.new_unit
+    def get_numbers(self, postings, currency):
+        if self.rounding_mode != "largest-remainder" or self.roundings is None or self.roundings.get(currency) is None:
+            return [self.new_number] * len(postings)
+        return self.rounder.allocate_shares(self.number_to_split, [1] * len(postings), self.divider, currency)
+
+    def get_currency(self, posting):
+        return self.currency
 
 
 class ProportionSplitDataBase:
@@ -147,19 +173,11 @@ class MetadataProportionSplitData(ProportionSplitDataBase):
         return self.metadata_name_split_ratio in posting.meta
 
 
-class DiscountProportionSplitData(ProportionSplitDataBase):
-    def __init__(self, discount_id):
-        self.discount_id = discount_id
-
-    def is_modify_needed(self, posting):
-        return "discount-ids" in posting.meta and str(self.discount_id) in posting.meta["discount-ids"].split(",")
-
-
 class ProportionSplitter(SplitterBase):
     def __init__(self, metadata_name_skip_split, proportion_split_data, roundings, entry,
                  split_data,
-                 number_to_split, new_cost=None):
-        super().__init__(metadata_name_skip_split, roundings, entry, split_data)
+                 number_to_split, new_cost=None, rounding_mode=None):
+        super().__init__(metadata_name_skip_split, roundings, entry, split_data, rounding_mode)
 
         self.proportion_split_data = proportion_split_data
         self.number_to_split = number_to_split
@@ -170,75 +188,102 @@ class ProportionSplitter(SplitterBase):
             if self.proportion_split_data.is_modify_needed(posting):
                 self.max_number += self.proportion_split_data.get_number(posting)
 
-    def get_new_unit(self, posting):
-        number = self.proportion_split_data.get_number(posting) / self.max_number * self.number_to_split
-        number = self.round(number, self.proportion_split_data.get_currency(posting))
-        return data.Amount(number,
-                           self.proportion_split_data.get_currency(posting))
+    def get_numbers(self, postings, currency):
+        weights = [self.proportion_split_data.get_number(posting) for posting in postings]
+        return self.rounder.allocate_shares(self.number_to_split, weights, self.max_number, currency)
+
+    def get_currency(self, posting):
+        return self.proportion_split_data.get_currency(posting)
 
     def is_modify_needed(self, posting):
         return self.proportion_split_data.is_modify_needed(posting)
 
 
 class DiscountSplitter:
-    def __init__(self, metadata_name_type, metadata_name_skip_split, roundings):
+    def __init__(self, metadata_name_type, metadata_name_skip_split, roundings, rounding_mode=None):
         self.metadata_name_type = metadata_name_type
         self.metadata_name_skip_split = metadata_name_skip_split
-        self.roundings = roundings
+        self.rounder = Rounder(roundings, rounding_mode)
 
     def split(self, entry):
-        new_entry = entry
-
-        discount_id = 1
-        while "discount-" + str(discount_id) in entry.meta:
-            new_entry = self.__single_split(new_entry, discount_id)
-            discount_id += 1
+        discount_count = 0
+        while "discount-" + str(discount_count + 1) in entry.meta:
+            discount_count += 1
+        if discount_count == 0:
+            return self.__replace_accounts(entry)
 
-        return self.__replace_accounts(new_entry)
-
-    def __single_split(self, entry, discount_id):
-        number_to_split = -entry.meta["discount-" + str(discount_id)].number
+        EntryWithSplitData(entry, self.metadata_name_type).before_split()
 
-        visited_accounts = set()
         new_postings = []
+        discount_positions = [[] for _ in range(discount_count)]
         for posting in entry.postings:
-            if not "discount-ids" in posting.meta or str(discount_id) not in posting.meta["discount-ids"].split(","):
+            if not "discount-ids" in posting.meta:
                 new_postings.append(posting)
                 continue
 
-            shared_meta = {}
-            for key, value in posting.meta.items():
-                if key != "discount-ids":
-                    shared_meta[key] = value
+            discount_ids, remaining_discount_ids = self.__get_discount_ids(posting.meta["discount-ids"],
+                                                                           discount_count)
+            if len(discount_ids) == 0:
+                new_postings.append(posting)
+                continue
 
-            new_postings.append(self.__create_original_posting(discount_id, shared_meta, posting))
-            new_postings.append(self.__create_discount_posting(discount_id, shared_meta, posting))
-            visited_accounts.add(posting.account)
+            new_meta = MetadataOverlay(posting.meta, "discount-ids", remaining_discount_ids)
+            new_postings.append(
+                data.Posting(posting.account, posting.units, posting.cost, posting.price, posting.flag, new_meta))
+            for discount_id in reversed(discount_ids):
+                discount_positions[discount_id - 1].append(len(new_postings))
+                new_meta = MetadataOverlay(posting.meta, "discount-ids", str(discount_id))
+                new_postings.append(
+                    data.Posting(posting.account, posting.units, None, posting.price, posting.flag, new_meta))
+
+        for discount_id, positions in enumerate(discount_positions, 1):
+            number_to_split = -entry.meta["discount-" + str(discount_id)].number
+            self.__split_discount(new_postings, positions, number_to_split)
 
         new_entry = data.Transaction(entry.meta, entry.date, entry.flag, entry.payee,
                                      entry.narration, entry.tags,
                                      entry.links, new_postings)
 
-        split_data = EntryWithSplitData(new_entry, self.metadata_name_type if discount_id == 1 else None)
-        proportion_split_data = DiscountProportionSplitData(discount_id)
-        new_entry = ProportionSplitter(self.metadata_name_skip_split, proportion_split_data,
-                                       self.roundings, new_entry, split_data, number_to_split).split()
-
-        return new_entry
-
-    @staticmethod
-    def __create_discount_posting(discount_id, shared_meta, posting):
-        new_meta = deepcopy(shared_meta)
-        new_meta["discount-ids"] = str(discount_id)
-        return data.Posting(posting.account, posting.units, posting.cost, posting.price, posting.flag, new_meta)
+        return self.__replace_accounts(new_entry)
 
     @staticmethod
-    def __create_original_posting(discount_id, shared_meta, posting):
-        new_meta = deepcopy(shared_meta)
-        if "," in posting.meta["discount-ids"]:
-            new_meta["discount-ids"] = ",".join(
-                filter(lambda v: v != str(discount_id), posting.meta["discount-ids"].split(",")))
-        return data.Posting(posting.account, posting.units, posting.cost, posting.price, posting.flag, new_meta)
+    def __get_discount_ids(discount_ids, discount_count):
+        tokens = discount_ids.split(",")
+        token_counts = Counter(tokens)
+
+        candidate_ids = []
+        for token in token_counts:
+            discount_id = int(token) if token.isdecimal() else 0
+            if 1 <= discount_id <= discount_count and str(discount_id) == token:
+                candidate_ids.append(discount_id)
+        candidate_ids.sort()
+
+        remaining_count = len(tokens)
+        for position, discount_id in enumerate(candidate_ids):
+            if remaining_count == 1:
+                return candidate_ids[:position + 1], None
+            remaining_count -= token_counts[str(discount_id)]
+
+        split_tokens = {str(discount_id) for discount_id in candidate_ids}
+        return candidate_ids, ",".join(token for token in tokens if token not in split_tokens)
+
+    def __split_discount(self, postings, positions, number_to_split):
+        if len(positions) == 0:
+            return
+
+        max_number = 0
+        positions_by_currency = {}
+        for position in positions:
+            max_number += postings[position].units.number
+            positions_by_currency.setdefault(postings[position].units.currency, []).append(position)
+
+        for currency, currency_positions in positions_by_currency.items():
+            weights = [postings[position].units.number for position in currency_positions]
+            numbers = self.rounder.allocate_shares(number_to_split, weights, max_number, currency)
+            for position, number in zip(currency_positions, numbers):
+                posting = postings[position]
+                postings[position] = data.Posting(posting.account, data.Amount(number, currency), None,
+                                                  posting.price, posting.flag, posting.meta)
 
     def __replace_accounts(self, entry):
         new_postings = []
@@ -247,6 +292,8 @@ class DiscountSplitter:
         for posting in entry.postings:
             if "discount-ids" in posting.meta:
                 relevant_accounts.add(posting.account)
+        if len(relevant_accounts) == 0:
+            return entry, []
 
         account_consolidators: Dict[str, AccountConsolidationData] = {}
         for posting in entry.postings:
@@ -270,16 +317,26 @@ class DiscountSplitter:
 
 
 class PostingSplitter(EntryManipulatorBase):
+    config_keys = EntryManipulatorBase.config_keys | {
+        "roundings", "rounding-mode", "metadata-name-type", "metadata-name-skip-split", "metadata-name-unit",
+        "metadata-name-exchange-rate", "metadata-name-split-ratio"}
 
     def __init__(self, config):
         super().__init__(config)
 
         self.roundings = config.get("roundings")
+        self.rounding_mode = config.get("rounding-mode")
+        if self.rounding_mode not in (None, "independent", "largest-remainder"):
+            raise Exception("Rounding mode not implemented: " + self.rounding_mode)
         self.metadata_name_type = config["metadata-name-type"]
         self.metadata_name_skip_split = config.get("metadata-name-skip-split")
         self.metadata_name_unit = config.get("metadata-name-unit")
         self.metadata_name_exchange_rate = config.get("metadata-name-exchange-rate")
         self.metadata_name_split_ratio = config.get("metadata-name-split-ratio")
+        self.trigger = EntryManipulatorTriggerData([self.metadata_name_type], [self.metadata_name_type])
+
+    def get_trigger(self) -> Optional[EntryManipulatorTriggerData]:
+        return self.trigger
 
     def execute(self, entry: data.Transaction) -> EntryManipulationResultData:
         new_entry, account_consolidators = self.__split_single_entry(entry)
@@ -304,12 +361,13 @@ class PostingSplitter(EntryManipulatorBase):
         return self.__get_posting_level_splitter(entry, post_with_split_data).split(), None
 
     def __get_entry_level_splitter(self) -> DiscountSplitter:
-        return DiscountSplitter(self.metadata_name_type, self.metadata_name_split_ratio, self.roundings)
+        return DiscountSplitter(self.metadata_name_type, self.metadata_name_split_ratio, self.roundings,
+                                self.rounding_mode)
 
     def __get_posting_level_splitter(self, entry, post_with_split_data):
         if post_with_split_data.meta[self.metadata_name_type] == "equal":
             return EqualSplitter(self.metadata_name_type, self.metadata_name_skip_split, self.roundings, entry,
-                                 post_with_split_data)
+                                 post_with_split_data, self.rounding_mode)
         elif (post_with_split_data.meta[self.metadata_name_type] == "proportional"
               and self.metadata_name_split_ratio is not None):
             return self.__get_proportion_splitter(entry, post_with_split_data)
@@ -329,9 +387,11 @@ class PostingSplitter(EntryManipulatorBase):
             del post_with_split_data.meta[self.metadata_name_exchange_rate]
             return ProportionSplitter(self.metadata_name_skip_split,
                                       proportion_split_data,
-                                      self.roundings, entry, split_data, number_to_split, new_cost)
+                                      self.roundings, entry, split_data, number_to_split, new_cost,
+                                      self.rounding_mode)
         else:
             number_to_split = -post_with_split_data.units.number
             return ProportionSplitter(self.metadata_name_skip_split,
                                       proportion_split_data,
-                                      self.roundings, entry, split_data, number_to_split)
+                                      self.roundings, entry, split_data, number_to_split,
+                                      rounding_mode=self.rounding_mode)
@@ -613,6 +613,132 @@ class TestPostingSplitter(cmptest.TestCase):
             new_entries,
         )
 
+    @loader.load_doc(expect_errors=True)
+    def test_equal_split_largest_remainder_without_rounding(self, entries, _, options_map):
+        """
+        2016-05-31 * "Exams"
+            Assets:Bank                 -900 HUF
+                split-mode: "equal"
+            Expenses:Exam                  0 HUF
+            Expenses:Exam                  0 HUF
+            Expenses:Exam                  0 HUF
+        """
+        config_str = ('{"manipulators": ['
+                      '{'
+                      '  "type":"posting-splitter",'
+                      '  "roundings":{'
+                      '      "USD":2'
+                      '    },'
+                      '  "rounding-mode":"largest-remainder",'
+                      '  "metadata-name-type":"split-mode"'
+                      '}'
+                      ']}')
+        new_entries, _ = entry_manipulators(entries, options_map, config_str)
+
+        self.assertEqualEntries(
+            """
+        2016-05-31 * "Exams"
+            Assets:Bank                 -900 HUF
+            Expenses:Exam                300 HUF
+            Expenses:Exam                300 HUF
+            Expenses:Exam                300 HUF
+        """,
+            new_entries,
+        )
+
+    @loader.load_doc(expect_errors=True)
+    def test_equal_split_largest_remainder_rounding(self, entries, _, options_map):
+        """
+        2016-05-31 * "Exams"
+            Assets:Bank                 -800 HUF
+                split-mode: "equal"
+            Expenses:Exam                  0 HUF
+            Expenses:Exam                  0 HUF
+            Expenses:Exam                  0 HUF
+        """
+        config_str = ('{"manipulators": ['
+                      '{'
+                      '  "type":"posting-splitter",'
+                      '  "roundings":{'
+                      '      "HUF":2'
+                      '    },'
+                      '  "rounding-mode":"largest-remainder",'
+                      '  "metadata-name-type":"split-mode"'
+                      '}'
+                      ']}')
+        new_entries, _ = entry_manipulators(entries, options_map, config_str)
+
+        self.assertEqualEntries(
+            """
+        2016-05-31 * "Exams"
+            Assets:Bank                 -800 HUF
+            Expenses:Exam             266.67 HUF
+            Expenses:Exam             266.67 HUF
+            Expenses:Exam             266.66 HUF
+        """,
+            new_entries,
+        )
+
+    @loader.load_doc(expect_errors=True)
+    def test_proportional_split_without_ratios_preserves_entry(self, entries, _, options_map):
+        """
+        2016-05-31 * "Exams"
+            Assets:Bank                     -4 USD
+                split-mode: "proportional"
+            Expenses:Exam                    4 USD
+        """
+        config_str = ('{"manipulators": ['
+                      '{'
+                      '  "type":"posting-splitter",'
+                      '  "metadata-name-type":"split-mode",'
+                      '  "metadata-name-split-ratio":"msrp"'
+                      '}'
+                      ']}')
+        new_entries, _ = entry_manipulators(entries, options_map, config_str)
+
+        self.assertIs(entries[0], new_entries[0])
+        self.assertNotIn("split-mode", new_entries[0].postings[0].meta)
+
+    @loader.load_doc(expect_errors=True)
+    def test_many_discounts_split_in_one_pass(self, entries, _, options_map):
+        """
+        2016-05-31 * ""
+            split-mode: "discount"
+            discount-1:                  100 HUF
+            discount-2:                   50 HUF
+            discount-3:                  200 HUF
+            Assets:Bank                 -850 HUF
+            Expenses:Bread               600 HUF
+                discount-ids: "1,3"
+            Expenses:Butter              400 HUF
+                discount-ids: "3,2"
+            Expenses:Milk                200 HUF
+                discount-ids: "3"
+        """
+        config_str = ('{"manipulators": ['
+                      '{'
+                      '  "type":"posting-splitter",'
+                      '  "metadata-name-type":"split-mode",'
+                      '  "roundings":{'
+                      '      "HUF":2'
+                      '    },'
+                      '}'
+                      ']}')
+        new_entries, _ = entry_manipulators(entries, options_map, config_str)
+
+        self.assertEqual([
+            ("Assets:Bank", "-850 HUF", None),
+            ("Expenses:Bread:Price", "600 HUF", None),
+            ("Expenses:Bread:Discount", "-100.00 HUF", "3"),
+            ("Expenses:Bread:Discount", "-100.00 HUF", "1"),
+            ("Expenses:Butter:Price", "400 HUF", None),
+            ("Expenses:Butter:Discount", "-66.67 HUF", "3"),
+            ("Expenses:Butter:Discount", "-50.00 HUF", "2"),
+            ("Expenses:Milk:Price", "200 HUF", None),
+            ("Expenses:Milk:Discount", "-33.33 HUF", "3"),
+        ], [(posting.account, posting.units.to_string(), posting.meta.get("discount-ids"))
+            for posting in new_entries[0].postings])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,105 +1,100 @@
-import re
+from typing import List, Optional, Tuple
 
 from beancount.core import data
 
 from ..data.entry_manipulation_result_data import EntryManipulationResultData
+from ..data.entry_manipulator_trigger_data import EntryManipulatorTriggerData
+from ..data.transaction_split_rule_data import TransactionSplitRuleData
 from ..entry_manipulator_base import EntryManipulatorBase
 
 
 class TransactionSplitter(EntryManipulatorBase):
+    config_keys = EntryManipulatorBase.config_keys | {
+        "metadata-name-date", "metadata-name-transfer-account", "transfer-account", "account",
+        "dated-posting-move-mode", "stayed-narration", "moved-narration", "metadata-name-moved-narration"}
+
     def __init__(self, config):
         super().__init__(config)
 
-        self.metadata_name_date = config["metadata-name-date"]
-        self.metadata_name_transfer_account = config.get("metadata-name-transfer-account")
+        self.rule = TransactionSplitRuleData(config)
+
+        self.trigger = EntryManipulatorTriggerData()
+        if self.rule.is_enabled():
+            self.trigger = EntryManipulatorTriggerData(posting_metadata_names=[self.rule.metadata_name_date])
 
-        self.transfer_account_get = None
-        if self.metadata_name_transfer_account is not None:
-            self.transfer_account_get = lambda p: p.meta.get(
-                self.metadata_name_transfer_account
-            )
-        elif "transfer-account" in self.config:
-            self.transfer_account_get = lambda _: self.config["transfer-account"]
+    def get_trigger(self) -> Optional[EntryManipulatorTriggerData]:
+        return self.trigger
 
     def execute(self, entry: data.Transaction) -> EntryManipulationResultData:
-        metadata_names_to_remove = {self.metadata_name_date}
+        rule = self.rule
+        if not rule.is_enabled():
+            return EntryManipulationResultData([entry])
+        if rule.dated_posting_move_mode is None:
+            raise Exception("Dated posting move mode is not configured")
+        if rule.dated_posting_move_mode not in ("stay", "move"):
+            return EntryManipulationResultData([entry])
 
-        if self.metadata_name_transfer_account is not None:
-            metadata_names_to_remove.add(self.metadata_name_transfer_account)
-        elif "transfer-account" in self.config:
-            pass
-        else:
+        dated_postings, other_postings = self.__get_dated_and_other_postings(entry)
+        if len(dated_postings) == 0:
             return EntryManipulationResultData([entry])
 
-        transactions_to_return = []
-        entries_to_process = [entry]
-        while len(entries_to_process) > 0:
-            main_txn = entries_to_process.pop(0)
-            new_transactions = self.__process_entry(main_txn, metadata_names_to_remove)
-            if new_transactions is None:
-                transactions_to_return.append(main_txn)
-            else:
-                for new_transaction in new_transactions:
-                    entries_to_process.append(new_transaction)
-
-        return EntryManipulationResultData(transactions_to_return)
-
-    def __process_entry(self, main_txn, metadata_names_to_remove):
-        for main_posting in main_txn.postings:
-            new_transactions = self.__process_posting(main_txn, main_posting, metadata_names_to_remove)
-            if new_transactions is not None:
-                return new_transactions
-
-        return None
-
-    def __process_posting(self, entry, main_posting, metadata_names_to_remove):
-        dated_posting_move_mode = self.config["dated-posting-move-mode"]
-
-        if not main_posting.meta or not self.metadata_name_date in main_posting.meta:
-            return None
-        if "account" in self.config and not re.search(self.config["account"], main_posting.account):
-            return None
-
-        (stayed_narration, moved_narration, metadata_name_to_remove) = self.__get_narration(entry, main_posting)
-        if metadata_name_to_remove:
-            metadata_names_to_remove.add(metadata_name_to_remove)
-
-        modified_main_posting = self.__get_main_posting_copy(main_posting, metadata_names_to_remove)
-        other_postings = list(filter(lambda p: p != main_posting, entry.postings))
-
-        transfer_account = self.transfer_account_get(main_posting)
-        if transfer_account is None:
-            return None
-
-        if dated_posting_move_mode == "stay":
-            postings_for_original_txn = [modified_main_posting,
-                                         self.__create_transfer_posting(main_posting, transfer_account, True)]
-            postings_for_new_txn = other_postings
-            postings_for_new_txn.append(self.__create_transfer_posting(main_posting, transfer_account, False))
-        elif dated_posting_move_mode == "move":
-            postings_for_original_txn = other_postings
-            postings_for_original_txn.append(self.__create_transfer_posting(main_posting, transfer_account, False))
-            postings_for_new_txn = [modified_main_posting,
-                                    self.__create_transfer_posting(main_posting, transfer_account, True)]
-        else:
-            return None
-
-        new_transactions = [self.__recreate_existing_txn(entry, postings_for_original_txn, stayed_narration)]
-
-        date = self.__get_date(main_posting)
-        new_transactions.append(self.__create_new_txn(
-            entry,
-            postings_for_new_txn,
-            date,
-            moved_narration,
-        ))
+        other_postings.extend(self.__create_transfer_posting(dated_posting, False) for dated_posting in dated_postings)
+
+        if rule.dated_posting_move_mode == "stay":
+            return EntryManipulationResultData(self.__split_stay(entry, dated_postings, other_postings))
+        return EntryManipulationResultData(self.__split_move(entry, dated_postings, other_postings))
+
+    def __get_dated_and_other_postings(self, entry) -> Tuple[List[data.Posting], List[data.Posting]]:
+        dated_postings = []
+        other_postings = []
+        dated_postings_by_key = {}
+        for posting in entry.postings:
+            if not self.rule.is_split_needed(posting):
+                other_postings.append(posting)
+                continue
+
+            key = (posting.account, posting.units, posting.meta.get("lineno"))
+            same_key_postings = dated_postings_by_key.setdefault(key, [])
+            if not any(posting == dated_posting for dated_posting in same_key_postings):
+                same_key_postings.append(posting)
+                dated_postings.append(posting)
+        return dated_postings, other_postings
+
+    def __split_stay(self, entry, dated_postings, other_postings):
+        rule = self.rule
+        new_transactions = []
+        date = entry.date
+        narration = entry.narration
+        for dated_posting in dated_postings:
+            postings = [self.__get_main_posting_copy(dated_posting),
+                        self.__create_transfer_posting(dated_posting, True)]
+            new_transactions.append(self.__create_txn(entry, postings, date, rule.get_stayed_narration(narration)))
+            date = self.__get_date(dated_posting)
+            narration = rule.get_moved_narration(dated_posting, narration)
+
+        new_transactions.append(self.__create_txn(entry, other_postings, date, narration))
+        return new_transactions
+
+    def __split_move(self, entry, dated_postings, other_postings):
+        rule = self.rule
+        new_transactions = []
+        narration = entry.narration
+        for dated_posting in dated_postings:
+            postings = [self.__get_main_posting_copy(dated_posting),
+                        self.__create_transfer_posting(dated_posting, True)]
+            new_transactions.append(self.__create_txn(entry, postings, self.__get_date(dated_posting),
+                                                      rule.get_moved_narration(dated_posting, narration)))
+            narration = rule.get_stayed_narration(narration)
+
+        new_transactions.insert(len(new_transactions) - 1,
+                                self.__create_txn(entry, other_postings, entry.date, narration))
         return new_transactions
 
     def __get_date(self, relevant_posting):
-        return relevant_posting.meta[self.metadata_name_date]
+        return relevant_posting.meta[self.rule.metadata_name_date]
 
-    @staticmethod
-    def __get_main_posting_copy(main_posting, metadata_names_to_remove):
+    def __get_main_posting_copy(self, main_posting):
+        metadata_names_to_remove = self.rule.metadata_names_to_remove
         meta = {}
         for key in main_posting.meta:
             if key not in metadata_names_to_remove:
@@ -108,27 +103,11 @@ class TransactionSplitter(EntryManipulatorBase):
         return data.Posting(main_posting.account, main_posting.units, main_posting.cost,
                             main_posting.price, main_posting.flag, meta)
 
-    def __get_narration(self, entry, relevant_posting):
-        stayed_narration = self.config.get("stayed-narration")
-        moved_narration = self.config.get("moved-narration")
-        metadata_name_moved_narration = self.config.get("metadata-name-moved-narration")
-        if metadata_name_moved_narration is not None and metadata_name_moved_narration in relevant_posting.meta:
-            moved_narration = relevant_posting.meta[metadata_name_moved_narration]
-        if stayed_narration is None: stayed_narration = entry.narration
-        if moved_narration is None: moved_narration = entry.narration
-        return stayed_narration, moved_narration, metadata_name_moved_narration
-
-    @staticmethod
-    def __create_transfer_posting(main_posting, transfer_account, with_main_posting):
+    def __create_transfer_posting(self, main_posting, with_main_posting):
         units = data.Amount(-main_posting.units.number if with_main_posting else main_posting.units.number,
                             main_posting.units.currency)
-        return data.Posting(transfer_account, units, None, None, None, None)
-
-    @staticmethod
-    def __recreate_existing_txn(txn, postings, narration):
-        return data.Transaction(txn.meta, txn.date, txn.flag, txn.payee, narration, txn.tags, txn.links,
-                                postings)
+        return data.Posting(self.rule.get_transfer_account(main_posting), units, None, None, None, None)
 
     @staticmethod
-    def __create_new_txn(txn, postings, date, narration):
+    def __create_txn(txn, postings, date, narration):
         return data.Transaction(txn.meta, date, txn.flag, txn.payee, narration, txn.tags, txn.links, postings)
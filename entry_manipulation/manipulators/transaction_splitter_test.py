@@ -595,6 +595,51 @@ class TestTransactionSplitter(cmptest.TestCase):
             new_entries,
         )
 
+    @loader.load_doc(expect_errors=True)
+    def test_multiple_metadata_date_stay_chains_dates(self, entries, _, options_map):
+        """
+        2013-05-31 * "Paid by card"
+            Assets:Bank:Checking      -60 USD
+                booking-date: 2013-06-03
+            Assets:Bank:Savings       -30 USD
+                booking-date: 2013-06-05
+            Assets:Bank:Other         -10 USD
+                booking-date: 2013-06-07
+            Expenses:Groceries         100 USD
+        """
+        config_str = ('{"manipulators": ['
+                      '{'
+                      '  "type":"transaction-splitter",'
+                      '  "metadata-name-date":"booking-date",'
+                      '  "transfer-account":"Liabilities:Bank:DebitCard",'
+                      '  "dated-posting-move-mode":"stay"'
+                      '}'
+                      ']}')
+        new_entries, _ = entry_manipulators(entries, options_map, config_str)
+
+        self.assertEqualEntries(
+            """
+        2013-05-31 * "Paid by card"
+            Assets:Bank:Checking          -60 USD
+            Liabilities:Bank:DebitCard     60 USD
+
+        2013-06-03 * "Paid by card"
+            Assets:Bank:Savings           -30 USD
+            Liabilities:Bank:DebitCard     30 USD
+
+        2013-06-05 * "Paid by card"
+            Assets:Bank:Other             -10 USD
+            Liabilities:Bank:DebitCard     10 USD
+
+        2013-06-07 * "Paid by card"
+            Expenses:Groceries            100 USD
+            Liabilities:Bank:DebitCard    -60 USD
+            Liabilities:Bank:DebitCard    -30 USD
+            Liabilities:Bank:DebitCard    -10 USD
+        """,
+            new_entries,
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,75 @@
+from collections.abc import MutableMapping
+from typing import Dict, Iterator, Optional
+
+
+class MetadataOverlay(MutableMapping):
+    __slots__ = ("_base", "_key", "_value", "_meta")
+
+    def __init__(self, base: Dict[str, object], key: str, value: Optional[object] = None) -> None:
+        if isinstance(base, MetadataOverlay) and base._meta is None and base._key == key:
+            base = base._base
+        self._base = base
+        self._key = key
+        self._value = value
+        self._meta: Optional[Dict[str, object]] = None
+
+    def __getitem__(self, key: str) -> object:
+        if self._meta is not None:
+            return self._meta[key]
+        if key == self._key:
+            if self._value is None:
+                raise KeyError(key)
+            return self._value
+        return self._base[key]
+
+    def __contains__(self, key: object) -> bool:
+        if self._meta is not None:
+            return key in self._meta
+        if key == self._key:
+            return self._value is not None
+        return key in self._base
+
+    def get(self, key: str, default=None):
+        if self._meta is not None:
+            return self._meta.get(key, default)
+        if key == self._key:
+            return self._value if self._value is not None else default
+        return self._base.get(key, default)
+
+    def __iter__(self) -> Iterator[str]:
+        if self._meta is not None:
+            return iter(self._meta)
+        return self.__iter_keys()
+
+    def __len__(self) -> int:
+        if self._meta is not None:
+            return len(self._meta)
+        return len(self._base) - (self._key in self._base) + (self._value is not None)
+
+    def __setitem__(self, key: str, value: object) -> None:
+        self.__materialize()[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self.__materialize()[key]
+
+    def __repr__(self) -> str:
+        return repr(self.copy())
+
+    def __reduce__(self):
+        return dict, (list(self.items()),)
+
+    def copy(self) -> Dict[str, object]:
+        return {key: self[key] for key in self}
+
+    def __iter_keys(self) -> Iterator[str]:
+        for key in self._base:
+            if key != self._key:
+                yield key
+        if self._value is not None:
+            yield self._key
+
+    def __materialize(self) -> Dict[str, object]:
+        if self._meta is None:
+            self._meta = self.copy()
+            self._base = None
+        return self._meta
@@ -0,0 +1,44 @@
+import copy
+import pickle
+import unittest
+
+from entry_manipulation.utils.metadata_overlay import MetadataOverlay
+
+
+class MetadataOverlayTest(unittest.TestCase):
+    def test_overlay_replaces_and_removes_key(self):
+        base = {"filename": "<string>", "discount-ids": "1,2", "note": "text"}
+
+        replaced = MetadataOverlay(base, "discount-ids", "1")
+        removed = MetadataOverlay(base, "discount-ids")
+
+        self.assertEqual({"filename": "<string>", "note": "text", "discount-ids": "1"}, replaced)
+        self.assertEqual(["filename", "note", "discount-ids"], list(replaced))
+        self.assertEqual({"filename": "<string>", "note": "text"}, removed)
+        self.assertNotIn("discount-ids", removed)
+        self.assertIsNone(removed.get("discount-ids"))
+        self.assertEqual(2, len(removed))
+        self.assertEqual(repr({"filename": "<string>", "note": "text"}), repr(removed))
+
+    def test_write_does_not_touch_base(self):
+        base = {"discount-ids": "1,2", "note": "text"}
+        first = MetadataOverlay(base, "discount-ids", "1")
+        second = MetadataOverlay(first, "discount-ids", "2")
+
+        first["note"] = "changed"
+        del second["note"]
+
+        self.assertEqual({"discount-ids": "1,2", "note": "text"}, base)
+        self.assertEqual({"discount-ids": "1", "note": "changed"}, first)
+        self.assertEqual({"discount-ids": "2"}, second)
+
+    def test_copies_are_dicts(self):
+        overlay = MetadataOverlay({"discount-ids": "1,2", "note": "text"}, "discount-ids", "2")
+
+        for overlay_copy in (copy.deepcopy(overlay), pickle.loads(pickle.dumps(overlay)), overlay.copy()):
+            self.assertIs(dict, type(overlay_copy))
+            self.assertEqual({"note": "text", "discount-ids": "2"}, overlay_copy)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,16 @@
+import math
 from decimal import Decimal
-from typing import Dict
+from typing import Dict, List, Optional
 
 
 class Rounder:
     roundings: Dict[str, int]
 
-    def __init__(self, roundings: Dict[str, int]) -> None:
+    def __init__(self, roundings: Dict[str, int], rounding_mode: Optional[str] = None) -> None:
+        if rounding_mode not in (None, "independent", "largest-remainder"):
+            raise Exception("Rounding mode not implemented: " + rounding_mode)
         self.roundings = roundings
+        self.rounding_mode = rounding_mode
 
     def round(self, number: int, currency: str) -> Decimal:
         if self.roundings is None:
@@ -17,3 +21,74 @@ class Rounder:
             return Decimal(number)
 
         return Decimal(round(number, decimals))
+
+    def round_all(self, numbers: List[Decimal], currency: str) -> List[Decimal]:
+        if self.rounding_mode == "largest-remainder":
+            return self.allocate(numbers, currency)
+
+        decimals = self.roundings.get(currency) if self.roundings is not None else None
+        if decimals is None:
+            return [Decimal(number) for number in numbers]
+
+        quantum = Decimal(1).scaleb(-decimals)
+        return [number.quantize(quantum) if isinstance(number, Decimal) else Decimal(round(number, decimals))
+                for number in numbers]
+
+    def allocate(self, numbers: List[Decimal], currency: str) -> List[Decimal]:
+        decimals = self.roundings.get(currency) if self.roundings is not None else None
+        if decimals is None:
+            return [Decimal(number) for number in numbers]
+
+        return self.__allocate_quanta(1, numbers, 1, decimals)
+
+    def allocate_shares(self, number: Decimal, weights: List[Decimal], total_weight: Decimal,
+                        currency: str) -> List[Decimal]:
+        decimals = self.roundings.get(currency) if self.roundings is not None else None
+        if decimals is None:
+            return [weight / total_weight * number for weight in weights]
+
+        if self.rounding_mode == "largest-remainder":
+            return self.__allocate_quanta(number, weights, total_weight, decimals)
+
+        quantum = Decimal(1).scaleb(-decimals)
+        return [(weight / total_weight * number).quantize(quantum) for weight in weights]
+
+    @staticmethod
+    def __allocate_quanta(number, weights, total_weight, decimals: int) -> List[Decimal]:
+        weight_ratios = [weight.as_integer_ratio() for weight in weights]
+        weight_denominator = math.lcm(*(denominator for _, denominator in weight_ratios))
+        number_numerator, number_denominator = number.as_integer_ratio()
+        total_numerator, total_denominator = total_weight.as_integer_ratio()
+
+        numerator = number_numerator * total_denominator
+        denominator = number_denominator * total_numerator * weight_denominator
+        if decimals >= 0:
+            numerator *= 10 ** decimals
+        else:
+            denominator *= 10 ** -decimals
+        if denominator < 0:
+            numerator, denominator = -numerator, -denominator
+
+        quanta = []
+        remainders = []
+        scaled_weight_sum = 0
+        for weight_numerator, denominator_part in weight_ratios:
+            scaled_weight = weight_numerator * (weight_denominator // denominator_part)
+            quantum, remainder = divmod(scaled_weight * numerator, denominator)
+            quanta.append(quantum)
+            remainders.append(remainder)
+            scaled_weight_sum += scaled_weight
+
+        total, total_remainder = divmod(scaled_weight_sum * numerator, denominator)
+        if 2 * total_remainder > denominator or (2 * total_remainder == denominator and total % 2 == 1):
+            total += 1
+        remainder_count = total - sum(quanta)
+
+        positions = sorted(range(len(quanta)), key=lambda position: (-remainders[position], position))
+        if remainder_count >= 0:
+            for position in positions[:remainder_count]:
+                quanta[position] += 1
+        else:
+            for position in positions[remainder_count:]:
+                quanta[position] -= 1
+        return [Decimal(quantum).scaleb(-decimals) for quantum in quanta]
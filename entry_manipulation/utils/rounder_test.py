@@ -0,0 +1,36 @@
+import unittest
+from decimal import Decimal
+
+from entry_manipulation.utils.rounder import Rounder
+
+
+class RounderTest(unittest.TestCase):
+    def test_shares_rounded_independently(self):
+        rounder = Rounder({"USD": 2})
+
+        shares = rounder.allocate_shares(Decimal("16.35"), [Decimal(5), Decimal(1)], Decimal(6), "USD")
+
+        self.assertEqual([Decimal("13.62"), Decimal("2.73")], shares)
+
+    def test_largest_remainder_ties_broken_by_position(self):
+        rounder = Rounder({"USD": 2}, "largest-remainder")
+
+        shares = rounder.allocate_shares(Decimal("7.86"), [Decimal(6), Decimal("2.25"), Decimal(1), Decimal("1.25"),
+                                                           Decimal(9), Decimal(5), Decimal(4)],
+                                         Decimal("28.5"), "USD")
+
+        self.assertEqual([Decimal("1.66"), Decimal("0.62"), Decimal("0.28"), Decimal("0.34"), Decimal("2.48"),
+                          Decimal("1.38"), Decimal("1.10")], shares)
+        self.assertEqual(Decimal("7.86"), sum(shares))
+
+    def test_shares_without_rounding(self):
+        rounder = Rounder(None)
+
+        shares = rounder.allocate_shares(Decimal(4), [Decimal(20), Decimal(60)], Decimal(80), "USD")
+
+        self.assertEqual([Decimal("1.00"), Decimal("3.00")], shares)
+        self.assertEqual(["1.00", "3.00"], [str(share) for share in shares])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import ast
+import collections
+from functools import partial
+
+if __package__:
+    from .account_replacer import account_replacer_obj, AccountReplacer
+    from .balance_pad_creator import balance_pad_creator_obj
+    from .entry_manipulation.entry_manipulator_orchestrator import EntryManipulatorOrchestrator
+    from .post_splitter import PostSplitter
+    from .txn_splitter import txn_splitter_obj
+else:
+    from account_replacer import account_replacer_obj, AccountReplacer
+    from balance_pad_creator import balance_pad_creator_obj
+    from entry_manipulation.entry_manipulator_orchestrator import EntryManipulatorOrchestrator
+    from post_splitter import PostSplitter
+    from txn_splitter import txn_splitter_obj
+
+__plugins__ = ["plugin_chain"]
+
+CONFIG_KEYS = frozenset({"plugins"})
+PLUGIN_CONFIG_KEYS = frozenset({"name", "config"})
+PLUGIN_NAMES = ("account_replacer", "txn_splitter", "post_splitter", "entry_manipulators", "balance_pad_creator")
+
+PluginChainStage = collections.namedtuple("PluginChainStage", "name config_str")
+
+
+class PluginChain:
+
+    def __init__(self):
+        self.__configs_by_str = {}
+
+    def run(self, entries, options_map, config_str=""):
+        stages = self.get_config(config_str)
+
+        errors = []
+        entry_stages = []
+        for stage in stages:
+            if stage.name == "account_replacer":
+                replace_rules = account_replacer_obj.get_replace_rules(stage.config_str)
+                if replace_rules is not None:
+                    entry_stages.append(partial(self.__iter_replaced_entries, replace_rules))
+            elif stage.name == "txn_splitter":
+                entry_stages.append(partial(self.__iter_split_txns, txn_splitter_obj.get_config(stage.config_str)))
+            elif stage.name == "post_splitter":
+                post_splitter_obj = PostSplitter(options_map, stage.config_str)
+                price_accounts = {}
+                entry_stages.append(partial(self.__iter_split_posts, post_splitter_obj, price_accounts))
+                entries = self.__run_entry_stages(entries, entry_stages)
+                entry_stages = []
+                if len(price_accounts) > 0:
+                    entry_stages.append(partial(self.__iter_replaced_price_accounts, post_splitter_obj,
+                                                price_accounts))
+            elif stage.name == "entry_manipulators":
+                manipulators_config = EntryManipulatorOrchestrator.get_config(stage.config_str)
+                orchestrator = EntryManipulatorOrchestrator()
+                if not self.__is_entry_manipulators_fusible(manipulators_config):
+                    entries = self.__run_entry_stages(entries, entry_stages)
+                    entry_stages = []
+                    entries, stage_errors = orchestrator.execute(entries, options_map, stage.config_str)
+                    errors.extend(stage_errors)
+                    continue
+
+                manipulators = orchestrator.get_manipulators(manipulators_config)
+                entry_stages.append(partial(self.__iter_manipulated_entries, orchestrator, manipulators))
+                entries = self.__run_entry_stages(entries, entry_stages)
+                entry_stages = [orchestrator.iter_consolidated_entries]
+            elif stage.name == "balance_pad_creator":
+                entries = self.__run_entry_stages(entries, entry_stages)
+                entry_stages = []
+                entries, stage_errors = balance_pad_creator_obj.create(entries, options_map, stage.config_str)
+                errors.extend(stage_errors)
+
+        return self.__run_entry_stages(entries, entry_stages), errors
+
+    def get_config(self, config_str):
+        if config_str in self.__configs_by_str:
+            return self.__configs_by_str[config_str]
+
+        config = {}
+        expr = ast.literal_eval(config_str)
+        config.update(expr)
+
+        self.__check_config_keys(config, CONFIG_KEYS)
+        stages = []
+        for plugin_config in config.get("plugins", []):
+            self.__check_config_keys(plugin_config, PLUGIN_CONFIG_KEYS)
+            name = plugin_config.get("name")
+            if name not in PLUGIN_NAMES:
+                raise Exception("Plugin not implemented: " + str(name))
+            stage = PluginChainStage(name, repr(plugin_config.get("config", {})))
+            self.__compile_stage(stage)
+            stages.append(stage)
+
+        stages = tuple(stages)
+        self.__configs_by_str[config_str] = stages
+        return stages
+
+    @staticmethod
+    def __compile_stage(stage):
+        if stage.name == "account_replacer":
+            account_replacer_obj.get_replace_rules(stage.config_str)
+        elif stage.name == "txn_splitter":
+            txn_splitter_obj.get_config(stage.config_str)
+        elif stage.name == "post_splitter":
+            PostSplitter.get_config(stage.config_str)
+        elif stage.name == "entry_manipulators":
+            EntryManipulatorOrchestrator.get_config(stage.config_str)
+        elif stage.name == "balance_pad_creator":
+            balance_pad_creator_obj.get_config(stage.config_str)
+
+    @staticmethod
+    def __check_config_keys(config, config_keys):
+        unknown_keys = sorted(key for key in config if key not in config_keys)
+        if len(unknown_keys) > 0:
+            raise Exception("Config key not implemented: " + ", ".join(map(str, unknown_keys)))
+
+    @staticmethod
+    def __is_entry_manipulators_fusible(manipulators_config):
+        return (manipulators_config.instrumentation is None
+                and not manipulators_config.incremental
+                and manipulators_config.cache_dir is None
+                and (manipulators_config.workers is None or manipulators_config.workers <= 1))
+
+    @staticmethod
+    def __run_entry_stages(entries, entry_stages):
+        if len(entry_stages) == 0:
+            return entries
+
+        entries = iter(entries)
+        for entry_stage in entry_stages:
+            entries = entry_stage(entries)
+        return list(entries)
+
+    @staticmethod
+    def __iter_replaced_entries(replace_rules, entries):
+        for entry in entries:
+            yield AccountReplacer.replace_entry(entry, replace_rules)
+
+    @staticmethod
+    def __iter_split_txns(txn_splitter_config, entries):
+        for entry in entries:
+            yield from txn_splitter_obj.split_entry(txn_splitter_config, entry)
+
+    @staticmethod
+    def __iter_split_posts(post_splitter_obj, price_accounts, entries):
+        for entry in entries:
+            new_entry, relevant_accounts = post_splitter_obj.split_entry(entry)
+            post_splitter_obj.add_price_accounts(price_accounts, relevant_accounts)
+            yield new_entry
+
+    @staticmethod
+    def __iter_replaced_price_accounts(post_splitter_obj, price_accounts, entries):
+        return post_splitter_obj.iter_replaced_price_accounts(entries, price_accounts)
+
+    @staticmethod
+    def __iter_manipulated_entries(orchestrator, manipulators, entries):
+        return orchestrator.iter_manipulated_entries(entries, manipulators)
+
+
+plugin_chain_obj = PluginChain()
+
+
+def plugin_chain(entries, options_map, config_str=""):
+    return plugin_chain_obj.run(entries, options_map, config_str)
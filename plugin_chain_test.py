@@ -0,0 +1,154 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from beancount import loader
+from beancount.parser import cmptest
+
+from account_replacer import account_replacer
+from balance_pad_creator import balance_pad_creator
+from entry_manipulation.entry_manipulators import entry_manipulators
+from plugin_chain import plugin_chain
+from post_splitter import post_splitter
+from txn_splitter import txn_splitter
+
+PLUGIN_CONFIGS = [
+    (account_replacer, "account_replacer", ('{'
+                                            '"replace-rules":[{'
+                                            '  "replace-from":"^Expenses:Groceries",'
+                                            '  "replace-to":"Expenses:Food"'
+                                            '}]'
+                                            '}')),
+    (txn_splitter, "txn_splitter", ('{'
+                                    '"metadata-name-date":"booking-date",'
+                                    '"transfer-account":"Assets:Bank:DebitCard"'
+                                    '}')),
+    (post_splitter, "post_splitter", ('{'
+                                      '"roundings":{"USD":2},'
+                                      '"metadata-name-type":"split-mode"'
+                                      '}')),
+    (entry_manipulators, "entry_manipulators", ('{"manipulators": [{'
+                                                '  "type":"posting-consolidator-original-price",'
+                                                '  "consolidate-price-account-postfix":"Price",'
+                                                '  "consolidate-discount-account-postfix":"Discount",'
+                                                '  "metadata-name-original-price":"original-price"'
+                                                '}]}')),
+    (balance_pad_creator, "balance_pad_creator", ('{'
+                                                  '"account":"Assets:Broker:Cash",'
+                                                  '"pad-account":"Income:Broker:Interest",'
+                                                  '"metadata-name-balance-unit":"balance-unit",'
+                                                  '"metadata-name-balance-time":"balance-time"'
+                                                  '}')),
+]
+
+LEDGER = """
+2000-01-01 open Assets:Bank:Checking
+2000-01-01 open Assets:Bank:DebitCard
+2000-01-01 open Assets:Broker:Cash
+2000-01-01 open Income:Broker:Interest
+2000-01-01 open Expenses:Groceries:Bread
+2000-01-01 open Expenses:Groceries:Milk
+2000-01-01 open Expenses:Groceries:Butter
+2000-01-01 open Expenses:Dining
+
+2013-05-31 * "Paid by card"
+    Assets:Bank:Checking         -100 USD
+        booking-date: 2013-06-03
+    Expenses:Dining               100 USD
+
+2013-06-04 * "Shop" "Receipt with discount"
+    split-mode: "discount"
+    discount-1:                  0.80 USD
+    Assets:Bank:Checking         -7.20 USD
+    Expenses:Groceries:Bread      3.00 USD
+        discount-ids: "1"
+    Expenses:Groceries:Milk       3.00 USD
+        discount-ids: "1"
+    Expenses:Groceries:Butter     2.00 USD
+
+2013-06-05 * "Shop" "Reduced price"
+    Assets:Bank:Checking         -2.50 USD
+    Expenses:Groceries:Bread      2.50 USD
+        original-price: 3.00 USD
+
+2013-06-06 * "Broker"
+    balance-unit: 120 USD
+    balance-time: "12:00"
+    Assets:Broker:Cash            100 USD
+    Assets:Bank:Checking         -100 USD
+"""
+
+LOAD_SCRIPT = """
+import sys
+from beancount import loader
+from beancount.parser import printer
+entries, errors, _ = loader.load_string(sys.stdin.read())
+printer.print_errors([error for error in errors if "plugin" in error.message], file=sys.stderr)
+printer.print_entries(entries)
+"""
+
+
+def get_config_str(plugin_configs):
+    return ('{"plugins": ['
+            + ','.join('{"name":"' + name + '", "config":' + config_str + '}' for _, name, config_str in plugin_configs)
+            + ']}')
+
+
+class TestPluginChain(cmptest.TestCase):
+
+    def test_same_entries_as_plugins_in_sequence(self):
+        entries, _, options_map = loader.load_string(LEDGER)
+        entries_count = len(entries)
+        chain_entries, chain_errors = plugin_chain(entries, options_map, get_config_str(PLUGIN_CONFIGS))
+
+        sequence_entries, _, options_map = loader.load_string(LEDGER)
+        sequence_errors = []
+        for plugin, _, config_str in PLUGIN_CONFIGS:
+            sequence_entries, errors = plugin(sequence_entries, options_map, config_str)
+            sequence_errors.extend(errors)
+
+        self.assertNotEqual(entries_count, len(chain_entries))
+        self.assertEqualEntries(sequence_entries, chain_entries)
+        self.assertEqual(len(sequence_errors), len(chain_errors))
+
+    def test_loaded_by_plugin_directive_of_package(self):
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        plugin_str = ('plugin "' + os.path.basename(package_dir) + '.plugin_chain" "'
+                      + get_config_str(PLUGIN_CONFIGS).replace('"', "'") + '"\n')
+        env = {key: value for key, value in os.environ.items() if key != "PYTHONPATH"}
+        process = subprocess.run([sys.executable, "-c", LOAD_SCRIPT], input=plugin_str + LEDGER,
+                                 capture_output=True, text=True, cwd=os.path.dirname(package_dir), env=env)
+
+        sequence_entries, _, options_map = loader.load_string(LEDGER)
+        for plugin, _, config_str in PLUGIN_CONFIGS:
+            sequence_entries, _ = plugin(sequence_entries, options_map, config_str)
+
+        self.assertEqual("", process.stderr)
+        self.assertEqualEntries(sequence_entries, process.stdout)
+
+    @loader.load_doc(expect_errors=True)
+    def test_empty_chain(self, entries, _, options_map):
+        """
+        2013-05-31 * "Paid by card"
+            Assets:Bank:Checking         -100 USD
+            Expenses:Dining               100 USD
+        """
+        new_entries, errors = plugin_chain(entries, options_map, '{"plugins": []}')
+
+        self.assertIs(entries, new_entries)
+        self.assertEqual([], errors)
+
+    def test_config_rejected_up_front(self):
+        with self.assertRaisesRegex(Exception, "Config key not implemented: plugin"):
+            plugin_chain([], {}, '{"plugin": []}')
+        with self.assertRaisesRegex(Exception, "Config key not implemented: options"):
+            plugin_chain([], {}, '{"plugins": [{"name":"txn_splitter", "options":{}}]}')
+        with self.assertRaisesRegex(Exception, "Plugin not implemented: unknown"):
+            plugin_chain([], {}, '{"plugins": [{"name":"unknown"}]}')
+        with self.assertRaisesRegex(Exception, "Config key not implemented: unknown-key"):
+            plugin_chain([], {}, get_config_str([(None, "post_splitter", '{"unknown-key":1}')]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,99 @@
 import ast
+import collections
+import functools
+import heapq
+import math
 
 __plugins__ = ["post_splitter"]
 
 from abc import abstractmethod
-from copy import deepcopy
+from collections.abc import MutableMapping
+from decimal import Decimal
 
 from beancount.core import data
 
+CONFIG_KEYS = frozenset({"roundings", "rounding-mode", "metadata-name-type", "metadata-name-skip-split",
+                         "metadata-name-unit", "metadata-name-exchange-rate", "metadata-name-split-ratio"})
+
+PostSplitterConfig = collections.namedtuple(
+    "PostSplitterConfig",
+    "roundings rounding_mode metadata_name_type metadata_name_skip_split metadata_name_unit "
+    "metadata_name_exchange_rate metadata_name_split_ratio"
+)
+
+
+class MetadataOverlay(MutableMapping):
+    __slots__ = ("_base", "_key", "_value", "_meta")
+
+    def __init__(self, base, key, value=None):
+        if isinstance(base, MetadataOverlay) and base._meta is None and base._key == key:
+            base = base._base
+        self._base = base
+        self._key = key
+        self._value = value
+        self._meta = None
+
+    def __getitem__(self, key):
+        if self._meta is not None:
+            return self._meta[key]
+        if key == self._key:
+            if self._value is None:
+                raise KeyError(key)
+            return self._value
+        return self._base[key]
+
+    def __contains__(self, key):
+        if self._meta is not None:
+            return key in self._meta
+        if key == self._key:
+            return self._value is not None
+        return key in self._base
+
+    def get(self, key, default=None):
+        if self._meta is not None:
+            return self._meta.get(key, default)
+        if key == self._key:
+            return self._value if self._value is not None else default
+        return self._base.get(key, default)
+
+    def __iter__(self):
+        if self._meta is not None:
+            return iter(self._meta)
+        return self.__iter_keys()
+
+    def __len__(self):
+        if self._meta is not None:
+            return len(self._meta)
+        return len(self._base) - (self._key in self._base) + (self._value is not None)
+
+    def __setitem__(self, key, value):
+        self.__materialize()[key] = value
+
+    def __delitem__(self, key):
+        del self.__materialize()[key]
+
+    def __repr__(self):
+        return repr(self.copy())
+
+    def __reduce__(self):
+        return dict, (list(self.items()),)
+
+    def copy(self):
+        return {key: self[key] for key in self}
+
+    def __iter_keys(self):
+        for key in self._base:
+            if key != self._key:
+                yield key
+        if self._value is not None:
+            yield self._key
+
+    def __materialize(self):
+        if self._meta is None:
+            self._meta = self.copy()
+            self._base = None
+        return self._meta
+
 
 class SplitDataBase:
     def __init__(self, metadata_name_type):
@@ -16,30 +103,39 @@ class SplitDataBase:
         return True
 
     @abstractmethod
-    def before_split(self):
+    def before_split(self, entry):
         pass
 
 
 class EntryWithSplitData(SplitDataBase):
-    def __init__(self, entry, metadata_name_type):
-        super().__init__(metadata_name_type)
-        self.entry = entry
+    def before_split(self, entry):
+        if self.metadata_name_type is None:
+            return entry
 
-    def before_split(self):
-        if self.metadata_name_type is not None:
-            del self.entry.meta[self.metadata_name_type]
+        meta = {key: value for key, value in entry.meta.items() if key != self.metadata_name_type}
+        return data.Transaction(meta, entry.date, entry.flag, entry.payee, entry.narration, entry.tags,
+                                entry.links, entry.postings)
 
 
 class PostWithSplitData(SplitDataBase):
-    def __init__(self, metadata_name_type, post_with_split_data):
+    def __init__(self, metadata_name_type, post_with_split_data, metadata_names_to_remove=()):
         super().__init__(metadata_name_type)
         self.post_with_split_data = post_with_split_data
+        self.metadata_names_to_remove = {metadata_name_type}.union(metadata_names_to_remove)
 
     def is_modify_needed(self, posting):
         return posting != self.post_with_split_data
 
-    def before_split(self):
-        del self.post_with_split_data.meta[self.metadata_name_type]
+    def before_split(self, entry):
+        new_postings = []
+        for posting in entry.postings:
+            if posting is self.post_with_split_data:
+                meta = {key: value for key, value in posting.meta.items() if key not in self.metadata_names_to_remove}
+                posting = data.Posting(posting.account, posting.units, posting.cost, posting.price, posting.flag,
+                                       meta)
+            new_postings.append(posting)
+        return data.Transaction(entry.meta, entry.date, entry.flag, entry.payee, entry.narration, entry.tags,
+                                entry.links, new_postings)
 
 
 class NoSplitter:
@@ -50,35 +146,109 @@ class NoSplitter:
         return self.entry
 
 
+class Rounder:
+    def __init__(self, roundings, rounding_mode=None):
+        self.roundings = roundings
+        self.rounding_mode = rounding_mode
+
+    def allocate_shares(self, number, weights, total_weight, currency):
+        decimals = self.roundings.get(currency) if self.roundings is not None else None
+        if decimals is None:
+            return [weight / total_weight * number for weight in weights]
+
+        if self.rounding_mode == "largest-remainder":
+            return self.__allocate_quanta(number, weights, total_weight, decimals)
+
+        quantum = Decimal(1).scaleb(-decimals)
+        return [(weight / total_weight * number).quantize(quantum) for weight in weights]
+
+    @staticmethod
+    def __allocate_quanta(number, weights, total_weight, decimals):
+        weight_ratios = [weight.as_integer_ratio() for weight in weights]
+        weight_denominator = math.lcm(*(denominator for _, denominator in weight_ratios))
+        number_numerator, number_denominator = number.as_integer_ratio()
+        total_numerator, total_denominator = total_weight.as_integer_ratio()
+
+        numerator = number_numerator * total_denominator
+        denominator = number_denominator * total_numerator * weight_denominator
+        if decimals >= 0:
+            numerator *= 10 ** decimals
+        else:
+            denominator *= 10 ** -decimals
+        if denominator < 0:
+            numerator, denominator = -numerator, -denominator
+
+        quanta = []
+        remainders = []
+        scaled_weight_sum = 0
+        for weight_numerator, denominator_part in weight_ratios:
+            scaled_weight = weight_numerator * (weight_denominator // denominator_part)
+            quantum, remainder = divmod(scaled_weight * numerator, denominator)
+            quanta.append(quantum)
+            remainders.append(remainder)
+            scaled_weight_sum += scaled_weight
+
+        total, total_remainder = divmod(scaled_weight_sum * numerator, denominator)
+        if 2 * total_remainder > denominator or (2 * total_remainder == denominator and total % 2 == 1):
+            total += 1
+        remainder_count = total - sum(quanta)
+
+        positions = sorted(range(len(quanta)), key=lambda position: (-remainders[position], position))
+        if remainder_count >= 0:
+            for position in positions[:remainder_count]:
+                quanta[position] += 1
+        else:
+            for position in positions[remainder_count:]:
+                quanta[position] -= 1
+        return [Decimal(quantum).scaleb(-decimals) for quantum in quanta]
+
+
 class SplitterBase:
 
-    def __init__(self, metadata_name_skip_split, roundings, entry, split_data):
+    def __init__(self, metadata_name_skip_split, roundings, entry, split_data, rounding_mode=None):
         self.roundings = roundings
+        self.rounding_mode = rounding_mode
+        self.rounder = Rounder(roundings, rounding_mode)
         self.entry = entry
         self.split_data = split_data
         self.new_cost = None
 
     def split(self):
-        self.split_data.before_split()
-
-        new_postings = []
-        for posting in self.entry.postings:
-            if not self.split_data.is_modify_needed(posting) or not self.is_modify_needed(posting):
-                new_postings.append(posting)
-                continue
-
-            new_unit = self.get_new_unit(posting)
-            new_cost = self.new_cost
+        positions = [position for position, posting in enumerate(self.entry.postings)
+                     if self.split_data.is_modify_needed(posting) and self.is_modify_needed(posting)]
+        entry = self.split_data.before_split(self.entry)
+        if len(positions) == 0:
+            return entry
+        new_units = self.get_new_units([self.entry.postings[position] for position in positions])
+
+        new_postings = list(entry.postings)
+        for position, new_unit in zip(positions, new_units):
+            posting = new_postings[position]
+            new_postings[position] = data.Posting(posting.account, new_unit, self.new_cost, posting.price,
+                                                  posting.flag, posting.meta)
+
+        return data.Transaction(entry.meta, entry.date, entry.flag, entry.payee,
+                                entry.narration, entry.tags,
+                                entry.links, new_postings)
+
+    def get_new_units(self, postings):
+        positions_by_currency = {}
+        for position, posting in enumerate(postings):
+            positions_by_currency.setdefault(self.get_currency(posting), []).append(position)
+
+        new_units = [None] * len(postings)
+        for currency, positions in positions_by_currency.items():
+            numbers = self.get_numbers([postings[position] for position in positions], currency)
+            for position, number in zip(positions, numbers):
+                new_units[position] = data.Amount(number, currency)
+        return new_units
 
-            new_posting = data.Posting(posting.account, new_unit, new_cost, posting.price, posting.flag, posting.meta)
-            new_postings.append(new_posting)
-
-        return data.Transaction(self.entry.meta, self.entry.date, self.entry.flag, self.entry.payee,
-                                self.entry.narration, self.entry.tags,
-                                self.entry.links, new_postings)
+    @abstractmethod
+    def get_numbers(self, postings, currency):
+        pass
 
     @abstractmethod
-    def get_new_unit(self, posting):
+    def get_currency(self, posting):
         pass
 
     def round(self, number, currency):
@@ -96,9 +266,10 @@ class SplitterBase:
 
 
 class EqualSplitter(SplitterBase):
-    def __init__(self, metadata_name_type, metadata_name_skip_split, roundings, entry, post_with_split_data):
+    def __init__(self, metadata_name_type, metadata_name_skip_split, roundings, entry, post_with_split_data,
+                 rounding_mode=None):
         split_data = PostWithSplitData(metadata_name_type, post_with_split_data)
-        super().__init__(metadata_name_skip_split, roundings, entry, split_data)
+        super().__init__(metadata_name_skip_split, roundings, entry, split_data, rounding_mode)
 
         divider = 0
         number = post_with_split_data.units.number
@@ -111,14 +282,18 @@ class EqualSplitter(SplitterBase):
             else:
                 divider += 1
 
-        number = number / divider
-        number = self.round(number, post_with_split_data.units.currency)
-        self.new_unit = data.Amount(
-            -number,
-            post_with_split_data.units.currency)
+        self.number_to_split = -number
+        self.divider = divider
+        self.currency = post_with_split_data.units.currency
+        self.new_number = -self.round(number / divider, self.currency)
+
+    def get_numbers(self, postings, currency):
+        if self.rounding_mode != "largest-remainder" or self.roundings is None or self.roundings.get(currency) is None:
+            return [self.new_number] * len(postings)
+        return self.rounder.allocate_shares(self.number_to_split, [1] * len(postings), self.divider, currency)
 
-    def get_new_unit(self, posting):
-        return self.new_unit
+    def get_currency(self, posting):
+        return self.currency
 
 
 class ProportionSplitDataBase:
@@ -146,19 +321,11 @@ class MetadataProportionSplitData(ProportionSplitDataBase):
         return self.metadata_name_split_ratio in posting.meta
 
 
-class DiscountProportionSplitData(ProportionSplitDataBase):
-    def __init__(self, discount_id):
-        self.discount_id = discount_id
-
-    def is_modify_needed(self, posting):
-        return "discount-ids" in posting.meta and str(self.discount_id) in posting.meta["discount-ids"].split(",")
-
-
 class ProportionSplitter(SplitterBase):
     def __init__(self, metadata_name_skip_split, proportion_split_data, roundings, entry,
                  split_data,
-                 number_to_split, new_cost=None):
-        super().__init__(metadata_name_skip_split, roundings, entry, split_data)
+                 number_to_split, new_cost=None, rounding_mode=None):
+        super().__init__(metadata_name_skip_split, roundings, entry, split_data, rounding_mode)
 
         self.proportion_split_data = proportion_split_data
         self.number_to_split = number_to_split
@@ -169,77 +336,102 @@ class ProportionSplitter(SplitterBase):
             if self.proportion_split_data.is_modify_needed(posting):
                 self.max_number += self.proportion_split_data.get_number(posting)
 
-    def get_new_unit(self, posting):
-        number = self.proportion_split_data.get_number(posting) / self.max_number * self.number_to_split
-        number = self.round(number, self.proportion_split_data.get_currency(posting))
-        return data.Amount(number,
-                           self.proportion_split_data.get_currency(posting))
+    def get_numbers(self, postings, currency):
+        weights = [self.proportion_split_data.get_number(posting) for posting in postings]
+        return self.rounder.allocate_shares(self.number_to_split, weights, self.max_number, currency)
+
+    def get_currency(self, posting):
+        return self.proportion_split_data.get_currency(posting)
 
     def is_modify_needed(self, posting):
         return self.proportion_split_data.is_modify_needed(posting)
 
 
 class DiscountSplitter:
-    def __init__(self, metadata_name_type, metadata_name_skip_split, roundings):
+    def __init__(self, metadata_name_type, metadata_name_skip_split, roundings, rounding_mode=None):
         self.metadata_name_type = metadata_name_type
         self.metadata_name_skip_split = metadata_name_skip_split
-        self.roundings = roundings
+        self.rounder = Rounder(roundings, rounding_mode)
 
     def split(self, entry):
-        new_entry = entry
-
-        discount_id = 1
-        while "discount-" + str(discount_id) in entry.meta:
-            new_entry = self.__single_split(new_entry, discount_id)
-            discount_id += 1
-
-        new_entry, entry_modifier_func = self.__replace_accounts(new_entry)
+        discount_count = 0
+        while "discount-" + str(discount_count + 1) in entry.meta:
+            discount_count += 1
+        if discount_count == 0:
+            return self.__replace_accounts(entry)
 
-        return new_entry, entry_modifier_func
+        entry = EntryWithSplitData(self.metadata_name_type).before_split(entry)
 
-    def __single_split(self, entry, discount_id):
-        number_to_split = -entry.meta["discount-" + str(discount_id)].number
-
-        visited_accounts = set()
         new_postings = []
+        discount_positions = [[] for _ in range(discount_count)]
         for posting in entry.postings:
-            if not "discount-ids" in posting.meta or str(discount_id) not in posting.meta["discount-ids"].split(","):
+            if not "discount-ids" in posting.meta:
                 new_postings.append(posting)
                 continue
 
-            shared_meta = {}
-            for key, value in posting.meta.items():
-                if key != "discount-ids":
-                    shared_meta[key] = value
+            discount_ids, remaining_discount_ids = self.__get_discount_ids(posting.meta["discount-ids"],
+                                                                           discount_count)
+            if len(discount_ids) == 0:
+                new_postings.append(posting)
+                continue
+
+            new_meta = MetadataOverlay(posting.meta, "discount-ids", remaining_discount_ids)
+            new_postings.append(
+                data.Posting(posting.account, posting.units, posting.cost, posting.price, posting.flag, new_meta))
+            for discount_id in reversed(discount_ids):
+                discount_positions[discount_id - 1].append(len(new_postings))
+                new_meta = MetadataOverlay(posting.meta, "discount-ids", str(discount_id))
+                new_postings.append(
+                    data.Posting(posting.account, posting.units, None, posting.price, posting.flag, new_meta))
 
-            new_postings.append(self.__create_original_posting(discount_id, shared_meta, posting))
-            new_postings.append(self.__create_discount_posting(discount_id, shared_meta, posting))
-            visited_accounts.add(posting.account)
+        for discount_id, positions in enumerate(discount_positions, 1):
+            number_to_split = -entry.meta["discount-" + str(discount_id)].number
+            self.__split_discount(new_postings, positions, number_to_split)
 
         new_entry = data.Transaction(entry.meta, entry.date, entry.flag, entry.payee,
                                      entry.narration, entry.tags,
                                      entry.links, new_postings)
 
-        split_data = EntryWithSplitData(new_entry, self.metadata_name_type if discount_id == 1 else None)
-        proportion_split_data = DiscountProportionSplitData(discount_id)
-        new_entry = ProportionSplitter(self.metadata_name_skip_split, proportion_split_data,
-                                       self.roundings, new_entry, split_data, number_to_split).split()
-
-        return new_entry
-
-    @staticmethod
-    def __create_discount_posting(discount_id, shared_meta, posting):
-        new_meta = deepcopy(shared_meta)
-        new_meta["discount-ids"] = str(discount_id)
-        return data.Posting(posting.account, posting.units, posting.cost, posting.price, posting.flag, new_meta)
+        return self.__replace_accounts(new_entry)
 
     @staticmethod
-    def __create_original_posting(discount_id, shared_meta, posting):
-        new_meta = deepcopy(shared_meta)
-        if "," in posting.meta["discount-ids"]:
-            new_meta["discount-ids"] = ",".join(
-                filter(lambda v: v != str(discount_id), posting.meta["discount-ids"].split(",")))
-        return data.Posting(posting.account, posting.units, posting.cost, posting.price, posting.flag, new_meta)
+    def __get_discount_ids(discount_ids, discount_count):
+        tokens = discount_ids.split(",")
+        token_counts = collections.Counter(tokens)
+
+        candidate_ids = []
+        for token in token_counts:
+            discount_id = int(token) if token.isdecimal() else 0
+            if 1 <= discount_id <= discount_count and str(discount_id) == token:
+                candidate_ids.append(discount_id)
+        candidate_ids.sort()
+
+        remaining_count = len(tokens)
+        for position, discount_id in enumerate(candidate_ids):
+            if remaining_count == 1:
+                return candidate_ids[:position + 1], None
+            remaining_count -= token_counts[str(discount_id)]
+
+        split_tokens = {str(discount_id) for discount_id in candidate_ids}
+        return candidate_ids, ",".join(token for token in tokens if token not in split_tokens)
+
+    def __split_discount(self, postings, positions, number_to_split):
+        if len(positions) == 0:
+            return
+
+        max_number = 0
+        positions_by_currency = {}
+        for position in positions:
+            max_number += postings[position].units.number
+            positions_by_currency.setdefault(postings[position].units.currency, []).append(position)
+
+        for currency, currency_positions in positions_by_currency.items():
+            weights = [postings[position].units.number for position in currency_positions]
+            numbers = self.rounder.allocate_shares(number_to_split, weights, max_number, currency)
+            for position, number in zip(currency_positions, numbers):
+                posting = postings[position]
+                postings[position] = data.Posting(posting.account, data.Amount(number, currency), None,
+                                                  posting.price, posting.flag, posting.meta)
 
     def __replace_accounts(self, entry):
         new_postings = []
@@ -248,6 +440,8 @@ class DiscountSplitter:
         for posting in entry.postings:
             if "discount-ids" in posting.meta:
                 relevant_accounts.add(posting.account)
+        if len(relevant_accounts) == 0:
+            return entry, relevant_accounts
 
         for posting in entry.postings:
             if posting.account not in relevant_accounts:
@@ -262,76 +456,135 @@ class DiscountSplitter:
                                      entry.narration, entry.tags,
                                      entry.links, new_postings)
 
-        entry_modifier_func = None
-        if len(relevant_accounts) > 0:
-            entry_modifier_func = lambda e: self.__entry_account_modifier(e, relevant_accounts)
-
-        return new_entry, entry_modifier_func
-
-    @staticmethod
-    def __entry_account_modifier(entry, relevant_accounts):
-        if isinstance(entry, data.Transaction):
-            new_postings = []
-            for posting in entry.postings:
-                if posting.account not in relevant_accounts:
-                    new_postings.append(posting)
-                    continue
-
-                new_postings.append(
-                    data.Posting(posting.account + ":Price", posting.units, posting.cost, posting.price, posting.flag,
-                                 posting.meta))
-
-            return [data.Transaction(entry.meta, entry.date, entry.flag, entry.payee, entry.narration, entry.tags,
-                                     entry.links, new_postings)]
-
-        if not isinstance(entry, data.Open) or entry.account not in relevant_accounts:
-            return [entry]
-
-        new_open_for_price = data.Open(entry.meta, entry.date, entry.account + ":Price", entry.currencies,
-                                       entry.booking)
-        new_open_for_discount = data.Open(entry.meta, entry.date, entry.account + ":Discount", entry.currencies,
-                                          entry.booking)
-        return [new_open_for_price, new_open_for_discount]
+        return new_entry, relevant_accounts
 
 
 class PostSplitter:
 
     def __init__(self, options_map, config_str=""):
+        config = self.get_config(config_str)
+
+        self.roundings = config.roundings
+        self.rounding_mode = config.rounding_mode
+        self.metadata_name_type = config.metadata_name_type
+        self.metadata_name_skip_split = config.metadata_name_skip_split
+        self.metadata_name_unit = config.metadata_name_unit
+        self.metadata_name_exchange_rate = config.metadata_name_exchange_rate
+        self.metadata_name_split_ratio = config.metadata_name_split_ratio
+
+    @staticmethod
+    @functools.lru_cache(maxsize=None)
+    def get_config(config_str):
         config = {}
         expr = ast.literal_eval(config_str)
         config.update(expr)
 
-        self.roundings = config.get("roundings")
-        self.metadata_name_type = config["metadata-name-type"]
-        self.metadata_name_skip_split = config.get("metadata-name-skip-split")
-        self.metadata_name_unit = config.get("metadata-name-unit")
-        self.metadata_name_exchange_rate = config.get("metadata-name-exchange-rate")
-        self.metadata_name_split_ratio = config.get("metadata-name-split-ratio")
+        unknown_keys = sorted(key for key in config if key not in CONFIG_KEYS)
+        if len(unknown_keys) > 0:
+            raise Exception("Config key not implemented: " + ", ".join(map(str, unknown_keys)))
+        if "metadata-name-type" not in config:
+            raise Exception("Config key missing: metadata-name-type")
+        rounding_mode = config.get("rounding-mode")
+        if rounding_mode not in (None, "independent", "largest-remainder"):
+            raise Exception("Rounding mode not implemented: " + rounding_mode)
+
+        return PostSplitterConfig(config.get("roundings"), rounding_mode, config["metadata-name-type"],
+                                  config.get("metadata-name-skip-split"), config.get("metadata-name-unit"),
+                                  config.get("metadata-name-exchange-rate"), config.get("metadata-name-split-ratio"))
 
     def split(self, entries):
         new_entries = []
-        entry_modifier_funcs = []
+        price_accounts = {}
         for entry in entries:
-            new_entry, entry_modifier_func = self.__split_single_entry(entry)
+            new_entry, relevant_accounts = self.split_entry(entry)
             new_entries.append(new_entry)
-            if entry_modifier_func is not None:
-                entry_modifier_funcs.append(entry_modifier_func)
+            self.add_price_accounts(price_accounts, relevant_accounts)
 
-        if len(entry_modifier_funcs) == 0:
+        if len(price_accounts) == 0:
             return new_entries, []
 
-        modified_new_entries = []
-        for entry_modifier_func in entry_modifier_funcs:
-            modified_new_entries = []
-            for entry in new_entries:
-                created_entries = entry_modifier_func(entry)
-                modified_new_entries += created_entries
-            new_entries = modified_new_entries
+        return list(self.iter_replaced_price_accounts(new_entries, price_accounts)), []
+
+    def split_incremental(self, previous_entries, previous_new_entries, removed_entries, added_entries):
+        entries = self.__merge_entries(previous_entries, removed_entries, added_entries)
+        if any(self.__is_entry_level_split(entry) for entry in removed_entries + added_entries):
+            return self.split(entries)
 
-        return modified_new_entries, []
+        price_accounts = self.__get_price_accounts(previous_entries)
+        previous_new_entries_by_id = {}
+        position = 0
+        for entry in previous_entries:
+            end = position + (2 if isinstance(entry, data.Open) and entry.account in price_accounts else 1)
+            previous_new_entries_by_id[id(entry)] = previous_new_entries[position:end]
+            position = end
+        if position != len(previous_new_entries):
+            return self.split(entries)
 
-    def __split_single_entry(self, entry):
-        if entry.meta and self.metadata_name_type in entry.meta:
+        new_entries = []
+        for entry in entries:
+            entry_new_entries = previous_new_entries_by_id.get(id(entry))
+            if entry_new_entries is None:
+                new_entry, _ = self.split_entry(entry)
+                entry_new_entries = list(self.iter_replaced_price_accounts([new_entry], price_accounts))
+            new_entries.extend(entry_new_entries)
+
+        return new_entries, []
+
+    @staticmethod
+    def __merge_entries(previous_entries, removed_entries, added_entries):
+        removed_ids = {id(entry) for entry in removed_entries}
+        kept_entries = [entry for entry in previous_entries if id(entry) not in removed_ids]
+        return list(heapq.merge(kept_entries, sorted(added_entries, key=data.entry_sortkey), key=data.entry_sortkey))
+
+    def __is_entry_level_split(self, entry):
+        return entry.meta and self.metadata_name_type in entry.meta
+
+    def __get_price_accounts(self, entries):
+        price_accounts = {}
+        for entry in entries:
+            if not self.__is_entry_level_split(entry):
+                continue
+            for posting in entry.postings:
+                if "discount-ids" in posting.meta and posting.account not in price_accounts:
+                    price_accounts[posting.account] = posting.account + ":Price"
+        return price_accounts
+
+    @staticmethod
+    def add_price_accounts(price_accounts, relevant_accounts):
+        if relevant_accounts:
+            for account in relevant_accounts:
+                if account not in price_accounts:
+                    price_accounts[account] = account + ":Price"
+
+    @staticmethod
+    def iter_replaced_price_accounts(entries, price_accounts):
+        for entry in entries:
+            if isinstance(entry, data.Transaction):
+                if not any(posting.account in price_accounts for posting in entry.postings):
+                    yield entry
+                    continue
+
+                new_postings = []
+                for posting in entry.postings:
+                    price_account = price_accounts.get(posting.account)
+                    if price_account is None:
+                        new_postings.append(posting)
+                        continue
+
+                    new_postings.append(
+                        data.Posting(price_account, posting.units, posting.cost, posting.price, posting.flag,
+                                     posting.meta))
+
+                yield data.Transaction(entry.meta, entry.date, entry.flag, entry.payee, entry.narration, entry.tags,
+                                       entry.links, new_postings)
+            elif isinstance(entry, data.Open) and entry.account in price_accounts:
+                yield data.Open(entry.meta, entry.date, price_accounts[entry.account], entry.currencies, entry.booking)
+                yield data.Open(entry.meta, entry.date, entry.account + ":Discount", entry.currencies, entry.booking)
+            else:
+                yield entry
+
+    def split_entry(self, entry):
+        if self.__is_entry_level_split(entry):
             return self.__get_entry_level_splitter().split(entry)
 
         if not isinstance(entry, data.Transaction):
@@ -348,12 +601,13 @@ class PostSplitter:
         return self.__get_posting_level_splitter(entry, post_with_split_data).split(), None
 
     def __get_entry_level_splitter(self) -> DiscountSplitter:
-        return DiscountSplitter(self.metadata_name_type, self.metadata_name_split_ratio, self.roundings)
+        return DiscountSplitter(self.metadata_name_type, self.metadata_name_split_ratio, self.roundings,
+                                self.rounding_mode)
 
     def __get_posting_level_splitter(self, entry, post_with_split_data):
         if post_with_split_data.meta[self.metadata_name_type] == "equal":
             return EqualSplitter(self.metadata_name_type, self.metadata_name_skip_split, self.roundings, entry,
-                                 post_with_split_data)
+                                 post_with_split_data, self.rounding_mode)
         elif (post_with_split_data.meta[self.metadata_name_type] == "proportional"
               and self.metadata_name_split_ratio is not None):
             return self.__get_proportion_splitter(entry, post_with_split_data)
@@ -361,7 +615,6 @@ class PostSplitter:
             return NoSplitter(entry)
 
     def __get_proportion_splitter(self, entry, post_with_split_data):
-        split_data = PostWithSplitData(self.metadata_name_type, post_with_split_data)
         proportion_split_data = MetadataProportionSplitData(self.metadata_name_split_ratio)
         if (self.metadata_name_unit is not None
                 and self.metadata_name_exchange_rate is not None
@@ -370,17 +623,27 @@ class PostSplitter:
             number_to_split = post_with_split_data.meta[self.metadata_name_unit].number
             exchange_rate = post_with_split_data.meta[self.metadata_name_exchange_rate]
             new_cost = data.Cost(exchange_rate.number, exchange_rate.currency, entry.date, None)
-            del post_with_split_data.meta[self.metadata_name_exchange_rate]
+            split_data = PostWithSplitData(self.metadata_name_type, post_with_split_data,
+                                           [self.metadata_name_exchange_rate])
             return ProportionSplitter(self.metadata_name_skip_split,
                                       proportion_split_data,
-                                      self.roundings, entry, split_data, number_to_split, new_cost)
+                                      self.roundings, entry, split_data, number_to_split, new_cost,
+                                      self.rounding_mode)
         else:
             number_to_split = -post_with_split_data.units.number
+            split_data = PostWithSplitData(self.metadata_name_type, post_with_split_data)
             return ProportionSplitter(self.metadata_name_skip_split,
                                       proportion_split_data,
-                                      self.roundings, entry, split_data, number_to_split)
+                                      self.roundings, entry, split_data, number_to_split,
+                                      rounding_mode=self.rounding_mode)
 
 
 def post_splitter(entries, options_map, config_str=""):
     post_splitter_obj = PostSplitter(options_map, config_str)
     return post_splitter_obj.split(entries)
+
+
+def post_splitter_incremental(previous_entries, previous_new_entries, removed_entries, added_entries,
+                              options_map, config_str=""):
+    post_splitter_obj = PostSplitter(options_map, config_str)
+    return post_splitter_obj.split_incremental(previous_entries, previous_new_entries, removed_entries, added_entries)
@@ -4,7 +4,9 @@ import unittest
 from beancount import loader, Amount
 from beancount.parser import cmptest
 
-from post_splitter import post_splitter
+from beancount.core import data
+
+from post_splitter import post_splitter, post_splitter_incremental, PostSplitter
 
 
 class TestPostSplitter(cmptest.TestCase):
@@ -255,6 +257,36 @@ class TestPostSplitter(cmptest.TestCase):
             new_entries,
         )
 
+    @loader.load_doc(expect_errors=True)
+    def test_proportional_split_rounding_on_half_quantum(self, entries, _, options_map):
+        """
+        2016-05-31 * "Exams"
+            Assets:Bank                    -16.35 USD
+                split-mode: "proportional"
+            Expenses:Exam                       0 USD
+                msrp:                           5 USD
+            Expenses:Exam                       0 USD
+                msrp:                           1 USD
+        """
+        config_str = ('{'
+                      '"roundings":{'
+                      '    "USD":2'
+                      '  },'
+                      '"metadata-name-type":"split-mode",'
+                      '"metadata-name-split-ratio":"msrp"'
+                      '}')
+        new_entries, _ = post_splitter(entries, options_map, config_str)
+
+        self.assertEqualEntries(
+            """
+        2016-05-31 * "Exams"
+            Assets:Bank                    -16.35 USD
+            Expenses:Exam                   13.62 USD
+            Expenses:Exam                    2.73 USD
+        """,
+            new_entries,
+        )
+
     @loader.load_doc(expect_errors=True)
     def test_proportional_split_ignore_posts_without_metadata(self, entries, _, options_map):
         """
@@ -565,6 +597,292 @@ class TestPostSplitter(cmptest.TestCase):
             new_entries,
         )
 
+    @loader.load_doc(expect_errors=True)
+    def test_discount_accounts_from_multiple_receipts_replaced_in_all_entries(self, entries, _, options_map):
+        """
+        2010-08-31 open Expenses:Bread
+        2010-08-31 open Expenses:Milk
+        2010-08-31 open Expenses:Onion
+
+        2016-05-20 * ""
+            Assets:Bank                     300 HUF
+            Expenses:Bread                  200 HUF
+            Expenses:Milk                   100 HUF
+
+        2016-05-25 * ""
+            split-mode: "discount"
+            discount-1:                   50 HUF
+            Assets:Bank                  150 HUF
+            Expenses:Bread               200 HUF
+                discount-ids: "1"
+
+        2016-05-31 * ""
+            split-mode: "discount"
+            discount-1:                   10 HUF
+            Assets:Bank                   90 HUF
+            Expenses:Milk                100 HUF
+                discount-ids: "1"
+        """
+        config_str = ('{'
+                      '"metadata-name-type":"split-mode",'
+                      '"roundings":{'
+                      '    "HUF":0'
+                      '}'
+                      '}')
+        new_entries, _ = post_splitter(entries, options_map, config_str)
+
+        self.assertEqualEntries(
+            """
+        2010-08-31 open Expenses:Bread:Price
+        2010-08-31 open Expenses:Bread:Discount
+        2010-08-31 open Expenses:Milk:Price
+        2010-08-31 open Expenses:Milk:Discount
+        2010-08-31 open Expenses:Onion
+
+        2016-05-20 * ""
+            Assets:Bank                     300 HUF
+            Expenses:Bread:Price            200 HUF
+            Expenses:Milk:Price             100 HUF
+
+        2016-05-25 * ""
+            discount-1:                      50 HUF
+            Assets:Bank                     150 HUF
+            Expenses:Bread:Price            200 HUF
+            Expenses:Bread:Discount         -50 HUF
+
+        2016-05-31 * ""
+            discount-1:                      10 HUF
+            Assets:Bank                      90 HUF
+            Expenses:Milk:Price             100 HUF
+            Expenses:Milk:Discount          -10 HUF
+        """,
+            new_entries,
+        )
+
+    @loader.load_doc(expect_errors=True)
+    def test_unchanged_entries_preserved(self, entries, _, options_map):
+        """
+        2010-08-31 open Expenses:Bread
+        2010-08-31 open Expenses:Onion
+
+        2016-05-20 * ""
+            Assets:Bank                     100 HUF
+            Expenses:Onion                  100 HUF
+
+        2016-05-25 * ""
+            split-mode: "discount"
+            discount-1:                   50 HUF
+            Assets:Bank                  150 HUF
+            Expenses:Bread               200 HUF
+                discount-ids: "1"
+        """
+        config_str = ('{'
+                      '"metadata-name-type":"split-mode",'
+                      '"roundings":{'
+                      '    "HUF":0'
+                      '}'
+                      '}')
+        new_entries, _ = post_splitter(entries, options_map, config_str)
+
+        self.assertIs(entries[1], new_entries[2])
+        self.assertIs(entries[2], new_entries[3])
+        self.assertIsNot(entries[3], new_entries[4])
+
+    @loader.load_doc(expect_errors=True)
+    def test_equal_split_largest_remainder_without_rounding(self, entries, _, options_map):
+        """
+        2016-05-31 * "Exams"
+            Assets:Bank                 -900 HUF
+                split-mode: "equal"
+            Expenses:Exam                  0 HUF
+            Expenses:Exam                  0 HUF
+            Expenses:Exam                  0 HUF
+        """
+        config_str = ('{'
+                      '"roundings":{'
+                      '    "USD":2'
+                      '  },'
+                      '"rounding-mode":"largest-remainder",'
+                      '"metadata-name-type":"split-mode"'
+                      '}')
+        new_entries, _ = post_splitter(entries, options_map, config_str)
+
+        self.assertEqualEntries(
+            """
+        2016-05-31 * "Exams"
+            Assets:Bank                 -900 HUF
+            Expenses:Exam                300 HUF
+            Expenses:Exam                300 HUF
+            Expenses:Exam                300 HUF
+        """,
+            new_entries,
+        )
+
+    @loader.load_doc(expect_errors=True)
+    def test_equal_split_largest_remainder_rounding(self, entries, _, options_map):
+        """
+        2016-05-31 * "Exams"
+            Assets:Bank                 -800 HUF
+                split-mode: "equal"
+            Expenses:Exam                  0 HUF
+            Expenses:Exam                  0 HUF
+            Expenses:Exam                  0 HUF
+        """
+        config_str = ('{'
+                      '"roundings":{'
+                      '    "HUF":2'
+                      '  },'
+                      '"rounding-mode":"largest-remainder",'
+                      '"metadata-name-type":"split-mode"'
+                      '}')
+        new_entries, _ = post_splitter(entries, options_map, config_str)
+
+        self.assertEqualEntries(
+            """
+        2016-05-31 * "Exams"
+            Assets:Bank                 -800 HUF
+            Expenses:Exam             266.67 HUF
+            Expenses:Exam             266.67 HUF
+            Expenses:Exam             266.66 HUF
+        """,
+            new_entries,
+        )
+
+    @loader.load_doc(expect_errors=True)
+    def test_discount_split_largest_remainder_rounding(self, entries, _, options_map):
+        """
+        2016-05-31 * "Receipt"
+            split-mode: "discount"
+            discount-1: 1 USD
+            Assets:Bank                   -29 USD
+            Expenses:Bread                 10 USD
+                discount-ids: "1"
+            Expenses:Milk                  10 USD
+                discount-ids: "1"
+            Expenses:Butter                10 USD
+                discount-ids: "1"
+        """
+        config_str = ('{'
+                      '"roundings":{'
+                      '    "USD":2'
+                      '  },'
+                      '"rounding-mode":"largest-remainder",'
+                      '"metadata-name-type":"split-mode"'
+                      '}')
+        new_entries, _ = post_splitter(entries, options_map, config_str)
+
+        self.assertEqualEntries(
+            """
+        2016-05-31 * "Receipt"
+            discount-1: 1 USD
+            Assets:Bank                   -29 USD
+            Expenses:Bread:Price           10 USD
+            Expenses:Bread:Discount     -0.33 USD
+            Expenses:Milk:Price            10 USD
+            Expenses:Milk:Discount      -0.33 USD
+            Expenses:Butter:Price          10 USD
+            Expenses:Butter:Discount    -0.34 USD
+        """,
+            new_entries,
+        )
+
+    @loader.load_doc(expect_errors=True)
+    def test_incremental_split_matches_full_split(self, entries, _, options_map):
+        """
+        2010-08-31 open Expenses:Bread
+        2010-08-31 open Expenses:Milk
+
+        2016-05-20 * ""
+            Assets:Bank                     300 HUF
+            Expenses:Bread                  200 HUF
+            Expenses:Milk                   100 HUF
+
+        2016-05-25 * ""
+            split-mode: "discount"
+            discount-1:                   50 HUF
+            Assets:Bank                  150 HUF
+            Expenses:Bread               200 HUF
+                discount-ids: "1"
+
+        2016-05-31 * ""
+            split-mode: "discount"
+            discount-1:                   10 HUF
+            Assets:Bank                   90 HUF
+            Expenses:Milk                100 HUF
+                discount-ids: "1"
+        """
+        config_str = ('{'
+                      '"metadata-name-type":"split-mode",'
+                      '"roundings":{'
+                      '    "HUF":0'
+                      '}'
+                      '}')
+        added_entries, _, _ = loader.load_string("""
+        2016-05-21 * "Exams"
+            Assets:Bank                 -800 HUF
+                split-mode: "equal"
+            Expenses:Bread                 0 HUF
+            Expenses:Milk                  0 HUF
+        """)
+        previous_new_entries, _ = post_splitter(entries, options_map, config_str)
+
+        self.assertEqual("discount", entries[3].meta["split-mode"])
+        for removed_entries in [[entries[2]], [entries[4]]]:
+            new_entries, _ = post_splitter_incremental(entries, previous_new_entries, removed_entries, added_entries,
+                                                       options_map, config_str)
+
+            merged_entries = sorted([entry for entry in entries if entry is not removed_entries[0]] + added_entries,
+                                    key=data.entry_sortkey)
+            expected_entries, _ = post_splitter(merged_entries, options_map, config_str)
+            self.assertEqual(expected_entries, new_entries)
+
+    def test_config_compiled_once_and_rejected_up_front(self):
+        config_str = '{"metadata-name-type":"split-mode","roundings":{"HUF":0}}'
+
+        self.assertIs(PostSplitter.get_config(config_str), PostSplitter.get_config(config_str))
+        for config_str in ['{"metadata-name-type":"split-mode","rounding":{"HUF":0}}',
+                           '{"metadata-name-type":"split-mode","rounding-mode":"banker"}',
+                           '{"roundings":{"HUF":0}}']:
+            with self.assertRaises(Exception):
+                post_splitter([], {}, config_str)
+
+    @loader.load_doc(expect_errors=True)
+    def test_many_discounts_split_in_one_pass(self, entries, _, options_map):
+        """
+        2016-05-31 * ""
+            split-mode: "discount"
+            discount-1:                  100 HUF
+            discount-2:                   50 HUF
+            discount-3:                  200 HUF
+            Assets:Bank                 -850 HUF
+            Expenses:Bread               600 HUF
+                discount-ids: "1,3"
+            Expenses:Butter              400 HUF
+                discount-ids: "3,2"
+            Expenses:Milk                200 HUF
+                discount-ids: "3"
+        """
+        config_str = ('{'
+                      '"metadata-name-type":"split-mode",'
+                      '"roundings":{'
+                      '    "HUF":2'
+                      '  },'
+                      '}')
+        new_entries, _ = post_splitter(entries, options_map, config_str)
+
+        self.assertEqual([
+            ("Assets:Bank", "-850 HUF", None),
+            ("Expenses:Bread:Price", "600 HUF", None),
+            ("Expenses:Bread:Discount", "-100.00 HUF", "3"),
+            ("Expenses:Bread:Discount", "-100.00 HUF", "1"),
+            ("Expenses:Butter:Price", "400 HUF", None),
+            ("Expenses:Butter:Discount", "-66.67 HUF", "3"),
+            ("Expenses:Butter:Discount", "-50.00 HUF", "2"),
+            ("Expenses:Milk:Price", "200 HUF", None),
+            ("Expenses:Milk:Discount", "-33.33 HUF", "3"),
+        ], [(posting.account, posting.units.to_string(), posting.meta.get("discount-ids"))
+            for posting in new_entries[0].postings])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,6 @@
 import ast
 import collections
-import copy
+import heapq
 
 from beancount.core import data
 
@@ -10,13 +10,23 @@ SplitCardTransactionError = collections.namedtuple(
     "SplitCardTransactionError", "source message entry"
 )
 
+CONFIG_KEYS = frozenset({"metadata-name-date", "metadata-name-transfer-account", "transfer-account", "account",
+                         "inverted-date-mode", "metadata-name-narration", "narration"})
+
+TxnSplitterConfig = collections.namedtuple(
+    "TxnSplitterConfig",
+    "metadata_name_date transfer_mode metadata_name_transfer_account transfer_account account inverted_date_mode "
+    "metadata_name_narration narration metadata_names_to_remove"
+)
+
 
 class TxnSplitter:
 
+    def __init__(self):
+        self.__configs_by_str = {}
+
     def split(self, entries, options_map, config_str=""):
-        config = {}
-        expr = ast.literal_eval(config_str)
-        config.update(expr)
+        config = self.get_config(config_str)
 
         new_entries = []
         for entry in entries:
@@ -30,108 +40,179 @@ class TxnSplitter:
 
         return new_entries, []
 
-    def __try_create_txn(self, rule, txn):
-        metadata_name_date = rule["metadata-name-date"]
-        metadata_names_to_remove = {metadata_name_date}
-
-        relevant_postings_filters = [lambda posting: posting.meta and metadata_name_date in posting.meta]
-        if "metadata-name-transfer-account" in rule:
-            metadata_name_transfer_account = rule["metadata-name-transfer-account"]
-            relevant_postings_filters.append(lambda posting: metadata_name_transfer_account in posting.meta)
-            transfer_account_get = lambda posting: posting.meta[
-                metadata_name_transfer_account
-            ]
-            metadata_names_to_remove.add(metadata_name_transfer_account)
-        elif "transfer-account" in rule:
-            if "account" in rule:
-                relevant_postings_filters.append(lambda posting: posting.account == rule["account"])
-            transfer_account_get = lambda posting: rule["transfer-account"]
+    def split_incremental(self, previous_entries, previous_new_entries, removed_entries, added_entries,
+                          options_map, config_str=""):
+        entries = self.__merge_entries(previous_entries, removed_entries, added_entries)
+        previous_new_entries_by_id = self.__get_previous_new_entries_by_id(previous_entries, previous_new_entries)
+        if previous_new_entries_by_id is None:
+            return self.split(entries, options_map, config_str)
+
+        config = self.get_config(config_str)
+
+        new_entries = []
+        for entry in entries:
+            entry_new_entries = previous_new_entries_by_id.get(id(entry))
+            if entry_new_entries is None:
+                entry_new_entries = self.split_entry(config, entry)
+            new_entries.extend(entry_new_entries)
+
+        return new_entries, []
+
+    def get_config(self, config_str):
+        if config_str in self.__configs_by_str:
+            return self.__configs_by_str[config_str]
+
+        config = {}
+        expr = ast.literal_eval(config_str)
+        config.update(expr)
+
+        unknown_keys = sorted(key for key in config if key not in CONFIG_KEYS)
+        if len(unknown_keys) > 0:
+            raise Exception("Config key not implemented: " + ", ".join(map(str, unknown_keys)))
+        if "metadata-name-date" not in config:
+            raise Exception("Config key missing: metadata-name-date")
+
+        metadata_names_to_remove = {config["metadata-name-date"]}
+        if "metadata-name-transfer-account" in config:
+            transfer_mode = "metadata"
+            metadata_names_to_remove.add(config["metadata-name-transfer-account"])
+        elif "transfer-account" in config:
+            transfer_mode = "literal"
         else:
+            transfer_mode = None
+
+        txn_splitter_config = TxnSplitterConfig(config["metadata-name-date"], transfer_mode,
+                                                config.get("metadata-name-transfer-account"),
+                                                config.get("transfer-account"), config.get("account"),
+                                                config.get("inverted-date-mode"), config.get("metadata-name-narration"),
+                                                config.get("narration"), frozenset(metadata_names_to_remove))
+        self.__configs_by_str[config_str] = txn_splitter_config
+        return txn_splitter_config
+
+    def split_entry(self, config, entry):
+        if not isinstance(entry, data.Transaction):
+            return [entry]
+        return self.__try_create_txn(config, entry)
+
+    @staticmethod
+    def __merge_entries(previous_entries, removed_entries, added_entries):
+        removed_ids = {id(entry) for entry in removed_entries}
+        kept_entries = [entry for entry in previous_entries if id(entry) not in removed_ids]
+        return list(heapq.merge(kept_entries, sorted(added_entries, key=data.entry_sortkey), key=data.entry_sortkey))
+
+    @staticmethod
+    def __get_previous_new_entries_by_id(previous_entries, previous_new_entries):
+        previous_new_entries_by_id = {}
+        position = 0
+        for index, entry in enumerate(previous_entries):
+            if entry.meta is None or position >= len(previous_new_entries) \
+                    or previous_new_entries[position].meta is not entry.meta:
+                return None
+            if index + 1 < len(previous_entries) and previous_entries[index + 1].meta is entry.meta:
+                return None
+
+            end = position + 1
+            while end < len(previous_new_entries) and previous_new_entries[end].meta is entry.meta:
+                end += 1
+            previous_new_entries_by_id[id(entry)] = previous_new_entries[position:end]
+            position = end
+
+        if position != len(previous_new_entries):
+            return None
+        return previous_new_entries_by_id
+
+    def __try_create_txn(self, config, txn):
+        if config.transfer_mode is None:
             return [txn]
 
-        relevant_postings = list(
-            filter(
-                lambda posting: all(f(posting) for f in relevant_postings_filters),
-                txn.postings,
-            )
-        )
+        relevant_postings = [posting for posting in txn.postings if self.__is_relevant_posting(config, posting)]
         if len(relevant_postings) == 0:
             return [txn]
 
         new_txns = []
         date = txn.date
-        inverted_date_mode = rule.get("inverted-date-mode")
+        metadata_name_date = config.metadata_name_date
+        inverted_date_mode = config.inverted_date_mode
         if inverted_date_mode is True and len(relevant_postings) == 1:
             txn = txn._replace(date=self.__get_date(relevant_postings[0], metadata_name_date))
 
+        relevant_posting_ids = set()
+        transfer_postings = []
         for relevant_posting in relevant_postings:
-            extra_metadata_names_to_remove = {}
-            transfer_account = transfer_account_get(relevant_posting)
+            transfer_account = self.__get_transfer_account(config, relevant_posting)
 
             if not inverted_date_mode:
                 date = self.__get_date(relevant_posting, metadata_name_date)
-            (narration, metadata_name_to_remove) = self.__get_narration(txn, relevant_posting, rule)
+            (narration, metadata_name_to_remove) = self.__get_narration(txn, relevant_posting, config)
 
+            metadata_names_to_remove = config.metadata_names_to_remove
             if metadata_name_to_remove:
-                extra_metadata_names_to_remove = {metadata_name_to_remove}
+                metadata_names_to_remove = metadata_names_to_remove.union({metadata_name_to_remove})
 
-            self.__modify_existing_txn(txn, relevant_posting, transfer_account,
-                                       metadata_names_to_remove.union(extra_metadata_names_to_remove))
+            moved_posting = self.__remove_metadata(relevant_posting, metadata_names_to_remove)
+            relevant_posting_ids.add(id(relevant_posting))
+            transfer_postings.append(self.__create_transfer_posting(relevant_posting, transfer_account, False))
             new_txns.append(self.__create_new_txn(
                 txn,
-                relevant_posting,
+                moved_posting,
                 date,
                 narration,
                 transfer_account,
             ))
 
-        new_txns.append(txn)
+        new_txns.append(self.__modify_existing_txn(txn, relevant_posting_ids, transfer_postings))
         return new_txns
 
+    @staticmethod
+    def __is_relevant_posting(config, posting):
+        if not posting.meta or config.metadata_name_date not in posting.meta:
+            return False
+        if config.transfer_mode == "metadata":
+            return config.metadata_name_transfer_account in posting.meta
+        return config.account is None or posting.account == config.account
+
+    @staticmethod
+    def __get_transfer_account(config, posting):
+        if config.transfer_mode == "metadata":
+            return posting.meta[config.metadata_name_transfer_account]
+        return config.transfer_account
+
     @staticmethod
     def __get_date(relevant_posting, metadata_name_date):
         return relevant_posting.meta[metadata_name_date]
 
     @staticmethod
-    def __get_narration(entry, relevant_posting, rule):
-        metadata_name_narration = rule.get("metadata-name-narration")
+    def __get_narration(entry, relevant_posting, config):
+        metadata_name_narration = config.metadata_name_narration
         if metadata_name_narration is not None and metadata_name_narration in relevant_posting.meta:
             return relevant_posting.meta[metadata_name_narration], metadata_name_narration
-        narration = rule.get("narration")
-        if narration is not None:
-            return narration, None
+        if config.narration is not None:
+            return config.narration, None
         return entry.narration, None
 
     @staticmethod
-    def __modify_existing_txn(txn, relevant_posting, transfer_account, metadata_names_to_remove):
-        for metadata_name_to_remove in metadata_names_to_remove:
-            del relevant_posting.meta[metadata_name_to_remove]
-
-        txn.postings.remove(relevant_posting)
-        data.create_simple_posting(
-            txn,
-            transfer_account,
-            relevant_posting.units.number,
-            relevant_posting.units.currency,
-        )
+    def __remove_metadata(posting, metadata_names_to_remove):
+        meta = {}
+        for key, value in posting.meta.items():
+            if key not in metadata_names_to_remove:
+                meta[key] = value
+        return posting._replace(meta=meta)
+
+    @staticmethod
+    def __create_transfer_posting(relevant_posting, transfer_account, is_negated):
+        number = -relevant_posting.units.number if is_negated else relevant_posting.units.number
+        return data.Posting(transfer_account, data.Amount(number, relevant_posting.units.currency), None, None,
+                            None, None)
 
     @staticmethod
-    def __create_new_txn(txn, relevant_posting, date, narration, transfer_account):
-        # create new txn
-        new_txn = copy.deepcopy(txn)
-        new_txn = new_txn._replace(
-            narration=narration,
-            date=date,
-            postings=[copy.deepcopy(relevant_posting)],
-        )
-        data.create_simple_posting(
-            new_txn,
-            transfer_account,
-            -relevant_posting.units.number,
-            relevant_posting.units.currency,
-        )
-
-        return new_txn
+    def __modify_existing_txn(txn, relevant_posting_ids, transfer_postings):
+        postings = [posting for posting in txn.postings if id(posting) not in relevant_posting_ids]
+        postings.extend(transfer_postings)
+        return txn._replace(postings=postings)
+
+    def __create_new_txn(self, txn, moved_posting, date, narration, transfer_account):
+        postings = [moved_posting, self.__create_transfer_posting(moved_posting, transfer_account, True)]
+        return txn._replace(narration=narration, date=date, postings=postings)
 
 
 txn_splitter_obj = TxnSplitter()
@@ -139,3 +220,9 @@ txn_splitter_obj = TxnSplitter()
 
 def txn_splitter(entries, options_map, config_str=""):
     return txn_splitter_obj.split(entries, options_map, config_str)
+
+
+def txn_splitter_incremental(previous_entries, previous_new_entries, removed_entries, added_entries,
+                             options_map, config_str=""):
+    return txn_splitter_obj.split_incremental(previous_entries, previous_new_entries, removed_entries, added_entries,
+                                              options_map, config_str)
@@ -3,7 +3,9 @@ import unittest
 from beancount import loader
 from beancount.parser import cmptest
 
-from txn_splitter import txn_splitter
+from beancount.core import data
+
+from txn_splitter import txn_splitter, txn_splitter_incremental
 
 
 class TestTxnSplitter(cmptest.TestCase):
@@ -371,6 +373,78 @@ class TestTxnSplitter(cmptest.TestCase):
             new_entries,
         )
 
+    @loader.load_doc(expect_errors=True)
+    def test_input_not_mutated_and_metadata_shared(self, entries, _, options_map):
+        """
+        2013-05-31 * "Paid by card"
+            random-1: "text-1"
+            Assets:Bank:Checking      -100 USD
+                booking-date: 2013-06-03
+            Assets:Cash                100 USD
+        """
+        config_str = ('{'
+                      '"metadata-name-date":"booking-date",'
+                      '"transfer-account":"Assets:Bank:DebitCard"'
+                      '}')
+        entry = entries[0]
+        postings = list(entry.postings)
+        posting_meta = dict(entry.postings[0].meta)
+
+        new_entries, _ = txn_splitter(entries, options_map, config_str)
+
+        self.assertEqual(postings, entry.postings)
+        self.assertEqual(posting_meta, entry.postings[0].meta)
+        self.assertEqual(2, len(new_entries))
+        for new_entry in new_entries:
+            self.assertIs(entry.meta, new_entry.meta)
+        self.assertIs(entry.postings[1], new_entries[1].postings[0])
+        self.assertIs(entry.postings[0].units, new_entries[0].postings[0].units)
+
+    @loader.load_doc(expect_errors=True)
+    def test_incremental_split_matches_full_split(self, entries, _, options_map):
+        """
+        2013-05-31 * "Paid by card"
+            Assets:Bank:Checking      -100 USD
+                booking-date: 2013-06-03
+            Assets:Cash                100 USD
+
+        2013-06-10 * "Paid by card"
+            Assets:Bank:Checking      -20 USD
+                booking-date: 2013-06-12
+            Assets:Cash                20 USD
+
+        2013-06-30 * "Paid by card"
+            Assets:Bank:Checking      -200 USD
+                booking-date: 2013-07-02
+            Assets:Cash                200 USD
+        """
+        config_str = ('{'
+                      '"metadata-name-date":"booking-date",'
+                      '"transfer-account":"Assets:Bank:DebitCard"'
+                      '}')
+        added_entries, _, _ = loader.load_string("""
+        2013-06-10 * "Paid by card"
+            Assets:Bank:Checking      -30 USD
+                booking-date: 2013-06-11
+            Assets:Cash                30 USD
+        """)
+        previous_new_entries, _ = txn_splitter(entries, options_map, config_str)
+
+        new_entries, _ = txn_splitter_incremental(entries, previous_new_entries, [entries[1]], added_entries,
+                                                  options_map, config_str)
+
+        expected_entries, _ = txn_splitter(sorted([entries[0], entries[2]] + added_entries, key=data.entry_sortkey),
+                                           options_map, config_str)
+        self.assertEqual(expected_entries, new_entries)
+        self.assertIs(previous_new_entries[0], new_entries[0])
+        self.assertIs(previous_new_entries[-1], new_entries[-1])
+
+    def test_config_rejected_up_front(self):
+        for config_str in ['{"metadata-name-date":"booking-date","transfer-acount":"Liabilities:Bank:DebitCard"}',
+                           '{"transfer-account":"Liabilities:Bank:DebitCard"}']:
+            with self.assertRaises(Exception):
+                txn_splitter([], {}, config_str)
+
 
 if __name__ == "__main__":
     unittest.main()